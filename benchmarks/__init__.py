@@ -0,0 +1 @@
+"""Performance benchmarks for Invoice QC Service"""
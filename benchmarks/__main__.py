@@ -0,0 +1,4 @@
+"""`python -m benchmarks` runs the suite, as `python -m benchmarks.suite` does"""
+from benchmarks.suite import main
+
+main()
@@ -0,0 +1,57 @@
+"""Benchmark single-pass page pipeline against the legacy two-pass extraction
+
+Usage:
+    python -m benchmarks.bench_extraction --pdf-glob "pdfs/sample_pdf_*.pdf" --repeat 5
+"""
+import argparse
+import glob
+import time
+import tracemalloc
+from benchmarks.legacy_extractor import extract_invoice_from_pdf as legacy_extract_invoice_from_pdf
+from invoice_qc.extractor import extract_invoice_from_pdf
+from invoice_qc.records import to_invoice
+
+
+def measure(fn, paths, repeat):
+    """Return best wall time and peak traced memory over all runs"""
+    best = float("inf")
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        for path in paths:
+            fn(path)
+        elapsed = time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        best = min(best, elapsed)
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf-glob", default="pdfs/sample_pdf_*.pdf")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    paths = sorted(glob.glob(args.pdf_glob))
+    if not paths:
+        raise SystemExit(f"No PDFs match {args.pdf_glob}")
+    
+    # Both implementations must agree before timing means anything
+    for path in paths:
+        # The legacy extractor predates the engine field
+        expected = to_invoice(extract_invoice_from_pdf(path)).model_copy(update={"engine": None})
+        assert legacy_extract_invoice_from_pdf(path) == expected, path
+    
+    legacy_time, legacy_peak = measure(legacy_extract_invoice_from_pdf, paths, args.repeat)
+    new_time, new_peak = measure(extract_invoice_from_pdf, paths, args.repeat)
+    
+    print(f"{len(paths)} PDFs, best of {args.repeat}")
+    print(f"  legacy two-pass : {legacy_time * 1000:8.1f} ms  peak {legacy_peak / 1024:8.0f} KiB")
+    print(f"  single-pass     : {new_time * 1000:8.1f} ms  peak {new_peak / 1024:8.0f} KiB")
+    print(f"  speedup         : {legacy_time / new_time:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
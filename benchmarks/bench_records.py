@@ -0,0 +1,81 @@
+"""Benchmark memory per invoice and construction throughput of records against Pydantic models
+
+Usage:
+    python -m benchmarks.bench_records --count 100000 --line-items 5
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import date
+from invoice_qc.records import InvoiceRecord, LineItemRecord, ResultRecord
+from invoice_qc.schemas import Invoice, LineItem, ValidationResult
+
+
+def invoice_fields(i: int):
+    return dict(
+        invoice_number=f"INV-{i}",
+        invoice_date=date(2024, 5, 22),
+        seller_name="ABC Corporation",
+        buyer_name="Test Buyer",
+        currency="EUR",
+        net_total=100.0,
+        tax_amount=19.0,
+        gross_total=119.0,
+    )
+
+
+def make_invoices(invoice_cls, item_cls, count: int, line_items: int):
+    return [
+        invoice_cls(**invoice_fields(i), line_items=[
+            item_cls(description="Widget", quantity=1.0, unit_price=20.0, line_total=20.0)
+            for _ in range(line_items)
+        ])
+        for i in range(count)
+    ]
+
+
+def make_results(result_cls, count: int):
+    return [result_cls(invoice_number=f"INV-{i}", is_valid=True) for i in range(count)]
+
+
+def measure(build, count: int):
+    """Return (objects per second, bytes per object) for one build of `count` objects"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    objects = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    
+    # Throughput is timed again without tracemalloc, which slows allocation down
+    start = time.perf_counter()
+    build()
+    elapsed = min(elapsed, time.perf_counter() - start)
+    return count / elapsed, size / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--line-items", type=int, default=5)
+    args = parser.parse_args()
+    n, items = args.count, args.line_items
+    
+    cases = [
+        ("Invoice (Pydantic)", lambda: make_invoices(Invoice, LineItem, n, items)),
+        ("InvoiceRecord", lambda: make_invoices(InvoiceRecord, LineItemRecord, n, items)),
+        ("ValidationResult (Pydantic)", lambda: make_results(ValidationResult, n)),
+        ("ResultRecord", lambda: make_results(ResultRecord, n)),
+    ]
+    print(f"{n} objects, {items} line items per invoice")
+    print(f"{'type':<30}{'objects/s':>14}{'bytes/object':>14}")
+    for name, build in cases:
+        rate, size = measure(build, n)
+        print(f"{name:<30}{rate:>14,.0f}{size:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Reproducible benchmark suite compared against a stored baseline
+
+Runs every case in a fresh process on synthetic data (benchmarks/synthetic.py):
+extraction CPU time per page across page counts, line-item counts and table
+densities (table, lazy and text line-item engines), field and line-item parsing
+of line-item-heavy documents, validate_invoices throughput at several batch sizes, and the CLI
+full-run end to end. Each case also reports its peak RSS. Any metric worse
+than the baseline by more than the tolerance fails the run.
+
+Usage:
+    python -m benchmarks.suite                     # compare with benchmarks/baseline.json
+    python -m benchmarks.suite --quick             # smaller corpus and batches
+    python -m benchmarks.suite --update-baseline   # record this machine's numbers
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+from benchmarks.synthetic import invoice_pdf, pages_needed, synthetic_invoice, write_corpus
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_TOLERANCE = 0.25
+
+# name -> (minimum pages, line items, table rows per page; 0 = as many as fit)
+EXTRACTION_VARIANTS = {
+    "single_page": (1, 5, 0),
+    "long_table": (1, 60, 0),
+    "sparse_table": (1, 40, 8),
+    "text_heavy": (8, 5, 0),
+}
+# Line items per document of the parsing case, where parsing outweighs everything else
+PARSING_LINE_ITEMS = 200
+# Quick runs measure a subset of the full sizes, so their metrics compare against a full baseline
+VALIDATION_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+QUICK_VALIDATION_SIZES = (1_000, 10_000)
+
+# metric name -> (value, unit, "lower" or "higher" is better)
+Metrics = Dict[str, Tuple[float, str, str]]
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def best_of(repeat: int, fn: Callable[[], object], clock: Callable[[], float] = time.perf_counter) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = clock()
+        fn()
+        best = min(best, clock() - start)
+    return best
+
+
+def best_of_each(repeat: int, fns: List[Callable[[], object]]) -> float:
+    """Sum of each call's best CPU time; steadier on shared machines than timing the whole loop"""
+    return sum(best_of(repeat, fn, time.process_time) for fn in fns)
+
+
+def bench_extraction(variant: str, documents: int, repeat: int) -> Metrics:
+    """Milliseconds per page for full, lazy and text-engine extraction of one layout variant"""
+    from invoice_qc.extractor import extract_invoice_from_pdf
+    from invoice_qc.schemas import ExtractionOptions
+    
+    pages, line_items, rows_per_page = EXTRACTION_VARIANTS[variant]
+    rng = random.Random(variant)
+    invoices = [synthetic_invoice(rng, i, line_items) for i in range(documents)]
+    pdfs = [invoice_pdf(invoice, pages, rows_per_page) for invoice in invoices]
+    page_count = max(pages, pages_needed(line_items, rows_per_page))
+    
+    lazy = ExtractionOptions(lazy=True)
+    text = ExtractionOptions(engine="text")
+    # Timing a wrong answer would be meaningless
+    assert extract_invoice_from_pdf(pdfs[0]) == invoices[0].replace(engine="full"), variant
+    assert extract_invoice_from_pdf(pdfs[0], lazy) == invoices[0].replace(engine="full"), variant
+    assert extract_invoice_from_pdf(pdfs[0], text) == invoices[0].replace(engine="text"), variant
+    
+    total_pages = page_count * documents
+    full = best_of_each(repeat, [partial(extract_invoice_from_pdf, pdf) for pdf in pdfs])
+    lazy_time = best_of_each(repeat, [partial(extract_invoice_from_pdf, pdf, lazy) for pdf in pdfs])
+    text_time = best_of_each(repeat, [partial(extract_invoice_from_pdf, pdf, text) for pdf in pdfs])
+    return {
+        f"extract.{variant}.cpu_ms_per_page": (full * 1000 / total_pages, "ms", "lower"),
+        f"extract_lazy.{variant}.cpu_ms_per_page": (lazy_time * 1000 / total_pages, "ms", "lower"),
+        f"extract_text.{variant}.cpu_ms_per_page": (text_time * 1000 / total_pages, "ms", "lower"),
+    }
+
+
+def bench_parsing(documents: int, repeat: int) -> Metrics:
+    """CPU microseconds per line item to detect a document's format and parse its fields and rows
+    
+    Page text and tables are read once up front, so only parsing is timed:
+    header fields and totals, then the line items from both the tables and
+    the text rows.
+    """
+    import pdfplumber
+    from invoice_qc.extractor import (
+        build_invoice, document_format, iter_page_content, parse_invoice_fields,
+        parse_line_items, parse_text_line_items,
+    )
+    
+    rng = random.Random("parsing")
+    invoices = [synthetic_invoice(rng, i, PARSING_LINE_ITEMS) for i in range(documents)]
+    contents = []
+    for invoice in invoices:
+        with pdfplumber.open(io.BytesIO(invoice_pdf(invoice))) as pdf:
+            contents.append(list(iter_page_content(pdf)))
+    
+    def parse(content):
+        template = content[0][0]
+        texts = [text for _, text, _ in content]
+        fmt = document_format("".join(texts), template)
+        fields = parse_invoice_fields("".join(texts), template, fmt=fmt)
+        tables = [table for _, _, page_tables in content for table in page_tables]
+        text_items = [item for text in texts for item in parse_text_line_items(text, template, fmt)]
+        return build_invoice(fields, parse_line_items(tables, template, fmt)), build_invoice(fields, text_items, "text")
+    
+    # Timing a wrong answer would be meaningless
+    assert parse(contents[0]) == (invoices[0].replace(engine="full"), invoices[0].replace(engine="text"))
+    elapsed = best_of_each(repeat, [partial(parse, content) for content in contents])
+    return {"parse.line_items.cpu_us_per_item": (elapsed * 1e6 / (documents * PARSING_LINE_ITEMS), "us", "lower")}
+
+
+def bench_validation(size: int, repeat: int) -> Metrics:
+    """validate_invoices throughput on a batch of `size` synthetic invoices"""
+    from invoice_qc.validator import validate_invoices
+    
+    rng = random.Random(size)
+    invoices = [synthetic_invoice(rng, i, 2) for i in range(size)]
+    # A share of broken invoices so failing rows build messages too
+    for invoice in invoices[::10]:
+        invoice.gross_total += 5
+    # Batches from COLUMNAR_THRESHOLD up import NumPy on first use, which --repeat 1 would otherwise time
+    validate_invoices(invoices[:1_000])
+    
+    elapsed = best_of(repeat, lambda: validate_invoices(invoices), time.process_time)
+    return {f"validate.{size}.invoices_per_cpu_s": (size / elapsed, "1/s", "higher")}
+
+
+def bench_cli(documents: int, repeat: int) -> Metrics:
+    """Wall time of `invoice_qc.cli full-run` over a synthetic corpus, in a child process"""
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(tmp) / "pdfs"
+        write_corpus(corpus, documents, line_items=12, seed=documents)
+        report = Path(tmp) / "report.json"
+        command = [
+            sys.executable, "-m", "invoice_qc.cli", "full-run",
+            "--pdf-dir", str(corpus), "--report", str(report), "--no-cache",
+        ]
+
+        def run():
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        
+        elapsed = best_of(repeat, run)
+        assert json.loads(report.read_text())["total_invoices"] == documents
+    return {
+        "cli.full_run.seconds": (elapsed, "s", "lower"),
+        "cli.full_run.peak_rss_mb": (peak_rss_mb(children=True), "MB", "lower"),
+    }
+
+
+def run_case(name: str, fn: Callable[..., Metrics], *args) -> Metrics:
+    """Run one case and record the peak RSS of the process it ran in"""
+    metrics = fn(*args)
+    metrics[f"{name}.peak_rss_mb"] = (peak_rss_mb(), "MB", "lower")
+    return metrics
+
+
+def cases(quick: bool, repeat: int) -> List[Tuple[str, Callable[..., Metrics], tuple]]:
+    documents = 3 if quick else 10
+    result = [
+        (f"extract.{variant}", bench_extraction, (variant, documents, repeat))
+        for variant in EXTRACTION_VARIANTS
+    ]
+    result.append(("parse", bench_parsing, (documents, repeat)))
+    for size in QUICK_VALIDATION_SIZES if quick else VALIDATION_SIZES:
+        result.append((f"validate.{size}", bench_validation, (size, repeat)))
+    result.append(("cli", bench_cli, (5 if quick else 20, 1 if quick else repeat)))
+    return result
+
+
+def run_suite(quick: bool, repeat: int) -> Metrics:
+    """Run each case in a fresh process so peak RSS belongs to that case alone"""
+    metrics: Metrics = {}
+    context = multiprocessing.get_context("spawn")
+    for name, fn, args in cases(quick, repeat):
+        print(f"  running {name}...", flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            metrics.update(executor.submit(run_case, name, fn, *args).result())
+    return metrics
+
+
+def compare(metrics: Metrics, baseline: Dict, tolerance: float) -> List[str]:
+    """Print current vs baseline values and return the names of regressed metrics"""
+    regressions = []
+    print(f"{'metric':<40}{'baseline':>14}{'current':>14}{'change':>10}  status")
+    for name, (value, unit, better) in sorted(metrics.items()):
+        base = baseline.get("metrics", {}).get(name)
+        if base is None:
+            print(f"{name:<40}{'-':>14}{value:>14.2f}{'':>10}  new")
+            continue
+        change = value / base["value"] - 1 if base["value"] else 0.0
+        worse = change > tolerance if better == "lower" else change < -tolerance / (1 + tolerance)
+        status = "REGRESSION" if worse else "ok"
+        if worse:
+            regressions.append(name)
+        print(f"{name:<40}{base['value']:>14.2f}{value:>14.2f}{change:>+10.1%}  {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="Smaller corpus and batch sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--tolerance", type=float, default=None, help="Allowed slowdown, e.g. 0.25 for 25%%")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="Also write the current metrics to this JSON file")
+    args = parser.parse_args()
+    
+    metrics = run_suite(args.quick, args.repeat)
+    current = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.machine()},
+        "quick": args.quick,
+        "metrics": {name: {"value": value, "unit": unit, "better": better} for name, (value, unit, better) in metrics.items()},
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(current, indent=2) + "\n")
+    
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        current["tolerance"] = args.tolerance if args.tolerance is not None else DEFAULT_TOLERANCE
+        baseline_path.write_text(json.dumps(current, indent=2) + "\n")
+        print(f"Baseline written to {baseline_path}")
+        return
+    
+    if not baseline_path.exists():
+        raise SystemExit(f"No baseline at {baseline_path}; run with --update-baseline first")
+    baseline = json.loads(baseline_path.read_text())
+    tolerance = args.tolerance if args.tolerance is not None else baseline.get("tolerance", DEFAULT_TOLERANCE)
+    regressions = compare(metrics, baseline, tolerance)
+    if regressions:
+        raise SystemExit(f"{len(regressions)} metric(s) regressed by more than {tolerance:.0%}: {', '.join(regressions)}")
+    print(f"No regressions beyond {tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Synthetic invoice PDFs in the de-bestellung layout, written without any PDF library
+
+Each document has the header block on page 1, a ruled line-item table that
+pdfplumber detects with its default settings, optional text-only filler pages
+and the totals at the bottom of the last page. The generator returns the
+invoice it encoded, so benchmarks can check extraction before timing it.
+"""
+import math
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List, Tuple
+from invoice_qc.records import InvoiceRecord, LineItemRecord
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+ROW_HEIGHT = 16
+
+# Tables start below the lazy header region on page 1 and end above the totals region
+FIRST_TABLE_TOP = 400
+TABLE_TOP = 80
+TABLE_BOTTOM = 640
+
+# Pos. | Artikelbeschreibung | Menge | Preis | Bestellwert
+COLUMNS = (40, 80, 330, 400, 480, 560)
+HEADER = ("Pos.", "Artikelbeschreibung", "Menge", "Preis", "Bestellwert")
+
+SELLERS = ("ABC Corporation", "Nordwind GmbH", "Delta Supplies Ltd", "Acme Inc")
+BUYERS = ("Beispielname Unternehmen", "Musterklinik Nord", "Stadtwerke Sued")
+PRODUCTS = ("Sterilisationsmittel", "Handschuhe Nitril", "Kanuelen steril", "Verbandsmull", "Desinfektion 1L")
+
+FILLER = (
+    "Es gelten unsere Allgemeinen Einkaufsbedingungen in der jeweils gueltigen Fassung. "
+    "Lieferungen sind frei Haus an die angegebene Lieferanschrift zu erbringen."
+)
+
+
+def max_rows(first_page: bool) -> int:
+    """Table rows (including the header row) that fit on a page"""
+    return (TABLE_BOTTOM - (FIRST_TABLE_TOP if first_page else TABLE_TOP)) // ROW_HEIGHT
+
+
+def german_amount(value: float) -> str:
+    """1234.5 -> '1.234,50'"""
+    return f"{value:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class _Page:
+    """PDF content stream for one page, in top-left coordinates like pdfplumber"""
+
+    def __init__(self):
+        self.ops: List[str] = []
+
+    def text(self, x: float, top: float, value: str, size: int = 9):
+        self.ops.append(f"BT /F1 {size} Tf {x} {PAGE_HEIGHT - top - size} Td ({_escape(value)}) Tj ET")
+
+    def line(self, x0: float, top0: float, x1: float, top1: float):
+        self.ops.append(f"{x0} {PAGE_HEIGHT - top0} m {x1} {PAGE_HEIGHT - top1} l S")
+
+    def table(self, top: float, rows: List[Tuple[str, ...]]):
+        bottom = top + len(rows) * ROW_HEIGHT
+        for i in range(len(rows) + 1):
+            self.line(COLUMNS[0], top + i * ROW_HEIGHT, COLUMNS[-1], top + i * ROW_HEIGHT)
+        for x in COLUMNS:
+            self.line(x, top, x, bottom)
+        for i, row in enumerate(rows):
+            for x, value in zip(COLUMNS, row):
+                self.text(x + 3, top + i * ROW_HEIGHT + 4, value, size=8)
+
+    def stream(self) -> bytes:
+        return ("0.5 w\n" + "\n".join(self.ops)).encode("latin-1")
+
+
+def _write_pdf(pages: List[_Page]) -> bytes:
+    """Serialize pages into a minimal PDF 1.4 file with a cross-reference table"""
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(pages)} >>".encode(),
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    for page_id, page in zip(page_ids, pages):
+        content = page.stream()
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}]"
+            f" /Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        ).encode()
+        objects[page_id + 1] = f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream"
+    
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number in range(1, len(objects) + 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + objects[number] + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def synthetic_invoice(rng: random.Random, number: int, line_items: int) -> InvoiceRecord:
+    """A consistent invoice with `line_items` items whose totals add up"""
+    items = []
+    for _ in range(line_items):
+        quantity = float(rng.randint(1, 40))
+        price = round(rng.uniform(0.5, 400), 2)
+        items.append(LineItemRecord(rng.choice(PRODUCTS), quantity, price, round(quantity * price, 2)))
+    net = round(sum(item.line_total for item in items), 2)
+    tax = round(net * 0.19, 2)
+    return InvoiceRecord(
+        invoice_number=f"SYN{number:07d}",
+        invoice_date=date(2024, 1, 1) + timedelta(days=rng.randrange(365)),
+        seller_name=rng.choice(SELLERS),
+        buyer_name=rng.choice(BUYERS),
+        currency="EUR",
+        net_total=net,
+        tax_amount=tax,
+        gross_total=round(net + tax, 2),
+        line_items=items,
+    )
+
+
+def invoice_pdf(invoice: InvoiceRecord, pages: int = 1, rows_per_page: int = 0) -> bytes:
+    """Lay out `invoice` over at least `pages` pages
+    
+    `rows_per_page` sets the table density (0 = as many rows as fit); extra
+    pages beyond those the table needs are filled with running text.
+    """
+    return _write_pdf(_invoice_pages(invoice, pages, rows_per_page))
+
+
+def statement_pdf(invoices: List[InvoiceRecord], pages: int = 1) -> bytes:
+    """One consolidated PDF holding each invoice laid out as by invoice_pdf"""
+    return _write_pdf([page for invoice in invoices for page in _invoice_pages(invoice, pages, 0)])
+
+
+def _invoice_pages(invoice: InvoiceRecord, pages: int, rows_per_page: int) -> List[_Page]:
+    rows = [
+        (str(i), item.description, f"{item.quantity:g}", german_amount(item.unit_price), german_amount(item.line_total))
+        for i, item in enumerate(invoice.line_items, 1)
+    ]
+    
+    chunks = []
+    first = True
+    while rows or first:
+        capacity = max_rows(first) - 1
+        if rows_per_page:
+            capacity = min(capacity, rows_per_page)
+        chunks.append(rows[:capacity])
+        rows = rows[capacity:]
+        first = False
+    total_pages = max(pages, len(chunks))
+    
+    result = []
+    for index in range(total_pages):
+        page = _Page()
+        page.text(40, 30, f"Seite {index + 1} von {total_pages}", size=8)
+        if index == 0:
+            page.text(40, 60, f"{invoice.seller_name} Bestellung {invoice.invoice_number} im Auftrag von 3498578433", size=10)
+            page.text(40, 110, f"Kundenanschrift {invoice.buyer_name}")
+            page.text(40, 125, "Albertus-Magnus-Str. 8, 44624 Matternfeld")
+            page.text(40, 170, f"Bestellung {invoice.invoice_number} vom {invoice.invoice_date.strftime('%d.%m.%Y')}")
+            page.text(40, 200, "Zahlungsbedingungen 0 Tage 2,0% Skonto")
+        if index < len(chunks):
+            top = FIRST_TABLE_TOP if index == 0 else TABLE_TOP
+            page.table(top, [HEADER] + chunks[index])
+        else:
+            for line in range(30):
+                page.text(40, TABLE_TOP + line * 18, f"{line + 1}. {FILLER[:95]}", size=8)
+        if index == total_pages - 1:
+            page.text(300, 700, f"Gesamtwert EUR {german_amount(invoice.net_total)}")
+            page.text(300, 715, f"MwSt. 19,00% EUR {german_amount(invoice.tax_amount)}")
+            page.text(300, 730, f"Gesamtwert inkl. MwSt. EUR {german_amount(invoice.gross_total)}")
+        result.append(page)
+    return result
+
+
+def write_corpus(
+    directory: Path,
+    count: int,
+    line_items: int = 5,
+    pages: int = 1,
+    rows_per_page: int = 0,
+    seed: int = 0
+) -> List[InvoiceRecord]:
+    """Write `count` synthetic PDFs named by invoice number and return their invoices"""
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    invoices = []
+    for i in range(count):
+        invoice = synthetic_invoice(rng, i, line_items)
+        (directory / f"{invoice.invoice_number}.pdf").write_bytes(invoice_pdf(invoice, pages, rows_per_page))
+        invoices.append(invoice)
+    return invoices
+
+
+def pages_needed(line_items: int, rows_per_page: int = 0) -> int:
+    """Pages the table alone occupies for `line_items` rows"""
+    first = max_rows(True) - 1
+    other = max_rows(False) - 1
+    if rows_per_page:
+        first, other = min(first, rows_per_page), min(other, rows_per_page)
+    if line_items <= first:
+        return 1
+    return 1 + math.ceil((line_items - first) / other)
@@ -1,2 +1,5 @@
 """Invoice QC Service - PDF Extraction and Validation System"""
 __version__ = "1.0.0"
+
+# Bump whenever extractor output changes so cached extractions are invalidated
+EXTRACTOR_VERSION = "3"
@@ -0,0 +1,64 @@
+"""Shared executor that keeps CPU-bound extraction off the event loop"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+from invoice_qc import metrics
+
+# "process" sidesteps the GIL for pdfminer layout; "thread" avoids worker start-up cost
+EXECUTOR_KIND = os.environ.get("INVOICE_QC_EXECUTOR", "process")
+EXECUTOR_WORKERS = int(os.environ.get("INVOICE_QC_WORKERS", "0")) or os.cpu_count() or 1
+
+_executor: Optional[Executor] = None
+
+
+def get_executor() -> Executor:
+    """Return the process-wide extraction executor, creating it on first use"""
+    global _executor
+    if _executor is None:
+        if EXECUTOR_KIND == "thread":
+            _executor = ThreadPoolExecutor(
+                max_workers=EXECUTOR_WORKERS, thread_name_prefix="invoice-qc-extract"
+            )
+        elif EXECUTOR_KIND == "process":
+            # Never fork a process that is already running server threads
+            _executor = ProcessPoolExecutor(
+                max_workers=EXECUTOR_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            raise ValueError(f"Unknown INVOICE_QC_EXECUTOR: {EXECUTOR_KIND}")
+    return _executor
+
+
+def shares_memory() -> bool:
+    """Whether the executor's workers can read the caller's objects, such as open files, in place"""
+    return EXECUTOR_KIND == "thread"
+
+
+def shutdown_executor() -> None:
+    """Stop the extraction executor, waiting for running jobs"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+async def run_in_executor(fn: Callable[..., Any], *args: Any, trace: Optional[List[Dict]] = None) -> Any:
+    """Run a blocking function on the extraction executor and await its result
+    
+    When `trace` is a list, the worker's trace events are appended to it.
+    """
+    loop = asyncio.get_running_loop()
+    if not metrics.enabled and trace is None:
+        return await loop.run_in_executor(get_executor(), partial(fn, *args))
+    # Workers hand their stage timings back so they land in this process's /metrics
+    result, samples, events = await loop.run_in_executor(
+        get_executor(), partial(metrics.collect, fn, *args, trace=trace is not None)
+    )
+    if metrics.enabled:
+        metrics.store.merge(samples)
+    if trace is not None:
+        trace.extend(events)
+    return result
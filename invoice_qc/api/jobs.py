@@ -0,0 +1,187 @@
+"""In-process job queue for asynchronous batch extraction"""
+import asyncio
+import json
+import os
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from invoice_qc.duplicates import DuplicateIndex
+from invoice_qc.records import InvoiceRecord, to_result
+from invoice_qc.schemas import JobStatus, ValidationResult
+from invoice_qc.store import ResultStore
+from invoice_qc.streams import event_record
+from invoice_qc.validator import build_report, validate_batch
+
+JOB_RUNNERS = int(os.environ.get("INVOICE_QC_JOB_RUNNERS", "2"))
+MAX_RETAINED_JOBS = int(os.environ.get("INVOICE_QC_MAX_JOBS", "1000"))
+
+# Coroutine that turns uploaded PDF bytes into its InvoiceRecords (several for a split consolidated PDF)
+Extractor = Callable[[bytes], Awaitable[List[InvoiceRecord]]]
+
+
+class Job:
+    """A batch of uploaded PDFs whose results accumulate as files finish"""
+
+    def __init__(
+        self,
+        files: List[Tuple[str, bytes]],
+        duplicates: Optional[DuplicateIndex] = None,
+        store: Optional[ResultStore] = None
+    ):
+        self.job_id = uuid.uuid4().hex
+        self.status = "queued"
+        self.files = files
+        self.total_files = len(files)
+        self.processed_files = 0
+        self.results: List[ValidationResult] = []
+        self.changed = asyncio.Condition()
+        # Duplicates are found across the files of a job, and across runs with a shared index
+        self.duplicates = duplicates if duplicates is not None else DuplicateIndex()
+        self.store = store
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    async def add_results(self, results: List[ValidationResult]):
+        """Record the results of one processed file"""
+        async with self.changed:
+            self.results.extend(results)
+            self.processed_files += 1
+            self.changed.notify_all()
+
+    async def finish(self, status: str):
+        async with self.changed:
+            self.status = status
+            # Uploaded bytes are no longer needed once every file is processed
+            self.files = []
+            self.changed.notify_all()
+
+    def snapshot(self) -> JobStatus:
+        valid_count = sum(1 for r in self.results if r.is_valid)
+        return JobStatus(
+            job_id=self.job_id,
+            status=self.status,
+            total_files=self.total_files,
+            processed_files=self.processed_files,
+            valid_invoices=valid_count,
+            invalid_invoices=len(self.results) - valid_count,
+            results=list(self.results)
+        )
+
+    async def events(self) -> AsyncIterator[Tuple[str, dict]]:
+        """Yield each result as it finishes, then the QC report summary"""
+        sent = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: len(self.results) > sent or self.done)
+                pending = self.results[sent:]
+                finished = self.done
+            for result in pending:
+                yield "result", result.model_dump(mode="json")
+            sent += len(pending)
+            if finished and sent == len(self.results):
+                break
+        
+        summary = build_report(self.results).model_dump(mode="json", exclude={"results"})
+        summary["status"] = self.status
+        yield "summary", summary
+
+
+def _validate_and_store(job: Job, invoices: List[InvoiceRecord]) -> List[ValidationResult]:
+    results = [to_result(record) for record in validate_batch(invoices, job.duplicates, job.store)]
+    if job.store is not None:
+        job.store.commit()
+    return results
+
+
+async def _process_file(job: Job, name: str, content: bytes, extract: Extractor):
+    try:
+        invoices = await extract(content)
+        # Validation, duplicate lookups and the store commit block, so they run off the event loop
+        results = await run_in_threadpool(_validate_and_store, job, invoices)
+    except Exception as e:
+        results = [ValidationResult(
+            invoice_number="UNKNOWN",
+            is_valid=False,
+            errors=[f"Extraction failed for {name}: {e}"]
+        )]
+    await job.add_results(results)
+
+
+class JobManager:
+    """Queue of submitted jobs drained by a fixed pool of runner tasks"""
+
+    def __init__(self, runners: int = JOB_RUNNERS, max_jobs: int = MAX_RETAINED_JOBS):
+        self.runners = runners
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop = None
+
+    def _ensure_runners(self):
+        # Runners are bound to the loop serving requests and started on first use
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._tasks = [loop.create_task(self._run()) for _ in range(self.runners)]
+
+    async def _run(self):
+        while True:
+            job, extract = await self._queue.get()
+            try:
+                job.status = "running"
+                # Files of one job are extracted concurrently; results stream in completion order
+                await asyncio.gather(
+                    *(_process_file(job, name, content, extract) for name, content in job.files)
+                )
+                await job.finish("completed")
+            except Exception:
+                await job.finish("failed")
+            finally:
+                self._queue.task_done()
+
+    def submit(
+        self,
+        files: List[Tuple[str, bytes]],
+        extract: Extractor,
+        duplicates: Optional[DuplicateIndex] = None,
+        store: Optional[ResultStore] = None
+    ) -> Job:
+        """Queue a batch of uploaded files and return its job immediately"""
+        self._ensure_runners()
+        job = Job(files, duplicates, store)
+        self.jobs[job.job_id] = job
+        self._prune()
+        self._queue.put_nowait((job, extract))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def _prune(self):
+        # Forget the oldest finished jobs once too many are retained
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.done]:
+            if len(self.jobs) <= self.max_jobs:
+                break
+            del self.jobs[job_id]
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+
+def format_event(event: str, data: dict, media_type: str) -> str:
+    """Encode a job event as an NDJSON line or a server-sent event"""
+    if media_type == "text/event-stream":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps(event_record(event, data)) + "\n"
+
+
+job_manager = JobManager()
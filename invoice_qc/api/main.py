@@ -1,9 +1,34 @@
 """FastAPI main application"""
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from invoice_qc import metrics
+from invoice_qc.api.executor import shutdown_executor
+from invoice_qc.api.jobs import job_manager
+from invoice_qc.api import routes
 from invoice_qc.api.routes import router
 
+# Set INVOICE_QC_METRICS=0 to leave the extractor and validator uninstrumented
+METRICS_ENABLED = os.environ.get("INVOICE_QC_METRICS", "1") != "0"
+if METRICS_ENABLED:
+    metrics.enable()
+
+# Prometheus text exposition format
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop job runners and extraction workers with the server
+    await job_manager.shutdown()
+    shutdown_executor()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Invoice QC Service - AI-Powered B2B Invoice Processing Platform",
     description="""
 # AI-Powered B2B Invoice Extraction & Validation System
@@ -62,10 +87,35 @@ Production-ready Python system for automated invoice processing with intelligent
         {
             "name": "Extraction",
             "description": "PDF processing - Extract and validate invoices from uploaded PDF files"
+        },
+        {
+            "name": "Jobs",
+            "description": "Batch jobs - Submit large PDF batches and poll or stream results as they finish"
+        },
+        {
+            "name": "Monitoring",
+            "description": "Prometheus metrics - Stage latency histograms, throughput counters and in-flight requests"
         }
     ]
 )
 
+
+class InFlightMiddleware:
+    """Count HTTP requests being served, including streaming responses until they finish"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        metrics.store.track_in_flight(1)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            metrics.store.track_in_flight(-1)
+
+
 # CORS middleware for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -75,6 +125,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(InFlightMiddleware)
+
 app.include_router(router)
 
 
@@ -83,5 +135,43 @@ def root():
     return {
         "service": "Invoice QC Service",
         "version": "1.0.0",
-        "endpoints": ["/health", "/validate-json", "/extract-and-validate"]
+        "endpoints": ["/health", "/validate-json", "/validate-ndjson", "/extract-and-validate", "/jobs", "/cache/stats", "/rules/stats", "/metrics", "/traces/{trace_id}"]
     }
+
+
+@app.get(
+    "/metrics",
+    tags=["Monitoring"],
+    summary="Prometheus Metrics",
+    response_class=PlainTextResponse
+)
+def prometheus_metrics():
+    """
+    ## Prometheus Metrics
+    
+    Scrape endpoint in the Prometheus text format.
+    
+    ### Exposed Metrics
+    - **invoice_qc_stage_seconds**: Histogram per `stage` - `pdf_open`, `text_extraction`,
+      `table_extraction`, `field_parsing`, `validation`, `serialization`
+    - **invoice_qc_files_total** / **invoice_qc_bytes_total** / **invoice_qc_pages_total**: Uploaded PDFs, their size and pages opened
+    - **invoice_qc_cache_hits_total** / **invoice_qc_cache_misses_total**: Extraction cache lookups
+    - **invoice_qc_rule_failures_total**: Failures per validation `rule`
+    - **invoice_qc_requests_in_flight**: Requests currently being served
+    
+    Stage timings are only recorded while `INVOICE_QC_METRICS` is not `0`.
+    """
+    cache = routes.get_extraction_cache().stats()
+    rules = routes.rule_registry.stats()
+    lines = [metrics.store.render().rstrip("\n")]
+    lines.extend(metrics.format_family(
+        "invoice_qc_cache_hits_total", "counter", "Uploads served from the extraction cache", [({}, cache["hits"])]
+    ))
+    lines.extend(metrics.format_family(
+        "invoice_qc_cache_misses_total", "counter", "Uploads that required extraction", [({}, cache["misses"])]
+    ))
+    lines.extend(metrics.format_family(
+        "invoice_qc_rule_failures_total", "counter", "Invoices failing each validation rule",
+        [({"rule": rule["rule"]}, rule["failures"]) for rule in rules]
+    ))
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=METRICS_MEDIA_TYPE)
@@ -0,0 +1,165 @@
+"""Streaming NDJSON validation - results flow back while the request body is still arriving"""
+import asyncio
+import tempfile
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from invoice_qc import metrics
+from invoice_qc.api.jobs import format_event
+from invoice_qc.duplicates import DuplicateIndex
+from invoice_qc.records import ResultRecord
+from invoice_qc.schemas import Invoice
+from invoice_qc.store import ResultStore
+from invoice_qc.streams import MAX_LINE_BYTES, aiter_lines
+from invoice_qc.validator import COLUMNAR_THRESHOLD, validate_batch
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Lines parsed and validated together; bounds the invoices held per request
+STREAM_BATCH = COLUMNAR_THRESHOLD
+
+# Unread results kept in memory before spilling to a temporary file
+SPOOL_MEMORY_BYTES = 4 * 1024 * 1024
+SPOOL_READ_BYTES = 64 * 1024
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse that can send while the endpoint still reads the request body
+    
+    Starlette otherwise listens for a disconnect on receive() while streaming,
+    which would swallow body chunks. A disconnect still ends request.stream().
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+class ResultSpool:
+    """Append-only byte buffer between the request body reader and the response
+    
+    Writes never wait for the client, so a client that sends its whole body
+    before reading the response cannot stall the request. Unread output past
+    SPOOL_MEMORY_BYTES spills to disk; a client that keeps up never gets there.
+    """
+
+    def __init__(self, max_memory: int = SPOOL_MEMORY_BYTES):
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        self._read = 0
+        self._written = 0
+        self._closed = False
+        self._ready = asyncio.Event()
+
+    def write(self, data: bytes):
+        self._file.seek(self._written)
+        self._file.write(data)
+        self._written += len(data)
+        self._ready.set()
+
+    def close(self):
+        """Mark the end of output; chunks() finishes once it has been read"""
+        self._closed = True
+        self._ready.set()
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        try:
+            while True:
+                if self._read < self._written:
+                    self._file.seek(self._read)
+                    data = self._file.read(min(self._written - self._read, SPOOL_READ_BYTES))
+                    self._read += len(data)
+                    yield data
+                elif self._closed:
+                    return
+                else:
+                    # Fully drained: start over so the buffer only ever holds unread output
+                    self._file.seek(0)
+                    self._file.truncate()
+                    self._read = self._written = 0
+                    self._ready.clear()
+                    await self._ready.wait()
+        finally:
+            self._file.close()
+
+
+def describe_invalid_line(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, e['loc']))}: {e['msg']}" if e["loc"] else e["msg"]
+        for e in error.errors()
+    )
+
+
+def validate_lines(
+    lines: List[Tuple[int, Optional[bytes]]],
+    duplicates: DuplicateIndex,
+    store: Optional[ResultStore] = None
+) -> List[ResultRecord]:
+    """Parse and validate a batch of NDJSON lines, one result per line in input order"""
+    parsed = []
+    for line_number, line in lines:
+        if line is None:
+            parsed.append(ResultRecord("UNKNOWN", False, [f"Line {line_number}: longer than {MAX_LINE_BYTES} bytes"]))
+            continue
+        try:
+            parsed.append(Invoice.model_validate_json(line))
+        except ValidationError as e:
+            parsed.append(ResultRecord("UNKNOWN", False, [f"Line {line_number}: {describe_invalid_line(e)}"]))
+    
+    checked = iter(validate_batch([item for item in parsed if isinstance(item, Invoice)], duplicates, store))
+    if store is not None:
+        store.commit()
+    return [item if isinstance(item, ResultRecord) else next(checked) for item in parsed]
+
+
+async def iter_batches(items: AsyncIterator, size: int) -> AsyncIterator[list]:
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def stream_validation(
+    chunks: AsyncIterator[bytes],
+    duplicates: DuplicateIndex,
+    store: Optional[ResultStore] = None
+) -> AsyncIterator[bytes]:
+    """Yield NDJSON result lines for an NDJSON body of invoices, then a summary line
+    
+    The body is read and validated STREAM_BATCH lines at a time on a separate
+    task, so at most one batch of invoices is held however large the body is.
+    """
+    spool = ResultSpool()
+
+    async def produce():
+        total = 0
+        valid = 0
+        try:
+            async for batch in iter_batches(aiter_lines(chunks), STREAM_BATCH):
+                results = await run_in_threadpool(validate_lines, batch, duplicates, store)
+                total += len(results)
+                valid += sum(result.is_valid for result in results)
+                with metrics.stage("serialization"):
+                    data = "".join(
+                        format_event("result", result.as_dict(), NDJSON_MEDIA_TYPE) for result in results
+                    ).encode()
+                spool.write(data)
+            spool.write(format_event("summary", {
+                "total_invoices": total,
+                "valid_invoices": valid,
+                "invalid_invoices": total - valid,
+            }, NDJSON_MEDIA_TYPE).encode())
+        finally:
+            spool.close()
+    
+    producer = asyncio.create_task(produce())
+    try:
+        async for data in spool.chunks():
+            yield data
+        # Surface a failed read (e.g. client disconnect) instead of ending quietly
+        await producer
+    finally:
+        producer.cancel()
@@ -1,14 +1,172 @@
 """API routes for invoice QC operations"""
-from typing import List
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from invoice_qc.schemas import Invoice, QCReport
-from invoice_qc.validator import validate_invoices
-from invoice_qc.extractor import extract_invoice_from_pdf
-import tempfile
+import asyncio
 import os
+import time
+from datetime import date
+from functools import lru_cache, partial
+from typing import BinaryIO, Dict, List, Literal, Optional, Union
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from invoice_qc import metrics
+from invoice_qc.api.executor import run_in_executor, shares_memory
+from invoice_qc.api.jobs import format_event, job_manager
+from invoice_qc.api.ndjson import NDJSON_MEDIA_TYPE, DuplexStreamingResponse, stream_validation
+from invoice_qc.cache import ExtractionCache, cache_invoices, cache_key, cached_invoices
+from invoice_qc.duplicates import DEFAULT_DUPLICATE_INDEX, DuplicateIndex
+from invoice_qc.records import InvoiceLike, InvoiceRecord, to_invoice, to_result
+from invoice_qc.rules import registry as rule_registry
+from invoice_qc.schemas import ExtractionOptions, Invoice, JobStatus, QCReport, ResultPage, StoredResult
+from invoice_qc.store import DEFAULT_PAGE_SIZE, DEFAULT_RESULT_STORE, MAX_PAGE_SIZE, ResultStore, StoredRecord
+from invoice_qc.tracing import TraceStore, chrome_trace
+from invoice_qc.validator import validate_invoices
+from invoice_qc.extractor import ExtractionLimitExceeded, extract_invoices_from_pdf
 
 router = APIRouter()
 
+# Send this request header (any value but "0") to trace a request; the response
+# names the trace in TRACE_ID_HEADER and GET /traces/{id} returns it
+TRACE_HEADER = "X-Invoice-QC-Trace"
+TRACE_ID_HEADER = "X-Invoice-QC-Trace-Id"
+TRACE_HEADER_HELP = "Record a Chrome trace of this request, served at /traces/{id}"
+
+trace_store = TraceStore()
+
+# INVOICE_QC_BOUNDED=1, or either ceiling, extracts uploads one page at a time;
+# uploads over a ceiling are rejected with 413
+_MAX_PAGES = os.environ.get("INVOICE_QC_MAX_PAGES")
+_MAX_MEMORY_MB = os.environ.get("INVOICE_QC_MAX_MEMORY_MB")
+# INVOICE_QC_ENGINE picks the default line-item engine, overridden per request by ?engine=
+EXTRACTION_OPTIONS = ExtractionOptions(
+    bounded=os.environ.get("INVOICE_QC_BOUNDED", "0") != "0",
+    max_pages=int(_MAX_PAGES) if _MAX_PAGES else None,
+    max_memory_mb=float(_MAX_MEMORY_MB) if _MAX_MEMORY_MB else None,
+    engine=os.environ.get("INVOICE_QC_ENGINE", "full")
+)
+SPLIT_OPTIONS = EXTRACTION_OPTIONS.model_copy(update={"split": True})
+SPLIT_HELP = "Split consolidated PDFs into one invoice per page range ('Page 1 of N' or a new invoice number)"
+ENGINE_HELP = (
+    "Line-item engine: 'full' (tables), 'text' (text rows) or 'auto' (text, tables if the items"
+    " do not add up to net_total); each result names the engine used"
+)
+Engine = Optional[Literal["full", "text", "auto"]]
+
+
+@lru_cache(maxsize=None)
+def get_extraction_cache() -> ExtractionCache:
+    """Process-wide extraction cache, opened on first use"""
+    return ExtractionCache()
+
+
+@lru_cache(maxsize=None)
+def get_duplicate_index() -> Optional[DuplicateIndex]:
+    """Process-wide persistent duplicate index when INVOICE_QC_DUPLICATE_INDEX is set"""
+    return DuplicateIndex(DEFAULT_DUPLICATE_INDEX) if DEFAULT_DUPLICATE_INDEX else None
+
+
+@lru_cache(maxsize=None)
+def get_result_store() -> Optional[ResultStore]:
+    """Process-wide result store when INVOICE_QC_STORE is set"""
+    return ResultStore(DEFAULT_RESULT_STORE) if DEFAULT_RESULT_STORE else None
+
+
+def require_result_store() -> ResultStore:
+    store = get_result_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="Result store not enabled; set INVOICE_QC_STORE")
+    return store
+
+
+def validate_and_store(invoices: List[InvoiceLike], trace: Optional[List[Dict]] = None) -> QCReport:
+    """Validate a request's invoices, recording them in the result store when one is enabled
+    
+    Blocking; async routes run it with run_in_threadpool. Spans go to `trace`
+    from the thread that validates.
+    """
+    store = get_result_store()
+    with metrics.trace_into(trace):
+        qc_report = validate_invoices(invoices, get_duplicate_index(), store)
+    if store is not None:
+        store.commit()
+    return qc_report
+
+
+def new_trace(header: Optional[str]) -> Optional[List[Dict]]:
+    """An empty trace event list if the request asked to be traced, else None"""
+    return [] if header and header != "0" else None
+
+
+def read_upload(upload: BinaryIO) -> bytes:
+    upload.seek(0)
+    return upload.read()
+
+
+async def extract_content(
+    content: Union[bytes, BinaryIO],
+    trace: Optional[List[Dict]] = None,
+    split: bool = False,
+    engine: Engine = None
+) -> List[InvoiceRecord]:
+    """Extract an uploaded PDF on the executor, consulting the cache first
+    
+    `content` is the PDF's bytes or the upload's spooled file. Returns the
+    PDF's invoice, or with `split` one invoice per page range.
+    """
+    options = SPLIT_OPTIONS if split else EXTRACTION_OPTIONS
+    if engine is not None:
+        options = options.model_copy(update={"engine": engine})
+    cache = get_extraction_cache()
+    size = len(content) if isinstance(content, bytes) else content.seek(0, os.SEEK_END)
+    metrics.count("files")
+    metrics.count("bytes", size)
+    start = time.perf_counter()
+    
+    def lookup():
+        key = cache_key(content, options)
+        return key, cached_invoices(cache, key, options)
+    
+    # Re-uploaded PDFs are served from the cache without extraction; hashing the
+    # upload and the SQLite reads and writes run off the event loop
+    key, invoices = await run_in_threadpool(lookup)
+    cached = invoices is not None
+    if invoices is None:
+        if not isinstance(content, bytes) and not shares_memory():
+            # Worker processes are sent the PDF pickled, so only they need its bytes
+            content = await run_in_threadpool(read_upload, content)
+        # Uploads are parsed from memory or their spooled file, never copied to disk
+        invoices = await run_in_executor(extract_invoices_from_pdf, content, options, trace=trace)
+        await run_in_threadpool(cache_invoices, cache, key, invoices, options)
+    if trace is not None:
+        # Includes the wait for a worker, unlike the spans recorded inside it
+        args = {"bytes": size, "cached": cached}
+        trace.append(metrics.span_event("document", start, time.perf_counter(), args))
+    return invoices
+
+
+def report_response(report: QCReport, trace: Optional[List[Dict]] = None) -> Response:
+    """Serialize a QC report up front, timed as the serialization stage"""
+    with metrics.trace_into(trace), metrics.stage("serialization"):
+        body = report.model_dump_json()
+    response = Response(body, media_type="application/json")
+    if trace is not None:
+        response.headers[TRACE_ID_HEADER] = trace_store.add(trace)
+    return response
+
+
+async def extract_uploads(
+    files: List[UploadFile],
+    trace: Optional[List[Dict]] = None,
+    split: bool = False,
+    engine: Engine = None
+) -> List[InvoiceRecord]:
+    """Extract uploaded PDFs concurrently without blocking the event loop
+    
+    Each upload's spooled file is passed on as is, so no request holds all
+    of its uploads in memory at once.
+    """
+    extracted = await asyncio.gather(*(extract_content(file.file, trace, split, engine) for file in files))
+    return [invoice for invoices in extracted for invoice in invoices]
+
 
 @router.get(
     "/health",
@@ -49,7 +207,10 @@ def health_check():
     summary="Validate Invoice JSON",
     response_description="Comprehensive validation report"
 )
-def validate_json(invoices: List[Invoice]):
+def validate_json(
+    invoices: List[Invoice],
+    trace: Optional[str] = Header(None, alias=TRACE_HEADER, description=TRACE_HEADER_HELP)
+):
     """
     ## Validate Invoice JSON Data
     
@@ -73,7 +234,9 @@ def validate_json(invoices: List[Invoice]):
     
     **4. Anomaly Detection**
     - No negative amounts allowed
-    - Duplicate invoice detection
+    - Duplicate invoice detection: same seller and invoice number is an error,
+      same seller, date and gross total a warning. Checked within the request,
+      and across requests when `INVOICE_QC_DUPLICATE_INDEX` names an index file
     
     ### Request Body
     Array of invoice objects with fields:
@@ -122,12 +285,46 @@ def validate_json(invoices: List[Invoice]):
     ```
     """
     try:
-        qc_report = validate_invoices(invoices)
-        return qc_report
+        events = new_trace(trace)
+        qc_report = validate_and_store(invoices, events)
+        return report_response(qc_report, events)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post(
+    "/validate-ndjson",
+    tags=["Validation"],
+    summary="Validate Streamed NDJSON Invoices",
+    response_description="NDJSON feed of per-invoice results and a summary"
+)
+async def validate_ndjson(request: Request):
+    """
+    ## Validate Streamed NDJSON Invoices
+    
+    Streaming variant of `/validate-json` for large exports. Send one invoice
+    object per line (`Content-Type: application/x-ndjson`); invoices are parsed
+    and validated in batches as the body arrives, and one `result` event per
+    line is streamed back in input order, followed by a `summary` event.
+    Memory stays bounded however large the body is.
+    
+    Lines that are not valid invoices produce a failing result naming the line
+    number instead of rejecting the whole request. Duplicates are detected
+    across the whole stream, as in `/validate-json`.
+    
+    ### NDJSON Example
+    ```
+    {"event": "result", "data": {"invoice_number": "INV-001", "is_valid": true, "errors": [], "warnings": []}}
+    {"event": "result", "data": {"invoice_number": "UNKNOWN", "is_valid": false, "errors": ["Line 2: invoice_number: Field required"], "warnings": []}}
+    {"event": "summary", "data": {"total_invoices": 2, "valid_invoices": 1, "invalid_invoices": 1}}
+    ```
+    """
+    duplicates = get_duplicate_index() or DuplicateIndex()
+    return DuplexStreamingResponse(
+        stream_validation(request.stream(), duplicates, get_result_store()), media_type=NDJSON_MEDIA_TYPE
+    )
+
+
 @router.post(
     "/extract-and-validate",
     response_model=QCReport,
@@ -139,7 +336,10 @@ async def extract_and_validate_pdfs(
     files: List[UploadFile] = File(
         ...,
         description="Upload one or more PDF invoice files (supports multiple files)"
-    )
+    ),
+    split: bool = Query(False, description=SPLIT_HELP),
+    engine: Engine = Query(None, description=ENGINE_HELP),
+    trace: Optional[str] = Header(None, alias=TRACE_HEADER, description=TRACE_HEADER_HELP)
 ):
     """
     ## Extract and Validate PDF Invoices
@@ -227,28 +427,286 @@ async def extract_and_validate_pdfs(
     - Processing time: <2 seconds per invoice
     - Success rate: 80%+ on standard formats
     - Concurrent processing supported
+    
+    ### Tracing
+    Send `X-Invoice-QC-Trace: 1` to record per-page, per-stage, per-regex and
+    per-rule spans. The response carries `X-Invoice-QC-Trace-Id`; fetch the
+    Chrome trace from `GET /traces/{trace_id}`.
+    
+    ### Large PDFs
+    With `INVOICE_QC_BOUNDED=1`, `INVOICE_QC_MAX_PAGES` or `INVOICE_QC_MAX_MEMORY_MB`
+    set, uploads are extracted one page at a time; a PDF over either ceiling is
+    rejected with `413`. With `?split=true` a consolidated PDF is split into one
+    invoice per page range, each validated and reported separately.
+    
+    ### Line-Item Engines
+    `?engine=text` parses line items from text rows instead of detecting
+    tables; `?engine=auto` does so too, but re-reads the tables of any invoice
+    whose text rows do not add up to its net total. Each result's `engine`
+    names the engine that produced its line items (`full` or `text`).
     """
     try:
-        invoices = []
+        events = new_trace(trace)
+        invoices = await extract_uploads(files, events, split, engine)
         
-        for file in files:
-            # Save uploaded file temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                content = await file.read()
-                tmp.write(content)
-                tmp_path = tmp.name
-            
-            try:
-                # Extract invoice
-                invoice = extract_invoice_from_pdf(tmp_path)
-                invoices.append(invoice)
-            finally:
-                # Clean up temp file
-                os.unlink(tmp_path)
-        
-        # Validate all invoices
-        qc_report = validate_invoices(invoices)
-        return qc_report
+        # Validation, duplicate lookups and the store commit block, so they run off the event loop
+        qc_report = await run_in_threadpool(validate_and_store, invoices, events)
+        return report_response(qc_report, events)
         
+    except ExtractionLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post(
+    "/jobs",
+    response_model=JobStatus,
+    status_code=202,
+    tags=["Jobs"],
+    summary="Submit Extraction Job",
+    response_description="Queued job with its id"
+)
+async def submit_job(
+    files: List[UploadFile] = File(
+        ...,
+        description="Upload one or more PDF invoice files (supports large batches)"
+    ),
+    split: bool = Query(False, description=SPLIT_HELP),
+    engine: Engine = Query(None, description=ENGINE_HELP)
+):
+    """
+    ## Submit a Batch Extraction Job
+    
+    Queue PDF invoices for extraction and validation and return immediately
+    with a job id, so large batches never hit client or proxy timeouts.
+    
+    ### Following Up
+    - `GET /jobs/{job_id}` - poll status and the results finished so far
+    - `GET /jobs/{job_id}/stream` - receive each result as soon as it is ready
+    
+    With `?split=true` each consolidated PDF contributes one result per invoice it holds,
+    and `?engine=` picks the line-item engine as for `/extract-and-validate`.
+    
+    ### Example Response
+    ```json
+    {
+        "job_id": "3f2c...",
+        "status": "queued",
+        "total_files": 200,
+        "processed_files": 0,
+        "valid_invoices": 0,
+        "invalid_invoices": 0,
+        "results": []
+    }
+    ```
+    """
+    uploads = [(file.filename or "upload.pdf", await file.read()) for file in files]
+    job = job_manager.submit(
+        uploads, partial(extract_content, split=split, engine=engine), get_duplicate_index(), get_result_store()
+    )
+    return job.snapshot()
+
+
+def get_job_or_404(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=JobStatus,
+    tags=["Jobs"],
+    summary="Get Job Status",
+    response_description="Job progress and results so far"
+)
+def get_job(job_id: str):
+    """
+    ## Poll an Extraction Job
+    
+    ### Returns
+    - **status**: `queued`, `running`, `completed` or `failed`
+    - **processed_files** / **total_files**: Progress of the batch
+    - **results**: Validation results in the order files finished
+    """
+    return get_job_or_404(job_id).snapshot()
+
+
+@router.get(
+    "/jobs/{job_id}/stream",
+    tags=["Jobs"],
+    summary="Stream Job Results",
+    response_description="NDJSON or server-sent events feed"
+)
+async def stream_job(
+    job_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$", description="ndjson or sse")
+):
+    """
+    ## Stream Job Results
+    
+    Emits one `result` event per `ValidationResult` as each file finishes,
+    followed by a final `summary` event with the QC report totals. Results
+    already finished before connecting are replayed first.
+    
+    ### NDJSON Example
+    ```
+    {"event": "result", "data": {"invoice_number": "INV-001", "is_valid": true, "errors": [], "warnings": []}}
+    {"event": "summary", "data": {"total_invoices": 1, "valid_invoices": 1, "invalid_invoices": 0, "status": "completed"}}
+    ```
+    """
+    job = get_job_or_404(job_id)
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    
+    async def body():
+        async for event, data in job.events():
+            yield format_event(event, data, media_type)
+    
+    return StreamingResponse(body(), media_type=media_type)
+
+
+def stored_result(stored: StoredRecord) -> StoredResult:
+    return StoredResult(
+        id=stored.id,
+        stored_at=stored.stored_at,
+        invoice=to_invoice(stored.invoice),
+        result=to_result(stored.result)
+    )
+
+
+@router.get(
+    "/results",
+    response_model=ResultPage,
+    tags=["Results"],
+    summary="Query Stored Results",
+    response_description="One page of stored invoices and results"
+)
+def query_results(
+    invoice_number: Optional[str] = Query(None, description="Only this invoice number"),
+    seller_name: Optional[str] = Query(None, description="Only this seller (case-insensitive)"),
+    date_from: Optional[date] = Query(None, description="Only invoices dated on or after this day"),
+    date_to: Optional[date] = Query(None, description="Only invoices dated on or before this day"),
+    is_valid: Optional[bool] = Query(None, description="Only valid or only invalid invoices"),
+    error: Optional[str] = Query(None, description="Only invoices with an error containing this text"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Results per page"),
+    cursor: Optional[int] = Query(None, description="next_cursor of the previous page")
+):
+    """
+    ## Query Stored Results
+    
+    With `INVOICE_QC_STORE` naming an SQLite file, every invoice validated by
+    the API (and by CLI runs given `--store`) is recorded with its latest
+    result. Filters combine, and each is answered from an index, so lookups
+    take milliseconds however many invoices are stored.
+    
+    ### Pagination
+    Results come in the order they were first stored. Pass the response's
+    `next_cursor` as `?cursor=` to get the next page; it is `null` on the last.
+    
+    ### Example
+    `GET /results?seller_name=ABC%20Corporation&is_valid=false&date_from=2024-05-01&date_to=2024-05-31`
+    ```json
+    {
+        "results": [
+            {
+                "id": 42,
+                "stored_at": 1716372000.0,
+                "invoice": {"invoice_number": "INV-001", "seller_name": "ABC Corporation", "...": "..."},
+                "result": {"invoice_number": "INV-001", "is_valid": false, "errors": ["Missing buyer_name"], "warnings": []}
+            }
+        ],
+        "next_cursor": 42
+    }
+    ```
+    """
+    page, next_cursor = require_result_store().query(
+        invoice_number=invoice_number, seller_name=seller_name, date_from=date_from, date_to=date_to,
+        is_valid=is_valid, error=error, limit=limit, cursor=cursor
+    )
+    return ResultPage(results=[stored_result(stored) for stored in page], next_cursor=next_cursor)
+
+
+@router.get(
+    "/results/{result_id}",
+    response_model=StoredResult,
+    tags=["Results"],
+    summary="Get Stored Result",
+    response_description="A stored invoice and its result"
+)
+def get_stored_result(result_id: int):
+    """
+    ## Get a Stored Result
+    
+    Returns one invoice and its latest validation result by the `id` shown in `/results`.
+    """
+    stored = require_result_store().get(result_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail=f"Result not found: {result_id}")
+    return stored_result(stored)
+
+
+@router.get(
+    "/cache/stats",
+    tags=["Extraction"],
+    summary="Extraction Cache Statistics",
+    response_description="Cache hit/miss counters and size"
+)
+def cache_stats():
+    """
+    ## Extraction Cache Statistics
+    
+    PDFs are cached by the SHA-256 of their content and the extractor version,
+    so re-uploaded invoices skip PDF parsing entirely.
+    
+    ### Returns
+    - **hits**: Uploads served from the cache since the server started
+    - **misses**: Uploads that required extraction
+    - **entries**: Invoices currently cached
+    - **bytes**: Size of the cached payloads
+    """
+    return get_extraction_cache().stats()
+
+
+@router.get(
+    "/rules/stats",
+    tags=["Validation"],
+    summary="Validation Rule Statistics",
+    response_description="Per-rule invocation, failure and timing counters"
+)
+def rules_stats():
+    """
+    ## Validation Rule Statistics
+    
+    Rules run in a compiled plan ordered by their dependencies. A rule is
+    skipped when a field it requires is missing or a rule it depends on failed.
+    
+    ### Returns
+    One entry per rule, in plan order:
+    - **invocations** / **failures** / **skipped**: Counts since the server started
+    - **mean_us**: Average time per invocation, sampled
+    - **total_ms**: Estimated cumulative time
+    """
+    return rule_registry.stats()
+
+
+@router.get(
+    "/traces/{trace_id}",
+    tags=["Monitoring"],
+    summary="Get Request Trace",
+    response_description="Chrome trace-event JSON"
+)
+def get_trace(trace_id: str):
+    """
+    ## Get a Request Trace
+    
+    Returns the trace recorded for a request sent with the `X-Invoice-QC-Trace`
+    header, in the Chrome trace-event format. Save it and open it in
+    `chrome://tracing` or https://ui.perfetto.dev. Only the most recent
+    100 traces are kept.
+    """
+    events = trace_store.get(trace_id)
+    if events is None:
+        raise HTTPException(status_code=404, detail=f"Trace not found: {trace_id}")
+    return chrome_trace(events)
@@ -0,0 +1,181 @@
+"""Persistent extraction cache keyed by PDF content hash"""
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+from invoice_qc import EXTRACTOR_VERSION
+from invoice_qc.records import InvoiceRecord, invoice_from_json, invoice_to_json
+from invoice_qc.templates import get_registry
+
+if TYPE_CHECKING:
+    from invoice_qc.schemas import ExtractionOptions
+
+DEFAULT_CACHE_PATH = os.environ.get("INVOICE_QC_CACHE", ".invoice_qc_cache/extraction.db")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# ExtractionOptions fields that change what is extracted; resource limits such
+# as max_pages or max_memory_mb only decide whether extraction finishes
+OUTPUT_OPTIONS = {"lazy", "line_items", "split", "engine"}
+
+
+def extractor_fingerprint(options: Optional["ExtractionOptions"] = None) -> str:
+    """Identifies the extractor version, templates and options that produced an invoice"""
+    fingerprint = f"{EXTRACTOR_VERSION}:{get_registry().digest}"
+    if options is None:
+        return fingerprint
+    output = options.model_dump_json(include=OUTPUT_OPTIONS)
+    if output != type(options)().model_dump_json(include=OUTPUT_OPTIONS):
+        fingerprint += ":" + hashlib.sha256(output.encode()).hexdigest()[:8]
+    return fingerprint
+
+
+def cache_key(data, options: Optional["ExtractionOptions"] = None) -> str:
+    """Content address of PDF bytes, any buffer or a binary file, for the current extractor and templates"""
+    if isinstance(data, io.IOBase):
+        # Files, such as spooled uploads, are hashed in chunks rather than read whole
+        data.seek(0)
+        digest = hashlib.file_digest(data, "sha256")
+    else:
+        digest = hashlib.sha256(data)
+    return f"{digest.hexdigest()}:{extractor_fingerprint(options)}"
+
+
+def cached_invoices(
+    cache: "ExtractionCache",
+    key: str,
+    options: Optional["ExtractionOptions"] = None
+) -> Optional[List[InvoiceRecord]]:
+    """Every invoice cached for one PDF, whether or not it was split into several"""
+    if options is not None and options.split:
+        return cache.get_many(key)
+    invoice = cache.get(key)
+    return None if invoice is None else [invoice]
+
+
+def cache_invoices(
+    cache: "ExtractionCache",
+    key: str,
+    invoices: List[InvoiceRecord],
+    options: Optional["ExtractionOptions"] = None
+):
+    """Store what cached_invoices reads back for the same options"""
+    if options is not None and options.split:
+        cache.put_many(key, invoices)
+    else:
+        cache.put(key, invoices[0])
+
+
+class ExtractionCache:
+    """SQLite-backed store of serialized invoices with LRU eviction by size"""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: Optional[int] = None
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS invoices ("
+            " key TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON invoices(last_access)")
+        self._total_bytes, self._entries = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM invoices"
+        ).fetchone()
+
+    def get(self, key: str) -> Optional[InvoiceRecord]:
+        """Return the cached invoice for `key`, counting a hit or a miss"""
+        payload = self._get_payload(key)
+        return None if payload is None else invoice_from_json(payload)
+
+    def get_many(self, key: str) -> Optional[List[InvoiceRecord]]:
+        """Return the invoices cached for a consolidated PDF with put_many"""
+        payload = self._get_payload(key)
+        if payload is None:
+            return None
+        return [InvoiceRecord.from_dict(record) for record in json.loads(payload)]
+
+    def put(self, key: str, invoice: InvoiceRecord) -> None:
+        """Store an invoice and evict least recently used entries over the limits"""
+        self._put_payload(key, invoice_to_json(invoice))
+
+    def put_many(self, key: str, invoices: List[InvoiceRecord]) -> None:
+        """Store every invoice segmented from one PDF under a single entry"""
+        records = [invoice.as_dict() for invoice in invoices]
+        self._put_payload(key, json.dumps(records, separators=(",", ":"), ensure_ascii=False))
+
+    def _get_payload(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM invoices WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            
+            self.hits += 1
+            self._conn.execute("UPDATE invoices SET last_access = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def _put_payload(self, key: str, payload: str) -> None:
+        size = len(payload)
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM invoices WHERE key = ?", (key,)).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+                self._entries -= 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO invoices (key, payload, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, size, time.time())
+            )
+            self._total_bytes += size
+            self._entries += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._entries > 1 and (
+            self._total_bytes > self.max_bytes
+            or (self.max_entries is not None and self._entries > self.max_entries)
+        ):
+            key, size = self._conn.execute(
+                "SELECT key, size FROM invoices ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            self._conn.execute("DELETE FROM invoices WHERE key = ?", (key,))
+            self._total_bytes -= size
+            self._entries -= 1
+
+    def clear(self) -> None:
+        """Remove every cached invoice"""
+        with self._lock:
+            self._conn.execute("DELETE FROM invoices")
+            self._total_bytes = 0
+            self._entries = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current cache size"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": self._entries,
+            "bytes": self._total_bytes,
+        }
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,95 +1,504 @@
-"""CLI tool for invoice extraction and validation"""
+"""CLI tool for invoice extraction and validation
+
+Only light modules are imported here. pdfplumber, Pydantic, the rule engine and
+the profiler are imported inside the commands that use them, so `--help` and
+`validate` start without loading the PDF stack.
+"""
 import json
-from pathlib import Path
+import os
+from collections import Counter
+from functools import partial
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple, Union
 import typer
-from invoice_qc.extractor import extract_from_directory, extract_invoice_from_pdf
-from invoice_qc.validator import validate_invoices
-from invoice_qc.schemas import Invoice
+from invoice_qc import metrics
+from invoice_qc.cache import DEFAULT_CACHE_PATH, ExtractionCache
+from invoice_qc.duplicates import DEFAULT_DUPLICATE_INDEX, DuplicateIndex
+from invoice_qc.records import InvoiceRecord, ResultRecord
+from invoice_qc.store import DEFAULT_PAGE_SIZE, DEFAULT_RESULT_STORE, ResultStore
+from invoice_qc.streams import NdjsonWriter, event_record, is_ndjson, open_text, read_ndjson
+from invoice_qc.watch import DEFAULT_BATCH_SECONDS, DEFAULT_BATCH_SIZE, DEFAULT_POLL_INTERVAL, DEFAULT_SETTLE
+
+if TYPE_CHECKING:
+    from datetime import date
+    from invoice_qc.schemas import ExtractionOptions, Invoice
+
+# Plain click help: rendering it with rich would import rich on every --help
+app = typer.Typer(rich_markup_mode=None)
+
+WORKERS_HELP = "Extraction worker processes (0 = one per CPU)"
+TIMEOUT_HELP = "Per-file extraction timeout in seconds"
+INPUT_HELP = "Input invoices (.json array, or .ndjson/.jsonl optionally .gz/.zst)"
+OUTPUT_HELP = "Output invoices (.json array, or .ndjson/.jsonl optionally .gz/.zst)"
+REPORT_HELP = "Output QC report (.json, or streamed .ndjson/.jsonl optionally .gz/.zst)"
+CACHE_HELP = "Extraction cache database (keyed by PDF content hash)"
+NO_CACHE_HELP = "Always re-extract PDFs, bypassing the cache"
+LAZY_HELP = "Read header/totals regions only, stopping once all fields are found"
+NO_LINE_ITEMS_HELP = "Skip line-item table extraction"
+BOUNDED_HELP = "Hold one page of each PDF in memory at a time and report peak memory per document"
+MAX_PAGES_HELP = "Skip PDFs with more pages than this (implies --bounded)"
+MAX_MEMORY_HELP = "Skip PDFs that grow memory by more than this many MB (implies --bounded)"
+SPLIT_HELP = "Split consolidated PDFs into one invoice per page range (at 'Page 1 of N' or a new invoice number)"
+ENGINE_HELP = (
+    "Line-item engine: full (table detection), text (text rows, no table detection) or"
+    " auto (text, falling back to tables when the items do not add up to net_total)"
+)
+ENGINES = ("full", "text", "auto")
+RULE_STATS_HELP = "Print per-rule invocation, failure and timing counters"
+DUPLICATE_INDEX_HELP = "Duplicate index file shared across runs (default: only within this run)"
+INCREMENTAL_HELP = "Only re-extract changed PDFs and re-validate when the rules changed"
+MANIFEST_HELP = "Manifest of processed files for --incremental (default: <report>.manifest)"
+STORE_HELP = "SQLite result store that also records every invoice and result, for the query command"
+QUERY_STORE_HELP = "SQLite result store written by --store (default: INVOICE_QC_STORE)"
+WATCH_REPORT_HELP = (
+    "Rolling report (.json rewritten per batch, or .ndjson/.jsonl appended); strftime fields"
+    " such as %Y%m%d start a new file when they change"
+)
+PROCESSED_DIR_HELP = "Where reported PDFs are moved (default: <watch-dir>/processed)"
+FAILED_DIR_HELP = "Where PDFs that could not be extracted are moved (default: <watch-dir>/failed)"
+MAX_IN_FLIGHT_HELP = "Most PDFs submitted to the workers at once; the rest wait their turn (0 = twice the workers)"
+SETTLE_HELP = "Seconds a PDF's size and mtime must hold still before it is picked up"
+POLL_INTERVAL_HELP = "Seconds between directory listings when inotify is unavailable"
+NO_INOTIFY_HELP = "Poll the directory even where inotify is available"
+BATCH_SIZE_HELP = "Write results once this many PDFs are done"
+BATCH_SECONDS_HELP = "Write results at least this often while PDFs are being processed"
+PROFILE_HELP = "Write a Chrome trace of every document to this file (extracts serially, bypassing the cache)"
+PROFILE_TOP_HELP = "With --profile, also dump cProfile stats for the N slowest documents to <profile>.profiles/"
+
+
+def open_cache(cache: str, no_cache: bool) -> Optional[ExtractionCache]:
+    """Open the extraction cache unless disabled"""
+    return None if no_cache else ExtractionCache(cache)
+
+
+def echo_cache_stats(cache: Optional[ExtractionCache]):
+    """Print cache hit/miss counters"""
+    if cache is not None:
+        stats = cache.stats()
+        typer.echo(f"  Cache: {stats['hits']} hits, {stats['misses']} misses")
+
+
+def write_invoices(invoices: Iterable[InvoiceRecord], output: str) -> int:
+    """Write invoices one record at a time as NDJSON lines or an indented JSON array"""
+    if is_ndjson(output):
+        with NdjsonWriter(output) as writer:
+            for invoice in invoices:
+                writer.write(invoice.as_dict())
+        return writer.count
+    
+    count = 0
+    with open_text(output, 'w') as f:
+        for invoice in invoices:
+            record = json.dumps(invoice.as_dict(), indent=2)
+            f.write("[\n  " if count == 0 else ",\n  ")
+            f.write(record.replace("\n", "\n  "))
+            count += 1
+        f.write("\n]" if count else "[]")
+    
+    return count
+
+
+def read_invoices(input: str) -> Iterator["Invoice"]:
+    """Yield invoices from an NDJSON stream or a JSON array file"""
+    from invoice_qc.schemas import Invoice
+    if is_ndjson(input):
+        for record in read_ndjson(input):
+            yield Invoice(**record)
+        return
+    
+    with open_text(input) as f:
+        invoices_data = json.load(f)
+    for inv in invoices_data:
+        yield Invoice(**inv)
+
+
+def write_report(results: Iterable[ResultRecord], report: str) -> Tuple[int, int]:
+    """Write validation results to the report, returning (total, valid) counts
+    
+    NDJSON reports are written as each result arrives, with a final summary
+    line, so memory stays constant; JSON reports hold the full QCReport.
+    """
+    if not is_ndjson(report):
+        from invoice_qc.validator import build_report
+        qc_report = build_report(list(results))
+        with open_text(report, 'w') as f:
+            json.dump(qc_report.model_dump(mode='json'), f, indent=2)
+        return qc_report.total_invoices, qc_report.valid_invoices
+    
+    total = 0
+    valid = 0
+    with NdjsonWriter(report) as writer:
+        for result in results:
+            writer.write(event_record("result", result.as_dict()))
+            total += 1
+            valid += result.is_valid
+        writer.write(event_record("summary", {
+            "total_invoices": total,
+            "valid_invoices": valid,
+            "invalid_invoices": total - valid,
+        }))
+    return total, valid
+
+
+def open_store(store: Optional[str]) -> Optional[ResultStore]:
+    """Open the result store when a path is given"""
+    return ResultStore(store) if store else None
+
+
+def close_store(store: Optional[ResultStore]):
+    """Commit and close the result store, if one was opened"""
+    if store is not None:
+        total = len(store)
+        store.close()
+        typer.echo(f"  Result store: {total} invoices in {store.path}")
+
+
+def parse_date_option(value: Optional[str], name: str) -> Optional["date"]:
+    """Parse a YYYY-MM-DD option, rejecting anything else"""
+    from datetime import date
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise typer.BadParameter(f"{name} must be a date in YYYY-MM-DD form, not {value!r}")
+
+
+def echo_memory_stats(options: "ExtractionOptions"):
+    """Print the largest memory growth of one document in a bounded run"""
+    from invoice_qc.memory import MB
+    if options.is_bounded:
+        typer.echo(f"  Peak memory per document: {metrics.store.peak_memory / MB:.1f} MB")
+
+
+def check_engine(engine: str):
+    """Reject an unknown --engine before any PDF is opened"""
+    if engine not in ENGINES:
+        raise typer.BadParameter(f"--engine must be one of {', '.join(ENGINES)}, not {engine!r}")
+
+
+def extraction_options(**flags) -> "ExtractionOptions":
+    """ExtractionOptions from command-line flags, rejecting conflicting flags before any PDF is opened"""
+    from pydantic import ValidationError
+    from invoice_qc.schemas import ExtractionOptions
+    try:
+        return ExtractionOptions(**flags)
+    except ValidationError as e:
+        raise typer.BadParameter("; ".join(error["msg"].removeprefix("Value error, ") for error in e.errors()))
 
-app = typer.Typer()
+
+def count_engines(
+    items: Iterable[Union[InvoiceRecord, ResultRecord]],
+    counts: Counter
+) -> Iterator[Union[InvoiceRecord, ResultRecord]]:
+    """Pass invoices or results through, counting the line-item engine of each"""
+    for item in items:
+        counts[item.engine] += 1
+        yield item
+
+
+def echo_engine_stats(counts: Counter, options: "ExtractionOptions"):
+    """Print how many invoices each line-item engine produced, unless only tables were used"""
+    if options.engine != "full":
+        used = ", ".join(f"{count} {engine}" for engine, count in counts.most_common() if engine)
+        typer.echo(f"  Line-item engines: {used or 'none'}")
+
+
+def echo_rule_stats():
+    """Print the rule counters collected during this run, slowest first"""
+    from invoice_qc.rules import registry as rule_registry
+    typer.echo("  Rule stats:")
+    for stats in sorted(rule_registry.stats(), key=lambda r: r["total_ms"], reverse=True):
+        typer.echo(
+            f"    {stats['rule']:<18} {stats['invocations']:>8} run {stats['failures']:>8} failed"
+            f" {stats['skipped']:>8} skipped {stats['total_ms']:>10.3f} ms"
+        )
+
+
+def write_profile(events: List[dict], profile: str, profile_top: int, options: "ExtractionOptions"):
+    """Save the run's trace, then cProfile the slowest documents"""
+    from invoice_qc.extractor import extract_invoice_from_pdf
+    from invoice_qc.tracing import document_durations, profile_slowest, write_chrome_trace
+    write_chrome_trace(profile, events)
+    durations = document_durations(events)
+    typer.echo(f"  Trace of {len(durations)} documents saved to {profile}")
+    if profile_top:
+        directory = f"{profile}.profiles"
+        paths = profile_slowest(durations, partial(extract_invoice_from_pdf, options=options), profile_top, directory)
+        typer.echo(f"  Slowest documents (cProfile stats in {directory}):")
+        for document in sorted(durations, key=durations.get, reverse=True)[:len(paths)]:
+            typer.echo(f"    {durations[document] * 1000:>10.1f} ms  {document}")
+
+
+def echo_summary(total: int, valid: int, report: str):
+    """Print validation totals"""
+    typer.echo(f"✓ Validation complete:")
+    typer.echo(f"  Total: {total}")
+    typer.echo(f"  Valid: {valid}")
+    typer.echo(f"  Invalid: {total - valid}")
+    typer.echo(f"  Report saved to {report}")
 
 
 @app.command()
 def extract(
     pdf_dir: str = typer.Option(..., help="Directory containing PDF files"),
-    output: str = typer.Option(..., help="Output JSON file path")
+    output: str = typer.Option(..., help=OUTPUT_HELP),
+    workers: int = typer.Option(1, help=WORKERS_HELP),
+    timeout: Optional[float] = typer.Option(None, help=TIMEOUT_HELP),
+    cache: str = typer.Option(DEFAULT_CACHE_PATH, help=CACHE_HELP),
+    no_cache: bool = typer.Option(False, "--no-cache", help=NO_CACHE_HELP),
+    lazy: bool = typer.Option(False, "--lazy", help=LAZY_HELP),
+    no_line_items: bool = typer.Option(False, "--no-line-items", help=NO_LINE_ITEMS_HELP),
+    bounded: bool = typer.Option(False, "--bounded", help=BOUNDED_HELP),
+    max_pages: Optional[int] = typer.Option(None, help=MAX_PAGES_HELP),
+    max_memory_mb: Optional[float] = typer.Option(None, help=MAX_MEMORY_HELP),
+    split: bool = typer.Option(False, "--split", help=SPLIT_HELP),
+    engine: str = typer.Option("full", help=ENGINE_HELP),
+    profile: Optional[str] = typer.Option(None, help=PROFILE_HELP),
+    profile_top: int = typer.Option(0, help=PROFILE_TOP_HELP)
 ):
     """Extract invoices from PDFs to JSON"""
+    check_engine(engine)
+    from invoice_qc.extractor import iter_extract_from_directory
     typer.echo(f"Extracting invoices from {pdf_dir}...")
+    # Traces are recorded in this process, so every document is extracted here
+    events = [] if profile else None
+    if profile:
+        workers, no_cache = 1, True
+    extraction_cache = open_cache(cache, no_cache)
     
-    invoices = extract_from_directory(pdf_dir)
-    
-    # Convert to dict
-    invoices_dict = [inv.model_dump(mode='json') for inv in invoices]
+    # Invoices are streamed to disk as workers finish them
+    options = extraction_options(
+        lazy=lazy, line_items=not no_line_items,
+        bounded=bounded, max_pages=max_pages, max_memory_mb=max_memory_mb, split=split, engine=engine
+    )
+    if options.is_bounded:
+        # Peak memory per document is reported through the metrics store
+        metrics.enable()
+    invoices = iter_extract_from_directory(
+        pdf_dir, workers=workers, timeout=timeout, cache=extraction_cache, options=options
+    )
+    engines = Counter()
+    with metrics.trace_into(events):
+        count = write_invoices(count_engines(invoices, engines), output)
     
-    # Save to file
-    output_path = Path(output)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    with open(output, 'w') as f:
-        json.dump(invoices_dict, f, indent=2)
-    
-    typer.echo(f"✓ Extracted {len(invoices)} invoices to {output}")
+    typer.echo(f"✓ Extracted {count} invoices to {output}")
+    echo_cache_stats(extraction_cache)
+    echo_memory_stats(options)
+    echo_engine_stats(engines, options)
+    if profile:
+        write_profile(events, profile, profile_top, options)
 
 
 @app.command()
 def validate(
-    input: str = typer.Option(..., help="Input JSON file with invoices"),
-    report: str = typer.Option(..., help="Output QC report JSON file")
+    input: str = typer.Option(..., help=INPUT_HELP),
+    report: str = typer.Option(..., help=REPORT_HELP),
+    rule_stats: bool = typer.Option(False, "--rule-stats", help=RULE_STATS_HELP),
+    duplicate_index: Optional[str] = typer.Option(DEFAULT_DUPLICATE_INDEX, help=DUPLICATE_INDEX_HELP),
+    store: Optional[str] = typer.Option(DEFAULT_RESULT_STORE, help=STORE_HELP)
 ):
     """Validate invoices from JSON and generate QC report"""
+    from invoice_qc.validator import iter_validate
     typer.echo(f"Validating invoices from {input}...")
+    duplicates = DuplicateIndex(duplicate_index)
+    result_store = open_store(store)
     
-    # Load invoices
-    with open(input, 'r') as f:
-        invoices_data = json.load(f)
-    
-    invoices = [Invoice(**inv) for inv in invoices_data]
+    # Invoices are validated in fixed-size chunks as they are read; NDJSON never holds the batch
+    results = iter_validate(read_invoices(input), duplicates=duplicates, store=result_store)
+    total, valid = write_report(results, report)
+    duplicates.close()
     
-    # Validate
-    qc_report = validate_invoices(invoices)
-    
-    # Save report
-    report_path = Path(report)
-    report_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    with open(report, 'w') as f:
-        json.dump(qc_report.model_dump(mode='json'), f, indent=2)
-    
-    typer.echo(f"✓ Validation complete:")
-    typer.echo(f"  Total: {qc_report.total_invoices}")
-    typer.echo(f"  Valid: {qc_report.valid_invoices}")
-    typer.echo(f"  Invalid: {qc_report.invalid_invoices}")
-    typer.echo(f"  Report saved to {report}")
+    echo_summary(total, valid, report)
+    close_store(result_store)
+    if rule_stats:
+        echo_rule_stats()
 
 
 @app.command()
 def full_run(
     pdf_dir: str = typer.Option(..., help="Directory containing PDF files"),
-    report: str = typer.Option(..., help="Output QC report JSON file")
+    report: str = typer.Option(..., help=REPORT_HELP),
+    workers: int = typer.Option(1, help=WORKERS_HELP),
+    timeout: Optional[float] = typer.Option(None, help=TIMEOUT_HELP),
+    cache: str = typer.Option(DEFAULT_CACHE_PATH, help=CACHE_HELP),
+    no_cache: bool = typer.Option(False, "--no-cache", help=NO_CACHE_HELP),
+    lazy: bool = typer.Option(False, "--lazy", help=LAZY_HELP),
+    no_line_items: bool = typer.Option(False, "--no-line-items", help=NO_LINE_ITEMS_HELP),
+    bounded: bool = typer.Option(False, "--bounded", help=BOUNDED_HELP),
+    max_pages: Optional[int] = typer.Option(None, help=MAX_PAGES_HELP),
+    max_memory_mb: Optional[float] = typer.Option(None, help=MAX_MEMORY_HELP),
+    split: bool = typer.Option(False, "--split", help=SPLIT_HELP),
+    engine: str = typer.Option("full", help=ENGINE_HELP),
+    rule_stats: bool = typer.Option(False, "--rule-stats", help=RULE_STATS_HELP),
+    duplicate_index: Optional[str] = typer.Option(DEFAULT_DUPLICATE_INDEX, help=DUPLICATE_INDEX_HELP),
+    incremental: bool = typer.Option(False, "--incremental", help=INCREMENTAL_HELP),
+    manifest: Optional[str] = typer.Option(None, help=MANIFEST_HELP),
+    store: Optional[str] = typer.Option(DEFAULT_RESULT_STORE, help=STORE_HELP),
+    profile: Optional[str] = typer.Option(None, help=PROFILE_HELP),
+    profile_top: int = typer.Option(0, help=PROFILE_TOP_HELP)
 ):
     """Extract PDFs and validate in one step"""
+    from pathlib import Path
+    from invoice_qc.extractor import iter_extract_files
+    from invoice_qc.incremental import Manifest, iter_incremental
+    from invoice_qc.validator import validate_batch
+    if incremental and duplicate_index:
+        # The manifest already carries the keys of unchanged files, and a shared
+        # index would report every re-processed file as a copy of its old version
+        raise typer.BadParameter("--duplicate-index cannot be combined with --incremental")
+    if incremental and split:
+        # The manifest records one invoice per file
+        raise typer.BadParameter("--split cannot be combined with --incremental")
+    check_engine(engine)
     typer.echo(f"Running full pipeline on {pdf_dir}...")
+    events = [] if profile else None
+    if profile:
+        workers, no_cache = 1, True
+    extraction_cache = open_cache(cache, no_cache)
+    duplicates = DuplicateIndex(duplicate_index)
+    result_store = open_store(store)
+    options = extraction_options(
+        lazy=lazy, line_items=not no_line_items,
+        bounded=bounded, max_pages=max_pages, max_memory_mb=max_memory_mb, split=split, engine=engine
+    )
+    if options.is_bounded:
+        # Peak memory per document is reported through the metrics store
+        metrics.enable()
+    engines = Counter()
+    
+    if incremental:
+        # Unchanged files keep their previous results; only changes are processed
+        run_manifest = Manifest(manifest or f"{report}.manifest")
+        counts = {}
+        results = iter_incremental(
+            pdf_dir, run_manifest, workers=workers, timeout=timeout, cache=extraction_cache,
+            options=options, duplicates=duplicates, counts=counts, store=result_store
+        )
+        with metrics.trace_into(events):
+            total, valid = write_report(count_engines(results, engines), report)
+        run_manifest.close()
+        typer.echo(
+            f"✓ {counts['extracted']} extracted, {counts['revalidated']} re-validated,"
+            f" {counts['reused']} unchanged, {counts['removed']} removed"
+        )
+    else:
+        # Extract and validate each invoice as it arrives; naming its file lets a
+        # persistent duplicate index tell this folder processed again from a resend
+        extracted = iter_extract_files(
+            sorted(Path(pdf_dir).resolve().glob("*.pdf")),
+            workers=workers, timeout=timeout, cache=extraction_cache, options=options
+        )
+        results = (
+            validate_batch([invoice], duplicates, result_store, [str(pdf_file)])[0]
+            for pdf_file, invoice in extracted
+        )
+        with metrics.trace_into(events):
+            total, valid = write_report(count_engines(results, engines), report)
+        typer.echo(f"✓ Extracted {total} invoices")
+    duplicates.close()
     
-    # Extract
-    invoices = extract_from_directory(pdf_dir)
-    typer.echo(f"✓ Extracted {len(invoices)} invoices")
+    echo_cache_stats(extraction_cache)
+    echo_memory_stats(options)
+    echo_engine_stats(engines, options)
+    echo_summary(total, valid, report)
+    close_store(result_store)
+    if rule_stats:
+        echo_rule_stats()
+    if profile:
+        write_profile(events, profile, profile_top, options)
+
+
+@app.command()
+def watch(
+    watch_dir: str = typer.Option(..., help="Directory to watch for incoming PDF files"),
+    report: str = typer.Option(..., help=WATCH_REPORT_HELP),
+    processed_dir: Optional[str] = typer.Option(None, help=PROCESSED_DIR_HELP),
+    failed_dir: Optional[str] = typer.Option(None, help=FAILED_DIR_HELP),
+    workers: int = typer.Option(1, help=WORKERS_HELP),
+    max_in_flight: int = typer.Option(0, help=MAX_IN_FLIGHT_HELP),
+    settle: float = typer.Option(DEFAULT_SETTLE, help=SETTLE_HELP),
+    poll_interval: float = typer.Option(DEFAULT_POLL_INTERVAL, help=POLL_INTERVAL_HELP),
+    no_inotify: bool = typer.Option(False, "--no-inotify", help=NO_INOTIFY_HELP),
+    batch_size: int = typer.Option(DEFAULT_BATCH_SIZE, help=BATCH_SIZE_HELP),
+    batch_seconds: float = typer.Option(DEFAULT_BATCH_SECONDS, help=BATCH_SECONDS_HELP),
+    timeout: Optional[float] = typer.Option(None, help=TIMEOUT_HELP),
+    cache: str = typer.Option(DEFAULT_CACHE_PATH, help=CACHE_HELP),
+    no_cache: bool = typer.Option(False, "--no-cache", help=NO_CACHE_HELP),
+    lazy: bool = typer.Option(False, "--lazy", help=LAZY_HELP),
+    no_line_items: bool = typer.Option(False, "--no-line-items", help=NO_LINE_ITEMS_HELP),
+    split: bool = typer.Option(False, "--split", help=SPLIT_HELP),
+    engine: str = typer.Option("full", help=ENGINE_HELP),
+    duplicate_index: Optional[str] = typer.Option(DEFAULT_DUPLICATE_INDEX, help=DUPLICATE_INDEX_HELP),
+    store: Optional[str] = typer.Option(DEFAULT_RESULT_STORE, help=STORE_HELP)
+):
+    """Process PDFs as they arrive in a directory until interrupted"""
+    import signal
+    from invoice_qc.watch import WatchDaemon
+    check_engine(engine)
+    options = extraction_options(lazy=lazy, line_items=not no_line_items, split=split, engine=engine)
+    duplicates = DuplicateIndex(duplicate_index)
+    result_store = open_store(store)
+    daemon = WatchDaemon(
+        watch_dir, report, processed_dir=processed_dir, failed_dir=failed_dir,
+        workers=workers, max_in_flight=max_in_flight, settle=settle,
+        batch_size=batch_size, batch_seconds=batch_seconds, timeout=timeout,
+        cache=open_cache(cache, no_cache), options=options, duplicates=duplicates, store=result_store,
+        inotify=not no_inotify, poll_interval=poll_interval
+    )
     
-    # Validate
-    qc_report = validate_invoices(invoices)
+    def shut_down(signum, frame):
+        typer.echo("Stopping: finishing PDFs in flight (interrupt again to abort)...")
+        daemon.stop()
+        signal.signal(signum, signal.SIG_DFL)
     
-    # Save report
-    report_path = Path(report)
-    report_path.parent.mkdir(parents=True, exist_ok=True)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, shut_down)
+    typer.echo(f"Watching {watch_dir} (Ctrl-C to stop)...")
+    daemon.run()
+    duplicates.close()
     
-    with open(report, 'w') as f:
-        json.dump(qc_report.model_dump(mode='json'), f, indent=2)
+    counts = daemon.counts
+    typer.echo(
+        f"✓ Processed {counts['files']} PDFs ({counts['failed']} failed):"
+        f" {counts['invoices']} invoices, {counts['valid']} valid"
+    )
+    close_store(result_store)
+
+
+@app.command()
+def query(
+    store: Optional[str] = typer.Option(DEFAULT_RESULT_STORE, help=QUERY_STORE_HELP),
+    invoice_number: Optional[str] = typer.Option(None, help="Only this invoice number"),
+    seller: Optional[str] = typer.Option(None, help="Only this seller (case-insensitive)"),
+    date_from: Optional[str] = typer.Option(None, help="Only invoices dated on or after YYYY-MM-DD"),
+    date_to: Optional[str] = typer.Option(None, help="Only invoices dated on or before YYYY-MM-DD"),
+    valid: Optional[bool] = typer.Option(None, "--valid/--invalid", help="Only valid or only invalid invoices"),
+    error: Optional[str] = typer.Option(None, help="Only invoices with an error containing this text"),
+    limit: int = typer.Option(DEFAULT_PAGE_SIZE, help="Results per page (at most 1000)"),
+    cursor: Optional[int] = typer.Option(None, help="Continue after this result id, as printed by the previous page")
+):
+    """Print stored invoices and results matching the filters as NDJSON, one page at a time"""
+    if not store:
+        raise typer.BadParameter("--store is required unless INVOICE_QC_STORE is set")
+    if not os.path.exists(store):
+        # Opening a missing path would create an empty store
+        raise typer.BadParameter(f"No result store at {store}")
+    start = parse_date_option(date_from, "--date-from")
+    end = parse_date_option(date_to, "--date-to")
+    result_store = ResultStore(store)
+    page, next_cursor = result_store.query(
+        invoice_number=invoice_number, seller_name=seller, date_from=start, date_to=end,
+        is_valid=valid, error=error, limit=limit, cursor=cursor
+    )
+    result_store.close()
     
-    typer.echo(f"✓ Validation complete:")
-    typer.echo(f"  Total: {qc_report.total_invoices}")
-    typer.echo(f"  Valid: {qc_report.valid_invoices}")
-    typer.echo(f"  Invalid: {qc_report.invalid_invoices}")
-    typer.echo(f"  Report saved to {report}")
+    for stored in page:
+        typer.echo(json.dumps(stored.as_dict(), ensure_ascii=False))
+    # Progress goes to stderr so stdout stays valid NDJSON
+    if next_cursor is not None:
+        typer.echo(f"{len(page)} results; next page: --cursor {next_cursor}", err=True)
+    else:
+        typer.echo(f"{len(page)} results; no more pages", err=True)
 
 
 if __name__ == "__main__":
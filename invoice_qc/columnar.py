@@ -0,0 +1,196 @@
+"""Columnar batch validation - evaluates rules as NumPy masks over many invoices
+
+Produces exactly the same results as rules.validate_invoice. Values
+close enough to a tolerance that float rounding could flip the outcome are
+re-checked with the scalar rule, and messages are only built for failing rows.
+"""
+import time
+from typing import List, Optional, Sequence
+import numpy as np
+from invoice_qc.rules import ALLOWED_CURRENCIES, TOTAL_TOLERANCE, RuleRegistry
+from invoice_qc.records import InvoiceLike, ResultRecord
+
+# Rounding to cents moves a difference by at most 0.01 either way
+_ROUNDING_BAND = 0.011
+
+# The built-in rules this module re-implements, in plan order
+COLUMNAR_RULES = ("completeness", "currency", "totals", "due_date", "line_item_sum", "negative_amounts")
+
+
+def supports(registry: RuleRegistry) -> bool:
+    """True when a registry holds exactly the rules evaluated here"""
+    return tuple(rule.name for rule in registry.compile().rules) == COLUMNAR_RULES
+
+
+class InvoiceColumns:
+    """Invoice fields loaded once into column arrays with null masks"""
+
+    def __init__(self, invoices: Sequence[InvoiceLike]):
+        n = len(invoices)
+        self.size = n
+        self.invoice_number_missing = np.fromiter(
+            (not inv.invoice_number or inv.invoice_number == "UNKNOWN" for inv in invoices), bool, n
+        )
+        self.invoice_date_missing = np.fromiter((not inv.invoice_date for inv in invoices), bool, n)
+        self.seller_missing = np.fromiter((not inv.seller_name for inv in invoices), bool, n)
+        self.buyer_missing = np.fromiter((not inv.buyer_name for inv in invoices), bool, n)
+        self.currency = np.array([inv.currency or "" for inv in invoices], dtype=object)
+        self.currency_none = np.fromiter((inv.currency is None for inv in invoices), bool, n)
+        
+        self.net_total = self._amounts(inv.net_total for inv in invoices)
+        self.tax_amount = self._amounts(inv.tax_amount for inv in invoices)
+        self.gross_total = self._amounts(inv.gross_total for inv in invoices)
+        
+        self.invoice_date = self._days(inv.invoice_date for inv in invoices)
+        self.due_date = self._days(inv.due_date for inv in invoices)
+        
+        # Line totals flattened with per-invoice offsets
+        counts = np.fromiter((len(inv.line_items) for inv in invoices), np.int64, n)
+        self.line_counts = counts
+        self.line_totals = np.fromiter(
+            (item.line_total for inv in invoices for item in inv.line_items), float, int(counts.sum())
+        )
+        self.line_offsets = np.concatenate(([0], np.cumsum(counts)[:-1])) if n else counts
+
+    @staticmethod
+    def _amounts(values) -> np.ndarray:
+        # None becomes NaN so comparisons against it are always False
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+    @staticmethod
+    def _days(values) -> np.ndarray:
+        # Dates as day ordinals; None becomes NaN like the amounts
+        return np.array([np.nan if v is None else v.toordinal() for v in values], dtype=float)
+
+    def line_sums(self) -> np.ndarray:
+        sums = np.zeros(self.size)
+        has_items = self.line_counts > 0
+        if has_items.any():
+            sums[has_items] = np.add.reduceat(self.line_totals, self.line_offsets[has_items])
+        return sums
+
+
+def _exceeds_tolerance(diff: np.ndarray, band: np.ndarray, exact) -> np.ndarray:
+    """abs(diff) > tolerance, deferring to the exact scalar check inside the band"""
+    distance = np.abs(diff) - TOTAL_TOLERANCE
+    result = distance > band
+    for i in np.flatnonzero(np.abs(distance) <= band):
+        result[i] = exact(i)
+    return result
+
+
+def validate_columns(invoices: Sequence[InvoiceLike], registry: Optional[RuleRegistry] = None) -> List[ResultRecord]:
+    """Validate a batch of invoices with vectorized rule masks, adding to the registry's counters"""
+    cols = InvoiceColumns(invoices)
+    net, tax, gross = cols.net_total, cols.tax_amount, cols.gross_total
+    n = cols.size
+    clock = time.perf_counter
+    timings = {}
+    
+    start = clock()
+    incomplete = cols.invoice_number_missing | cols.invoice_date_missing | cols.seller_missing | cols.buyer_missing
+    timings["completeness"] = (np.ones(n, bool), incomplete, clock() - start)
+    
+    start = clock()
+    currency_invalid = (cols.currency != "") & ~np.isin(cols.currency, list(ALLOWED_CURRENCIES))
+    timings["currency"] = (~cols.currency_none, currency_invalid, clock() - start)
+    
+    start = clock()
+    totals_present = ~(np.isnan(net) | np.isnan(tax) | np.isnan(gross))
+    totals_mismatch = np.zeros(cols.size, bool)
+    if totals_present.any():
+        idx = np.flatnonzero(totals_present)
+
+        def exact_totals(i):
+            inv = invoices[idx[i]]
+            return abs(round(inv.net_total + inv.tax_amount, 2) - round(inv.gross_total, 2)) > TOTAL_TOLERANCE
+        
+        diff = (net[idx] + tax[idx]) - gross[idx]
+        totals_mismatch[idx] = _exceeds_tolerance(diff, np.full(len(idx), _ROUNDING_BAND), exact_totals)
+    timings["totals"] = (totals_present, totals_mismatch, clock() - start)
+    
+    start = clock()
+    due_before = cols.due_date < cols.invoice_date
+    timings["due_date"] = (~(np.isnan(cols.due_date) | np.isnan(cols.invoice_date)), due_before, clock() - start)
+    
+    start = clock()
+    line_check = (cols.line_counts > 0) & ~np.isnan(net)
+    line_mismatch = np.zeros(cols.size, bool)
+    if line_check.any():
+        idx = np.flatnonzero(line_check)
+        sums = cols.line_sums()[idx]
+
+        def exact_lines(i):
+            inv = invoices[idx[i]]
+            return abs(sum(item.line_total for item in inv.line_items) - inv.net_total) > TOTAL_TOLERANCE
+        
+        # Summation order only perturbs the last bits of the sum
+        band = 1e-9 * (1 + np.abs(sums) + np.abs(net[idx]))
+        line_mismatch[idx] = _exceeds_tolerance(sums - net[idx], band, exact_lines)
+    timings["line_item_sum"] = (~np.isnan(net), line_mismatch, clock() - start)
+    
+    start = clock()
+    negative_net, negative_tax, negative_gross = net < 0, tax < 0, gross < 0
+    timings["negative_amounts"] = (np.ones(n, bool), negative_net | negative_tax | negative_gross, clock() - start)
+    
+    if registry is not None:
+        for name, (ran, failed, seconds) in timings.items():
+            invocations = int(ran.sum())
+            registry.record_batch(name, invocations, int(failed.sum()), n - invocations, seconds)
+    
+    # Ordered as rules.validate_invoice emits its errors
+    masks = {
+        "invoice_number_missing": cols.invoice_number_missing,
+        "invoice_date_missing": cols.invoice_date_missing,
+        "seller_missing": cols.seller_missing,
+        "buyer_missing": cols.buyer_missing,
+        "currency_invalid": currency_invalid,
+        "totals_mismatch": totals_mismatch,
+        "due_before": due_before,
+        "negative_net": negative_net,
+        "negative_tax": negative_tax,
+        "negative_gross": negative_gross,
+    }
+    has_error = incomplete | currency_invalid | totals_mismatch | due_before | timings["negative_amounts"][1]
+    masks["line_mismatch"] = line_mismatch
+    needs_message = has_error | line_mismatch
+    
+    results = []
+    for i, invoice in enumerate(invoices):
+        if needs_message[i]:
+            results.append(_failing_result(invoice, i, masks))
+        else:
+            results.append(ResultRecord(invoice.invoice_number, True, engine=invoice.engine))
+    return results
+
+
+def _failing_result(invoice: InvoiceLike, i: int, masks: dict) -> ResultRecord:
+    """Build messages for one failing row, in the order rules.validate_invoice emits them"""
+    errors = []
+    warnings = []
+    
+    if masks["invoice_number_missing"][i]:
+        errors.append("Missing invoice_number")
+    if masks["invoice_date_missing"][i]:
+        errors.append("Missing invoice_date")
+    if masks["seller_missing"][i]:
+        errors.append("Missing seller_name")
+    if masks["buyer_missing"][i]:
+        errors.append("Missing buyer_name")
+    if masks["currency_invalid"][i]:
+        errors.append(f"Invalid currency: {invoice.currency}")
+    if masks["totals_mismatch"][i]:
+        errors.append(f"Total mismatch: net({invoice.net_total}) + tax({invoice.tax_amount}) != gross({invoice.gross_total})")
+    if masks["due_before"][i]:
+        errors.append("due_date is before invoice_date")
+    if masks["line_mismatch"][i]:
+        line_sum = sum(item.line_total for item in invoice.line_items)
+        warnings.append(f"Line items sum({line_sum}) != net_total({invoice.net_total})")
+    if masks["negative_net"][i]:
+        errors.append("Negative net_total")
+    if masks["negative_tax"][i]:
+        errors.append("Negative tax_amount")
+    if masks["negative_gross"][i]:
+        errors.append("Negative gross_total")
+    
+    return ResultRecord(invoice.invoice_number, not errors, errors, warnings, invoice.engine)
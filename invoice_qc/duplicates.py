@@ -0,0 +1,203 @@
+"""Duplicate invoice detection through a hash index of normalized keys"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from invoice_qc.records import InvoiceLike
+
+# Persistent index shared across runs; unset means duplicates are only found within a run
+DEFAULT_DUPLICATE_INDEX = os.environ.get("INVOICE_QC_DUPLICATE_INDEX")
+
+# Keys an in-memory index holds (about 24 MB); past that the oldest half is
+# forgotten, so streams and daemons stay bounded however long they run
+DEFAULT_MEMORY_KEYS = 200_000
+
+# SQLite's default limit on host parameters per statement is 999
+_QUERY_CHUNK = 900
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+
+def normalize_name(value: str) -> str:
+    """Case-fold and collapse punctuation/whitespace, e.g. 'ABC  Corp.' -> 'abc corp'"""
+    return _NON_ALNUM.sub(" ", value.casefold()).strip()
+
+
+def normalize_number(value: str) -> str:
+    """Keep only letters and digits, e.g. 'inv-001' and 'INV 001' -> 'inv001'"""
+    return _NON_ALNUM.sub("", value.casefold())
+
+
+def _hash(*parts: str) -> int:
+    digest = hashlib.blake2b("\x1f".join(parts).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def duplicate_keys(invoice: InvoiceLike) -> Tuple[Optional[int], Optional[int]]:
+    """64-bit keys for (seller, invoice_number) and (seller, date, gross_total), None when a part is missing"""
+    if not invoice.seller_name:
+        return None, None
+    seller = normalize_name(invoice.seller_name)
+    
+    exact = None
+    number = normalize_number(invoice.invoice_number or "")
+    if number and number != "unknown":
+        exact = _hash("exact", seller, number)
+    
+    near = None
+    if invoice.invoice_date and invoice.gross_total is not None:
+        near = _hash("near", seller, invoice.invoice_date.isoformat(), str(round(invoice.gross_total * 100)))
+    
+    return exact, near
+
+
+class DuplicateIndex:
+    """Keys of invoices seen so far, held in memory or in an SQLite file
+    
+    Each key maps to the invoice_number first seen with it. Lookups are
+    batched, so the on-disk index costs one indexed query per batch however
+    many invoices it already holds.
+    
+    In memory, at most `max_keys` keys are kept (None keeps every key): once
+    half of them are new, the older half is dropped, so duplicates are found
+    among at least the last max_keys / 2 keys. On disk every key is kept
+    with the source file of its invoice and the run that stored it: an
+    invoice read from the file an earlier run stored it from (the same
+    folder processed again) is not its own duplicate. The same invoice from
+    any other source, or with no source, is still reported.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_keys: Optional[int] = DEFAULT_MEMORY_KEYS):
+        self.path = path
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._memory: Dict[int, str] = {}
+        self._previous: Dict[int, str] = {}
+        self._conn = None
+        # Each index opened on the file is one run
+        self._run = uuid.uuid4().hex
+        if path:
+            if path != ":memory:":
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen ("
+                " key INTEGER PRIMARY KEY,"
+                " invoice_number TEXT NOT NULL,"
+                " source TEXT,"
+                " run TEXT) WITHOUT ROWID"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(seen)")}
+            # Index files written before sources were recorded; their keys always count as duplicates
+            for column in ("source", "run"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE seen ADD COLUMN {column} TEXT")
+
+    def _lookup(self, keys: List[int]) -> Dict[int, Tuple[str, Optional[str]]]:
+        """invoice_number per key seen, with its source file when an earlier run stored it"""
+        if self._conn is None:
+            found = {key: (self._previous[key], None) for key in keys if key in self._previous}
+            found.update((key, (self._memory[key], None)) for key in keys if key in self._memory)
+            return found
+        
+        found = {}
+        for i in range(0, len(keys), _QUERY_CHUNK):
+            chunk = keys[i:i + _QUERY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                "SELECT key, invoice_number, CASE WHEN run IS NOT ? THEN source END"
+                f" FROM seen WHERE key IN ({placeholders})", (self._run, *chunk)
+            )
+            found.update((key, (invoice_number, source)) for key, invoice_number, source in rows)
+        return found
+
+    def _store(self, entries: Dict[int, Tuple[str, Optional[str]]]):
+        if self._conn is None:
+            # Like INSERT OR IGNORE, the first invoice seen with a key is kept
+            for key, (invoice_number, _) in entries.items():
+                if key not in self._memory and key not in self._previous:
+                    self._memory[key] = invoice_number
+                    if self.max_keys is not None and len(self._memory) >= max(self.max_keys // 2, 1):
+                        self._previous, self._memory = self._memory, {}
+            return
+        self._conn.execute("BEGIN")
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO seen (key, invoice_number, source, run) VALUES (?, ?, ?, ?)",
+            ((key, invoice_number, source, self._run) for key, (invoice_number, source) in entries.items())
+        )
+        self._conn.execute("COMMIT")
+
+    def check(
+        self,
+        invoices: Sequence[InvoiceLike],
+        sources: Optional[Sequence[Optional[str]]] = None
+    ) -> List[Tuple[List[str], List[str]]]:
+        """Return (errors, warnings) per invoice and record the batch as seen
+        
+        `sources` names the file each invoice was read from, if any; only the
+        persistent index keeps them.
+        """
+        keys = [duplicate_keys(invoice) for invoice in invoices]
+        wanted = list({key for pair in keys for key in pair if key is not None})
+        if sources is None or self._conn is None:
+            sources = [None] * len(invoices)
+        
+        with self._lock:
+            seen = self._lookup(wanted)
+            added: Dict[int, Tuple[str, Optional[str]]] = {}
+            findings = []
+            for invoice, source, (exact, near) in zip(invoices, sources, keys):
+                errors, warnings = [], []
+                rerun = source is not None and any(
+                    key in seen and seen[key][1] == source for key in (exact, near)
+                )
+                if rerun:
+                    # Read again from the file an earlier run stored it from
+                    findings.append((errors, warnings))
+                    continue
+                if exact is not None:
+                    if exact in seen:
+                        errors.append(f"Duplicate invoice: {invoice.invoice_number} from {invoice.seller_name} already seen")
+                    else:
+                        added[exact] = (invoice.invoice_number, source)
+                        seen[exact] = (invoice.invoice_number, None)
+                if near is not None:
+                    if near in seen and not errors:
+                        warnings.append(
+                            f"Possible duplicate of {seen[near][0]}: same seller, invoice_date and gross_total"
+                        )
+                    elif near not in seen:
+                        added[near] = (invoice.invoice_number, source)
+                        seen[near] = (invoice.invoice_number, None)
+                findings.append((errors, warnings))
+            
+            if added:
+                self._store(added)
+        return findings
+
+    def remember(self, entries: Sequence[Tuple[str, Tuple[Optional[int], Optional[int]]]]):
+        """Record (invoice_number, keys) of invoices validated earlier, without checking them"""
+        added = {}
+        for invoice_number, pair in entries:
+            for key in pair:
+                if key is not None:
+                    added.setdefault(key, (invoice_number, None))
+        if added:
+            with self._lock:
+                self._store(added)
+
+    def __len__(self) -> int:
+        if self._conn is None:
+            return len(self._memory) + len(self._previous)
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
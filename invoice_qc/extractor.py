@@ -1,182 +1,928 @@
 """PDF extraction module - converts PDF invoices to JSON"""
+import io
+import mmap
+import os
 import re
-from datetime import datetime
+import signal
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import BinaryIO, Callable, List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
 import pdfplumber
-from invoice_qc.schemas import Invoice, LineItem
+from pdfminer.pdfpage import PDFPage
+from pdfplumber.page import Page
+from invoice_qc import metrics
+from invoice_qc.cache import ExtractionCache, cache_invoices, cache_key, cached_invoices
+from invoice_qc.formats import DocumentFormat, detect_format, get_format, value_format
+from invoice_qc.memory import MB, MemoryWatch
+from invoice_qc.records import InvoiceRecord, LineItemRecord
+from invoice_qc.rules import check_line_item_sum
+from invoice_qc.schemas import ExtractionOptions
+from invoice_qc.templates import AMOUNT_FIELDS, TEXT_FIELDS, VendorTemplate, get_registry
 
+# Anything extract_invoice_from_pdf can read a PDF from
+PdfSource = Union[str, Path, bytes, bytearray, memoryview, mmap.mmap, BinaryIO]
 
-def parse_date(date_str: str) -> str:
-    """Parse date from various formats"""
+
+# Everything but digits, separators and spaces, stripped from table cells before parsing
+_NON_NUMERIC = re.compile(r"[^\d,.\s]")
+
+
+def document_format(text: str, template: Optional[VendorTemplate] = None) -> DocumentFormat:
+    """Number and date conventions of a document: the template's, else those its text shows"""
+    if template is None:
+        return detect_format(text)
+    return detect_format(text, template.decimal_separator, template.date_order)
+
+
+def parse_date(date_str: str, fmt: Optional[DocumentFormat] = None) -> Optional[str]:
+    """Parse a numeric date to ISO format, day first unless `fmt` says otherwise"""
     if not date_str:
         return None
+    return (fmt or get_format()).parse_date(date_str)
+
+
+def parse_number(num_str: str, fmt: Optional[DocumentFormat] = None) -> float:
+    """Parse European and US number formats
+    
+    Without `fmt` a lone separator is the decimal one, so "1.080" is 1.08;
+    documents pass the format detected once for all their values.
+    """
+    return (fmt or value_format(num_str)).parse_number(num_str)
+
+
+def iter_page_content(
+    pdf,
+    template: Optional[VendorTemplate] = None,
+    pages: Optional[Iterable[Page]] = None,
+    tables: bool = True
+) -> Iterator[Tuple[VendorTemplate, str, List[list]]]:
+    """Lay out each page once and yield its text and tables, then free the page
     
-    formats = ["%d.%m.%Y", "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y"]
-    for fmt in formats:
+    Unless a template is given, it is picked from the first page's text and
+    its table settings are used for every page. `pages` defaults to pdf.pages.
+    Without `tables` no table detection runs and each page yields [].
+    """
+    for number, page in enumerate(pdf.pages if pages is None else pages, 1):
+        with open_page(page, number):
+            text = page_text(page)
+            if template is None:
+                template = get_registry().match(text)
+            found = page_tables(page, template) if tables else []
+        yield template, text, found
+
+
+def read_tables(pages: Iterable[Tuple[int, Page]], template: VendorTemplate) -> List[list]:
+    """Tables of the given (number, page) pairs, for the auto engine's fallback"""
+    tables = []
+    for number, page in pages:
+        with open_page(page, number):
+            tables.extend(page_tables(page, template))
+    return tables
+
+
+@contextmanager
+def open_page(page, number: int) -> Iterator[None]:
+    """Span the work on one page and free its cached layout afterwards"""
+    with metrics.span("page", number=number):
         try:
-            return datetime.strptime(date_str.strip(), fmt).date().isoformat()
-        except:
-            continue
+            if metrics.tracing:
+                # Lay the page out up front so traces show layout apart from text extraction
+                with metrics.span("layout"):
+                    page.objects
+            yield
+        finally:
+            page.close()
+
+
+def page_text(page) -> str:
+    # extract_text and extract_tables share the page's cached layout
+    with metrics.stage("text_extraction"):
+        return page.extract_text() or ""
+
+
+def page_tables(page, template: VendorTemplate) -> List[list]:
+    try:
+        with metrics.stage("table_extraction"):
+            return page.extract_tables(template.table_settings)
+    except Exception as e:
+        print(f"Error extracting tables: {e}")
+        return []
+
+
+def detect_currency(text: str) -> Optional[str]:
+    """Guess the currency from symbols and codes in the text"""
+    if "EUR" in text:
+        return "EUR"
+    elif "USD" in text or "$" in text:
+        return "USD"
+    elif "INR" in text or "₹" in text:
+        return "INR"
     return None
 
 
-def parse_number(num_str: str) -> float:
-    """Parse European and US number formats"""
-    # Remove spaces
-    num_str = num_str.replace(" ", "")
-    # Check if European format (1.080,00)
-    if "." in num_str and "," in num_str:
-        # European: remove dots, replace comma with dot
-        num_str = num_str.replace(".", "").replace(",", ".")
+def parse_invoice_fields(
+    text: str,
+    template: Optional[VendorTemplate] = None,
+    only: Optional[List[str]] = None,
+    fmt: Optional[DocumentFormat] = None
+) -> Dict[str, Any]:
+    """Parse header fields and totals from the invoice text with a vendor template
+    
+    `only` restricts parsing to the named fields; the rest are returned as None.
+    `fmt` is detected from the text when not given.
+    """
+    if template is None:
+        template = get_registry().match(text)
+    fmt = fmt or document_format(text, template)
+    wanted = set(only) if only is not None else set(TEXT_FIELDS + AMOUNT_FIELDS)
+    
+    def search(field: str) -> Optional[str]:
+        return template.search(field, text) if field in wanted else None
+    
+    seller_name = search("seller_name")
+    buyer_name = search("buyer_name")
+    currency = None
+    if "currency" in wanted:
+        currency = template.search("currency", text) or detect_currency(text)
+    
+    fields = {
+        "invoice_number": search("invoice_number"),
+        "invoice_date": parse_date(search("invoice_date"), fmt),
+        "seller_name": seller_name.strip() if seller_name else None,
+        "buyer_name": buyer_name.strip() if buyer_name else None,
+        "currency": currency,
+    }
+    
+    # Extract totals
+    for field in AMOUNT_FIELDS:
+        fields[field] = None
+        if field not in wanted:
+            continue
+        try:
+            value = template.search(field, text)
+            if value:
+                fields[field] = fmt.parse_number(value)
+        except Exception as e:
+            print(f"Error parsing {field}: {e}")
+    
+    return fields
+
+
+def parse_line_items(
+    tables: List[list],
+    template: Optional[VendorTemplate] = None,
+    fmt: Optional[DocumentFormat] = None
+) -> List[LineItemRecord]:
+    """Parse line items from extracted table rows, in `fmt` or the format the cells show"""
+    template = template or get_registry().default
+    if fmt is None:
+        fmt = document_format(" ".join(str(cell) for table in tables for row in table for cell in row), template)
+    columns = template.line_item_columns
+    line_items = []
+    for table in tables:
+        for row in table:
+            if row and len(row) >= template.min_columns:
+                try:
+                    # Try to parse quantity and price
+                    qty_str = str(row[columns["quantity"]])
+                    price_str = str(row[columns["unit_price"]])
+                    total_str = str(row[columns["line_total"]])
+                    
+                    # Skip if any value is None or empty
+                    if not qty_str or qty_str == 'None' or not price_str or price_str == 'None' or not total_str or total_str == 'None':
+                        continue
+                    
+                    # Clean and check if numeric
+                    qty_clean = _NON_NUMERIC.sub("", qty_str).strip()
+                    price_clean = _NON_NUMERIC.sub("", price_str).strip()
+                    total_clean = _NON_NUMERIC.sub("", total_str).strip()
+                    
+                    if qty_clean and price_clean and total_clean:
+                        qty = fmt.parse_number(qty_clean)
+                        price = fmt.parse_number(price_clean)
+                        total = fmt.parse_number(total_clean)
+                        
+                        line_items.append(LineItemRecord(
+                            description=str(row[columns["description"]]),
+                            quantity=qty,
+                            unit_price=price,
+                            line_total=total
+                        ))
+                except Exception as e:
+                    print(f"Error parsing line item: {e}")
+                    continue
+    return line_items
+
+
+def parse_text_line_items(
+    text: str,
+    template: Optional[VendorTemplate] = None,
+    fmt: Optional[DocumentFormat] = None
+) -> List[LineItemRecord]:
+    """Parse line items from text rows with the template's line-item patterns
+    
+    The first pattern matching any row is used for the whole text, so rows of
+    one layout are never mixed with another's. `fmt` is detected from the
+    text when not given.
+    """
+    template = template or get_registry().default
+    fmt = fmt or document_format(text, template)
+    for pattern in template.line_item_patterns:
+        line_items = []
+        for match in pattern.finditer(text):
+            try:
+                line_items.append(LineItemRecord(
+                    description=match["description"].strip(),
+                    quantity=fmt.parse_number(match["quantity"]),
+                    unit_price=fmt.parse_number(match["unit_price"]),
+                    line_total=fmt.parse_number(match["line_total"])
+                ))
+            except ValueError as e:
+                print(f"Error parsing line item: {e}")
+        if line_items:
+            return line_items
+    return []
+
+
+def line_items_add_up(line_items: List[LineItemRecord], net_total: Optional[float]) -> bool:
+    """Whether line items pass check_line_item_sum's cross-check against net_total
+    
+    The auto engine keeps text-parsed line items only if they do; with no
+    items or no net_total there is nothing to check, so it reads the tables.
+    """
+    if not line_items or net_total is None:
+        return False
+    return not check_line_item_sum(InvoiceRecord("", net_total=net_total, line_items=line_items))
+
+
+def needs_tables(engine: str, line_items: List[LineItemRecord], net_total: Optional[float]) -> bool:
+    """Whether the auto engine falls back to tables for these text-parsed line items"""
+    return engine == "auto" and not line_items_add_up(line_items, net_total)
+
+
+def reported_engine(engine: str) -> str:
+    """Engine named on an invoice whose line items were not re-read from tables"""
+    return "full" if engine == "full" else "text"
+
+
+def build_invoice(
+    fields: Dict[str, Any],
+    line_items: List[LineItemRecord],
+    engine: Optional[str] = "full"
+) -> InvoiceRecord:
+    """Assemble an InvoiceRecord from parsed header fields and line items"""
+    invoice_date = fields["invoice_date"]
+    return InvoiceRecord(
+        invoice_number=fields["invoice_number"] or "UNKNOWN",
+        invoice_date=date.fromisoformat(invoice_date) if invoice_date else None,
+        due_date=None,
+        seller_name=fields["seller_name"],
+        seller_address=None,
+        seller_tax_id=None,
+        buyer_name=fields["buyer_name"],
+        buyer_address=None,
+        buyer_tax_id=None,
+        currency=fields["currency"],
+        net_total=fields["net_total"],
+        tax_amount=fields["tax_amount"],
+        gross_total=fields["gross_total"],
+        engine=engine,
+        line_items=line_items
+    )
+
+
+@contextmanager
+def map_file(pdf_path: Union[str, Path]) -> Iterator[Union[mmap.mmap, bytes]]:
+    """Memory-map a local file read-only"""
+    with open(pdf_path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            yield f.read()
+            return
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def open_pdf(stream: Union[mmap.mmap, BinaryIO], count_pages: bool = True):
+    """pdfplumber.open, timed as the pdf_open stage and counted in pages
+    
+    Counting builds pdf.pages; bounded extraction counts pages as it reaches them.
+    """
+    with metrics.stage("pdf_open"):
+        pdf = pdfplumber.open(stream)
+        if count_pages:
+            metrics.count("pages", len(pdf.pages))
+    return pdf
+
+
+@contextmanager
+def open_pdf_stream(source: PdfSource) -> Iterator[Union[mmap.mmap, BinaryIO]]:
+    """Expose any PdfSource as a seekable stream without temp files"""
+    if isinstance(source, (str, Path)):
+        with map_file(source) as data:
+            with open_pdf_stream(data) as stream:
+                yield stream
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        # BytesIO shares a bytes buffer (what uploads and file reads produce) until
+        # written to; bytearray and memoryview contents are copied once
+        yield io.BytesIO(source)
     else:
-        # US format or simple: just replace comma with dot
-        num_str = num_str.replace(",", ".")
-    return float(num_str)
+        # mmap objects and binary file-likes already support read/seek/tell
+        source.seek(0)
+        yield source
 
 
-def extract_invoice_from_pdf(pdf_path: str) -> Invoice:
-    """Extract invoice data from a single PDF file"""
-    with pdfplumber.open(pdf_path) as pdf:
-        text = ""
-        for page in pdf.pages:
-            text += page.extract_text() or ""
-        
-        # Extract invoice number
-        invoice_number = None
-        patterns = [
-            r"Bestellung\s+([A-Z0-9]+)",
-            r"Invoice\s*#?\s*:?\s*([A-Z0-9-]+)",
-            r"Rechnung\s*#?\s*:?\s*([A-Z0-9-]+)"
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                invoice_number = match.group(1)
-                break
-        
-        # Extract dates
-        invoice_date = None
-        date_match = re.search(r"vom\s+(\d{2}\.\d{2}\.\d{4})", text)
-        if date_match:
-            invoice_date = parse_date(date_match.group(1))
-        
-        # Extract seller info
-        seller_name = None
-        seller_match = re.search(r"^([A-Za-z\s]+(?:Corporation|GmbH|Ltd|Inc))", text, re.MULTILINE)
-        if seller_match:
-            seller_name = seller_match.group(1).strip()
-        
-        # Extract buyer info
-        buyer_name = None
-        buyer_match = re.search(r"Kundenanschrift\s+([^\n]+)", text)
-        if buyer_match:
-            buyer_name = buyer_match.group(1).strip()
-        
-        # Extract currency
-        currency = None
-        if "EUR" in text:
-            currency = "EUR"
-        elif "USD" in text or "$" in text:
-            currency = "USD"
-        elif "INR" in text or "₹" in text:
-            currency = "INR"
+def region_text(page, region: Tuple[float, float, float, float]) -> str:
+    """Text inside a region given as fractions of the page"""
+    x0, top, x1, bottom = region
+    left, upper = page.bbox[0], page.bbox[1]
+    bbox = (
+        left + page.width * x0,
+        upper + page.height * top,
+        left + page.width * x1,
+        upper + page.height * bottom
+    )
+    with metrics.stage("text_extraction"):
+        return page.crop(bbox).extract_text() or ""
+
+
+def _missing(fields: Dict[str, Any], names: List[str]) -> List[str]:
+    return [name for name in names if fields[name] is None]
+
+
+def _merge_found(fields: Dict[str, Any], found: Dict[str, Any]):
+    for name, value in found.items():
+        if fields[name] is None and value is not None:
+            fields[name] = value
+
+
+def extract_invoice_lazy(pdf_path: PdfSource, line_items: bool = True, engine: str = "full") -> InvoiceRecord:
+    """Extract an invoice touching as few pages as possible
+    
+    Header fields are read from the header region of page 1 and totals from
+    the totals region of the last page. Other pages are only read if a field
+    is still missing, stopping as soon as all are found. Line items are only
+    parsed from the pages spanned by the template's line-item table: from the
+    page with its anchor up to the first later page without rows (or, for
+    the text engines, the page carrying the totals). Pages past the table
+    are never laid out, and no page's text is extracted twice.
+    """
+    with open_pdf_stream(pdf_path) as stream, open_pdf(stream) as pdf:
+        pages = pdf.pages
+        if not pages:
+            with metrics.stage("field_parsing"):
+                return build_invoice(parse_invoice_fields(""), [], reported_engine(engine))
+        fields = dict.fromkeys(TEXT_FIELDS + AMOUNT_FIELDS)
         
-        # Extract totals
-        net_total = None
-        tax_amount = None
-        gross_total = None
+        first, last = pages[0], pages[-1]
+        header_text = region_text(first, get_registry().default.regions["header"])
+        template = get_registry().match(header_text)
+        if template.regions["header"] != get_registry().default.regions["header"]:
+            header_text = region_text(first, template.regions["header"])
+        totals_text = region_text(last, template.regions["totals"])
+        with metrics.stage("field_parsing"):
+            fmt = document_format(header_text + "\n" + totals_text, template)
+            _merge_found(fields, parse_invoice_fields(header_text, template, TEXT_FIELDS, fmt))
+            _merge_found(fields, parse_invoice_fields(totals_text, template, AMOUNT_FIELDS + ["currency"], fmt))
         
-        try:
-            total_match = re.search(r"Gesamtwert\s+EUR\s+([\d]+[\.,][\d]+[\.,]?[\d]*)", text)
-            if total_match:
-                net_total = parse_number(total_match.group(1))
-        except Exception as e:
-            print(f"Error parsing net_total: {e}")
+        texts: Dict[int, str] = {}
         
-        try:
-            tax_match = re.search(r"MwSt\.\s+[\d,]+%\s+EUR\s+([\d]+[\.,][\d]+[\.,]?[\d]*)", text)
-            if tax_match:
-                tax_amount = parse_number(tax_match.group(1))
-        except Exception as e:
-            print(f"Error parsing tax_amount: {e}")
+        def full_text(number: int) -> str:
+            # Whole-page text, extracted once whichever loop below needs it first
+            if number not in texts:
+                with metrics.stage("text_extraction"):
+                    texts[number] = pages[number - 1].extract_text() or ""
+            return texts[number]
         
-        try:
-            gross_match = re.search(r"Gesamtwert inkl\. MwSt\.\s+EUR\s+([\d]+[\.,][\d]+[\.,]?[\d]*)", text)
-            if gross_match:
-                gross_total = parse_number(gross_match.group(1))
-        except Exception as e:
-            print(f"Error parsing gross_total: {e}")
+        # Widen to whole pages only for fields the regions did not cover:
+        # header fields forwards from page 1, totals backwards from the last page
+        numbers = range(1, len(pages) + 1)
+        for group, ordered in ((TEXT_FIELDS, numbers), (AMOUNT_FIELDS, numbers[::-1])):
+            for number in ordered:
+                missing = _missing(fields, group)
+                if not missing:
+                    break
+                text = full_text(number)
+                with metrics.stage("field_parsing"):
+                    _merge_found(fields, parse_invoice_fields(text, template, missing, fmt))
         
-        # Extract line items from table
-        line_items = []
-        try:
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                for table in tables:
-                    for row in table:
-                        if row and len(row) >= 4:
-                            try:
-                                # Try to parse quantity and price
-                                qty_str = str(row[2]) if len(row) > 2 else ""
-                                price_str = str(row[3]) if len(row) > 3 else ""
-                                total_str = str(row[-1]) if row else ""
-                                
-                                # Skip if any value is None or empty
-                                if not qty_str or qty_str == 'None' or not price_str or price_str == 'None' or not total_str or total_str == 'None':
-                                    continue
-                                
-                                # Clean and check if numeric
-                                qty_clean = re.sub(r"[^\d,\.\s]", "", qty_str).strip()
-                                price_clean = re.sub(r"[^\d,\.\s]", "", price_str).strip()
-                                total_clean = re.sub(r"[^\d,\.\s]", "", total_str).strip()
-                                
-                                if qty_clean and price_clean and total_clean:
-                                    qty = parse_number(qty_clean)
-                                    price = parse_number(price_clean)
-                                    total = parse_number(total_clean)
-                                    
-                                    line_items.append(LineItem(
-                                        description=str(row[1]) if len(row) > 1 else "",
-                                        quantity=qty,
-                                        unit_price=price,
-                                        line_total=total
-                                    ))
-                            except Exception as e:
-                                print(f"Error parsing line item: {e}")
-                                continue
-        except Exception as e:
-            print(f"Error extracting tables: {e}")
-            pass
+        tables = []
+        text_items = []
+        table_pages = []
+        if line_items:
+            anchor = 1 if template.table_anchor is None else None
+            for number, page in enumerate(pages, 1):
+                if anchor is None:
+                    # The anchor usually sits in page 1's header region, already read
+                    if (number == 1 and template.table_anchor.search(header_text)) or \
+                            template.table_anchor.search(full_text(number)):
+                        anchor = number
+                    else:
+                        page.close()
+                        continue
+                if engine == "full":
+                    found = page_tables(page, template)
+                    tables.extend(found)
+                    has_rows = any(found)
+                    ends_table = False
+                else:
+                    text = full_text(number)
+                    with metrics.stage("field_parsing"):
+                        found = parse_text_line_items(text, template, fmt)
+                    text_items.extend(found)
+                    has_rows = bool(found)
+                    if not has_rows and engine == "auto" and number > anchor:
+                        # Rows the text patterns miss may still be a table the fallback reads
+                        has_rows = any(page_tables(page, template))
+                    if has_rows or number == anchor:
+                        table_pages.append((number, page))
+                    ends_table = template.search("net_total", text) is not None
+                page.close()
+                # Filler pages, appendices and terms follow the table without rows of their own
+                if ends_table or (number > anchor and not has_rows):
+                    break
+            if needs_tables(engine, text_items, fields["net_total"]):
+                tables = read_tables(table_pages, template)
+                engine = "full"
+    
+    with metrics.stage("field_parsing"):
+        if engine == "full":
+            return build_invoice(fields, parse_line_items(tables, template, fmt))
+        return build_invoice(fields, text_items, "text")
+
+
+class ExtractionLimitExceeded(Exception):
+    """Raised when bounded extraction passes a document's page or memory ceiling"""
+
+
+# pdfminer's PDFDocument caches of resolved objects: private attributes of the
+# pdfminer.six version pinned in requirements.txt
+PDFMINER_OBJECT_CACHES = ("_cached_objs", "_parsed_objs")
+
+
+def iter_pages_bounded(pdf, max_pages: Optional[int] = None) -> Iterator[Page]:
+    """Create each page only when it is reached and drop pdfminer's object caches after it
+    
+    pdf.pages holds every page, with its resolved content streams, until the
+    PDF is closed; pages yielded here are unreachable once the caller moves on.
+    """
+    doctop = 0
+    for number, page_obj in enumerate(PDFPage.create_pages(pdf.doc), 1):
+        if max_pages is not None and number > max_pages:
+            raise ExtractionLimitExceeded(f"document has more than {max_pages} pages")
+        page = Page(pdf, page_obj, page_number=number, initial_doctop=doctop)
+        doctop += page.height
+        yield page
+        # The document caches every object it resolves, decoded streams included.
+        # Should a pdfminer release rename the caches, pages still extract but stay cached
+        for name in PDFMINER_OBJECT_CACHES:
+            if hasattr(pdf.doc, name):
+                getattr(pdf.doc, name).clear()
+
+
+class InvoiceBuilder:
+    """One invoice filled in page by page, keeping no page's text or layout"""
+
+    def __init__(
+        self,
+        template: Optional[VendorTemplate],
+        line_items: bool = True,
+        engine: str = "full",
+        first_page: int = 1
+    ):
+        self.template = template
+        self.fields = dict.fromkeys(TEXT_FIELDS + AMOUNT_FIELDS)
+        self.line_items: Optional[List[LineItemRecord]] = [] if line_items else None
+        self.engine = engine
+        self.pages = range(first_page, first_page)
+        # Detected from the first page, which carries the header and usually the first line items
+        self.format: Optional[DocumentFormat] = None
+
+    def starts_new_invoice(self, text: str) -> bool:
+        """Whether a page opens another invoice: a first-page marker or a different invoice number"""
+        if self.template.first_page_marker.search(text):
+            return True
+        current = self.fields["invoice_number"]
+        return current is not None and self.template.search("invoice_number", text) not in (None, current)
+
+    @property
+    def wants_tables(self) -> bool:
+        return self.line_items is not None and self.engine == "full"
+
+    def add_page(self, text: str, tables: List[list]):
+        """Take each missing field from this page and parse its line items
         
-        return Invoice(
-            invoice_number=invoice_number or "UNKNOWN",
-            invoice_date=invoice_date,
-            due_date=None,
-            seller_name=seller_name,
-            seller_address=None,
-            seller_tax_id=None,
-            buyer_name=buyer_name,
-            buyer_address=None,
-            buyer_tax_id=None,
-            currency=currency,
-            net_total=net_total,
-            tax_amount=tax_amount,
-            gross_total=gross_total,
-            line_items=line_items
+        The full engine parses `tables`; the text and auto engines parse `text`.
+        """
+        self.pages = range(self.pages.start, self.pages.stop + 1)
+        with metrics.stage("field_parsing"):
+            if self.format is None:
+                self.format = document_format(text, self.template)
+            missing = _missing(self.fields, TEXT_FIELDS + AMOUNT_FIELDS)
+            if missing:
+                _merge_found(self.fields, parse_invoice_fields(text, self.template, missing, self.format))
+            if self.wants_tables:
+                self.line_items.extend(parse_line_items(tables, self.template, self.format))
+            elif self.line_items is not None:
+                self.line_items.extend(parse_text_line_items(text, self.template, self.format))
+
+    def build(self, read_pages: Optional[Callable[[range, VendorTemplate], List[list]]] = None) -> InvoiceRecord:
+        """The finished invoice; the auto engine calls `read_pages` for the tables of its pages"""
+        if self.template is None:
+            # A PDF without pages, parsed as the other modes do
+            with metrics.stage("field_parsing"):
+                return build_invoice(parse_invoice_fields(""), [], reported_engine(self.engine))
+        line_items = self.line_items or []
+        engine = reported_engine(self.engine)
+        if self.line_items is not None and needs_tables(self.engine, line_items, self.fields["net_total"]):
+            tables = read_pages(self.pages, self.template)
+            with metrics.stage("field_parsing"):
+                line_items = parse_line_items(tables, self.template, self.format)
+            engine = "full"
+        with metrics.stage("field_parsing"):
+            return build_invoice(self.fields, line_items, engine)
+
+
+def _iter_bounded_invoices(pdf_path: PdfSource, options: ExtractionOptions, split: bool) -> Iterator[InvoiceRecord]:
+    """Read pages one at a time, yielding each invoice as soon as the page after it starts another
+    
+    Without `split` the whole PDF is one invoice. Raises ExtractionLimitExceeded
+    past options.max_pages, or once the document has grown memory by more than
+    options.max_memory_mb.
+    """
+    watch = MemoryWatch(options.max_memory_mb)
+    builder = None
+    pages = 0
+    last = None
+    try:
+        with open_pdf_stream(pdf_path) as stream, open_pdf(stream, count_pages=False) as pdf:
+            
+            def read_pages(numbers: range, template: VendorTemplate) -> List[list]:
+                # The auto engine's fallback walks the document again to the invoice's pages
+                numbered = enumerate(iter_pages_bounded(pdf), 1)
+                return read_tables(islice(numbered, numbers.start - 1, numbers.stop - 1), template)
+            
+            for number, page in enumerate(iter_pages_bounded(pdf, options.max_pages), 1):
+                finished = None
+                with open_page(page, number):
+                    text = page_text(page)
+                    if builder is None or (split and builder.starts_new_invoice(text)):
+                        finished = builder
+                        builder = InvoiceBuilder(
+                            get_registry().match(text), options.line_items, options.engine, number
+                        )
+                    builder.add_page(text, page_tables(page, builder.template) if builder.wants_tables else [])
+                pages = number
+                watch.sample()
+                if watch.exceeded:
+                    raise ExtractionLimitExceeded(
+                        f"document grew memory by {watch.peak / MB:.1f} MB by page {pages},"
+                        f" over its {options.max_memory_mb:g} MB ceiling"
+                    )
+                if finished is not None:
+                    yield finished.build(read_pages)
+            last = (builder or InvoiceBuilder(None, engine=options.engine)).build(read_pages)
+    finally:
+        metrics.count("pages", pages)
+        metrics.observe_memory(watch.sample())
+    yield last
+
+
+def extract_invoice_bounded(pdf_path: PdfSource, options: ExtractionOptions) -> InvoiceRecord:
+    """Extract an invoice keeping only the current page in memory
+    
+    Each field is taken from the first page that has it and line items are
+    parsed as their tables arrive, so no page's text or layout outlives it.
+    """
+    return next(_iter_bounded_invoices(pdf_path, options, split=False))
+
+
+def iter_invoices_from_pdf(pdf_path: PdfSource, options: Optional[ExtractionOptions] = None) -> Iterator[InvoiceRecord]:
+    """Yield one invoice per page range of a consolidated PDF, each as soon as its range ends
+    
+    A page opens a new invoice when it carries the template's first-page
+    marker ("Page 1 of N") or an invoice number other than the current
+    invoice's. Pages are read as in bounded extraction, so memory stays flat
+    however many invoices the PDF holds.
+    """
+    return _iter_bounded_invoices(pdf_path, options or ExtractionOptions(), split=True)
+
+
+def extract_invoice_from_pdf(pdf_path: PdfSource, options: Optional[ExtractionOptions] = None) -> InvoiceRecord:
+    """Extract invoice data from a PDF path, bytes, mmap or binary file object"""
+    options = options or ExtractionOptions()
+    if options.lazy:
+        return extract_invoice_lazy(pdf_path, line_items=options.line_items, engine=options.engine)
+    if options.is_bounded:
+        return extract_invoice_bounded(pdf_path, options)
+    
+    engine = options.engine
+    template = None
+    texts = []
+    tables = []
+    text_items = []
+    with open_pdf_stream(pdf_path) as stream, open_pdf(stream) as pdf:
+        # Single pass: each page is laid out once and released before the next
+        wants_tables = options.line_items and engine == "full"
+        for template, page_text, page_tables in iter_page_content(pdf, tables=wants_tables):
+            texts.append(page_text)
+            tables.extend(page_tables)
+        text = "".join(texts)
+        with metrics.stage("field_parsing"):
+            # Decided once from the whole text, then used for every field and line item
+            fmt = document_format(text, template)
+            fields = parse_invoice_fields(text, template, fmt=fmt)
+            if options.line_items and engine != "full":
+                # Per page, as pages are joined without a line break between them
+                for page_text in texts:
+                    text_items.extend(parse_text_line_items(page_text, template, fmt))
+        # Only invoices whose text rows do not add up pay for table detection, in a second pass
+        if options.line_items and needs_tables(engine, text_items, fields["net_total"]):
+            tables = read_tables(enumerate(pdf.pages, 1), template)
+            engine = "full"
+    
+    with metrics.stage("field_parsing"):
+        if engine == "full":
+            return build_invoice(fields, parse_line_items(tables, template, fmt))
+        return build_invoice(fields, text_items, "text")
+
+
+class ExtractionTimeout(Exception):
+    """Raised when a single PDF exceeds its extraction time budget"""
+
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeout("extraction timed out")
+
+
+@contextmanager
+def _time_limit(timeout: Optional[float]) -> Iterator[None]:
+    """Raise ExtractionTimeout after `timeout` seconds where SIGALRM is available"""
+    use_alarm = (
+        bool(timeout)
+        and hasattr(signal, "SIGALRM")
+        and threading.current_thread() is threading.main_thread()
+    )
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def _extract_with_timeout(
+    pdf_path: PdfSource,
+    timeout: Optional[float],
+    options: Optional[ExtractionOptions] = None
+) -> InvoiceRecord:
+    """Extract one PDF, aborting after `timeout` seconds"""
+    with _time_limit(timeout):
+        return extract_invoice_from_pdf(pdf_path, options)
+
+
+def _iter_split_with_timeout(
+    pdf_path: PdfSource,
+    timeout: Optional[float],
+    options: ExtractionOptions
+) -> Iterator[InvoiceRecord]:
+    """Segment a consolidated PDF, allowing each invoice `timeout` seconds rather than the whole file"""
+    invoices = iter_invoices_from_pdf(pdf_path, options)
+    while True:
+        with _time_limit(timeout):
+            invoice = next(invoices, None)
+        if invoice is None:
+            return
+        yield invoice
+
+
+def extract_invoices_from_pdf(
+    pdf_path: PdfSource,
+    options: Optional[ExtractionOptions] = None,
+    timeout: Optional[float] = None
+) -> List[InvoiceRecord]:
+    """Every invoice in a PDF: one per page range with options.split, else exactly one"""
+    if options is not None and options.split:
+        return list(_iter_split_with_timeout(pdf_path, timeout, options))
+    return [_extract_with_timeout(pdf_path, timeout, options)]
+
+
+def extract_invoice_cached(
+    pdf_path: str,
+    cache: Optional[ExtractionCache],
+    timeout: Optional[float] = None,
+    options: Optional[ExtractionOptions] = None
+) -> InvoiceRecord:
+    """Extract a PDF, serving repeat content from the cache without opening it"""
+    if cache is None:
+        return _extract_with_timeout(pdf_path, timeout, options)
+    
+    # Hash and extract from the same mapping so the file is only read once
+    with map_file(pdf_path) as data:
+        key = cache_key(data, options)
+        invoice = cache.get(key)
+        if invoice is None:
+            invoice = _extract_with_timeout(data, timeout, options)
+            cache.put(key, invoice)
+    return invoice
+
+
+def iter_invoices_cached(
+    pdf_path: str,
+    cache: Optional[ExtractionCache],
+    timeout: Optional[float],
+    options: ExtractionOptions
+) -> Iterator[InvoiceRecord]:
+    """Segment a consolidated PDF progressively, caching all of its invoices once it is done"""
+    if cache is None:
+        yield from _iter_split_with_timeout(pdf_path, timeout, options)
+        return
+    
+    with map_file(pdf_path) as data:
+        key = cache_key(data, options)
+        invoices = cache.get_many(key)
+        if invoices is not None:
+            yield from invoices
+            return
+        invoices = []
+        for invoice in _iter_split_with_timeout(data, timeout, options):
+            invoices.append(invoice)
+            yield invoice
+        cache.put_many(key, invoices)
+
+
+def _extract_in_worker(
+    pdf_path: str,
+    timeout: Optional[float],
+    options: Optional[ExtractionOptions],
+    collect: bool
+) -> Tuple[List[InvoiceRecord], List[metrics.Sample]]:
+    """Extract on a pool worker, handing back its metric samples if the parent records metrics"""
+    if not collect:
+        return extract_invoices_from_pdf(pdf_path, options, timeout), []
+    invoices, samples, _ = metrics.collect(extract_invoices_from_pdf, pdf_path, options, timeout)
+    return invoices, samples
+
+
+def _iter_extract_parallel(
+    pdf_files: List[Path],
+    workers: int,
+    timeout: Optional[float],
+    chunk_size: int,
+    cache: Optional[ExtractionCache],
+    options: Optional[ExtractionOptions]
+) -> Iterator[Tuple[Path, InvoiceRecord]]:
+    """Extract PDFs on a process pool, yielding (file, invoice) in input order
+    
+    A consolidated PDF split with options.split yields all of its invoices at once.
+    """
+    pending_files = iter(pdf_files)
+    window = deque()
+    executor = ProcessPoolExecutor(max_workers=workers)
+    
+    def submit(pdf_file: Path) -> Future:
+        return executor.submit(_extract_in_worker, str(pdf_file), timeout, options, metrics.enabled)
+    
+    def lookup(pdf_file: Path) -> Tuple[Future, Optional[str]]:
+        # Cache lookups stay in the parent so workers never touch the cache file
+        if cache is None:
+            return submit(pdf_file), None
+        with map_file(pdf_file) as data:
+            key = cache_key(data, options)
+        invoices = cached_invoices(cache, key, options)
+        if invoices is None:
+            return submit(pdf_file), key
+        future = Future()
+        future.set_result((invoices, []))
+        return future, None
+    
+    def fill_window():
+        # Only `chunk_size` results are ever in flight, so parent memory stays flat
+        while len(window) < chunk_size:
+            pdf_file = next(pending_files, None)
+            if pdf_file is None:
+                return
+            window.append((pdf_file, *lookup(pdf_file)))
+    
+    def resubmit_unfinished():
+        # Futures that completed before the pool broke keep their results
+        return deque(
+            (f, fut if fut.done() and fut.exception() is None else submit(f), key)
+            for f, fut, key in window
         )
+    
+    try:
+        fill_window()
+        while window:
+            pdf_file, future, key = window.popleft()
+            invoices = None
+            samples = []
+            try:
+                invoices, samples = future.result()
+            except BrokenProcessPool:
+                # A worker died and took every in-flight future with it. Retry this
+                # file alone on a fresh pool so only the PDF that crashes is dropped.
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = ProcessPoolExecutor(max_workers=workers)
+                try:
+                    invoices, samples = submit(pdf_file).result()
+                except BrokenProcessPool:
+                    print(f"Error extracting {pdf_file}: worker process crashed")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = ProcessPoolExecutor(max_workers=workers)
+                except Exception as e:
+                    print(f"Error extracting {pdf_file}: {e}")
+                window = resubmit_unfinished()
+            except Exception as e:
+                print(f"Error extracting {pdf_file}: {e}")
+            
+            fill_window()
+            metrics.store.merge(samples)
+            if invoices is not None:
+                if key is not None:
+                    cache_invoices(cache, key, invoices, options)
+                for invoice in invoices:
+                    yield pdf_file, invoice
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
 
 
-def extract_from_directory(pdf_dir: str) -> List[Invoice]:
-    """Extract invoices from all PDFs in a directory"""
-    pdf_path = Path(pdf_dir)
-    invoices = []
+def iter_extract_files(
+    pdf_files: List[Path],
+    workers: int = 1,
+    timeout: Optional[float] = None,
+    chunk_size: int = 64,
+    cache: Optional[ExtractionCache] = None,
+    options: Optional[ExtractionOptions] = None
+) -> Iterator[Tuple[Path, InvoiceRecord]]:
+    """Yield (file, invoice) for each PDF in `pdf_files`, in the given order
+    
+    With `workers` > 1 (or 0 for one per CPU) files are extracted on a process
+    pool. Failing, crashing or timed-out PDFs are reported and skipped. PDFs
+    already in `cache` are returned without being opened. With options.split a
+    file yields one pair per invoice it holds, serially as each one ends.
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    
+    if workers > 1:
+        yield from _iter_extract_parallel(
+            pdf_files, workers, timeout, max(chunk_size, workers), cache, options
+        )
+        return
     
-    for pdf_file in pdf_path.glob("*.pdf"):
+    for pdf_file in pdf_files:
+        if options is not None and options.split:
+            try:
+                for invoice in iter_invoices_cached(str(pdf_file), cache, timeout, options):
+                    yield pdf_file, invoice
+            except Exception as e:
+                print(f"Error extracting {pdf_file}: {e}")
+            continue
         try:
-            invoice = extract_invoice_from_pdf(str(pdf_file))
-            invoices.append(invoice)
+            with metrics.span("document", file=str(pdf_file)):
+                invoice = extract_invoice_cached(str(pdf_file), cache, timeout, options)
         except Exception as e:
             print(f"Error extracting {pdf_file}: {e}")
-    
-    return invoices
+            continue
+        yield pdf_file, invoice
+
+
+def iter_extract_from_directory(
+    pdf_dir: str,
+    workers: int = 1,
+    timeout: Optional[float] = None,
+    chunk_size: int = 64,
+    cache: Optional[ExtractionCache] = None,
+    options: Optional[ExtractionOptions] = None
+) -> Iterator[InvoiceRecord]:
+    """Yield invoices for all PDFs in a directory, sorted by file name"""
+    pdf_files = sorted(Path(pdf_dir).glob("*.pdf"))
+    for _, invoice in iter_extract_files(pdf_files, workers, timeout, chunk_size, cache, options):
+        yield invoice
+
+
+def extract_from_directory(
+    pdf_dir: str,
+    workers: int = 1,
+    timeout: Optional[float] = None,
+    cache: Optional[ExtractionCache] = None,
+    options: Optional[ExtractionOptions] = None
+) -> List[InvoiceRecord]:
+    """Extract invoices from all PDFs in a directory"""
+    return list(iter_extract_from_directory(
+        pdf_dir, workers=workers, timeout=timeout, cache=cache, options=options
+    ))
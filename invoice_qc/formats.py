@@ -0,0 +1,191 @@
+"""Per-document number and date conventions with memoized value parsers
+
+Invoices write 1.080,00 or 1,080.00, and 22.05.2024 or 05/22/2024, depending
+on where they come from. Guessing the convention value by value gets
+ambiguous strings wrong: "1,080" is 1.08 in a German invoice and 1080 in an
+American one. So the convention is decided once per document, by its vendor
+template or from the unambiguous numbers and dates in its text, and each
+value is then parsed by that convention's parser.
+"""
+import re
+from collections import Counter
+from datetime import date
+from functools import lru_cache, partial
+from typing import Dict, Optional, Tuple
+
+DECIMAL_SEPARATORS = (",", ".")
+DATE_ORDERS = ("DMY", "MDY")
+
+# Used for whatever a document's text does not settle: the conventions of the
+# German layout the extractor was written for
+DEFAULT_DECIMAL = ","
+DEFAULT_DATE_ORDER = "DMY"
+
+# Distinct strings remembered per parser; line-item tables repeat quantities and prices
+PARSER_CACHE_SIZE = 4096
+# Unambiguous numbers read before detection stops, so its cost does not grow with the document
+DETECTION_SAMPLE = 32
+
+# Digit groups joined by separators: 1.080,00 / 1,080.00 / 64,00 / 22.05.2024 / 05/22/2024
+_NUMERIC_TOKEN = re.compile(r"\d+(?:[./,-]\d+)+")
+# Day and month in either order, with a four-digit year
+_DATE_TOKEN = re.compile(r"(\d{1,2})([./-])(\d{1,2})\2\d{4}")
+_DATE = re.compile(r"(\d{1,4})[./-](\d{1,2})[./-](\d{1,4})")
+
+# Thousands separators other than "." and ",": spaces, no-break spaces and apostrophes
+_GROUPING = " \u00a0\u202f'"
+_TRANSLATIONS = {
+    ",": str.maketrans({".": None, ",": ".", **dict.fromkeys(_GROUPING)}),
+    ".": str.maketrans({",": None, **dict.fromkeys(_GROUPING)}),
+}
+
+
+def decimal_evidence(token: str) -> Optional[str]:
+    """The decimal separator a number token proves, or None if it could be either
+    
+    "1.080,00" and "64,00" prove ","; "1.080.000" proves "," too, as only a
+    thousands separator repeats. "1,080" or a date proves nothing.
+    """
+    separators = [c for c in token if c in ",."]
+    if len(set(separators)) == 2:
+        return separators[-1]
+    groups = re.split(r"[.,]", token)
+    if len(separators) > 1:
+        if all(len(group) == 3 for group in groups[1:]) and len(groups[0]) <= 3:
+            return "." if separators[0] == "," else ","
+        return None
+    if len(groups[1]) != 3 or len(groups[0]) > 3:
+        return separators[0]
+    return None
+
+
+def date_order_evidence(date_token: re.Match) -> Optional[str]:
+    """The day/month order a date proves, or None if it could be either
+    
+    Dotted dates are day-first; otherwise a first part over 12 must be a day
+    and a second part over 12 must be one.
+    """
+    first, separator, second = date_token.groups()
+    if separator == "." or int(first) > 12:
+        return "DMY"
+    if int(second) > 12:
+        return "MDY"
+    return None
+
+
+def _majority(votes: Counter) -> Optional[str]:
+    ranked = votes.most_common(2)
+    if not ranked or (len(ranked) == 2 and ranked[0][1] == ranked[1][1]):
+        return None
+    return ranked[0][0]
+
+
+def detect_conventions(text: str) -> Tuple[Optional[str], Optional[str]]:
+    """The decimal separator and date order most of the text's unambiguous values use
+    
+    Values are read in order until DETECTION_SAMPLE numbers and one date have
+    settled them, so only the start of a long document is scanned. Either is
+    None when nothing in the text settles it.
+    """
+    decimals = Counter()
+    orders = Counter()
+    for match in _NUMERIC_TOKEN.finditer(text):
+        token = match.group()
+        date_token = _DATE_TOKEN.fullmatch(token)
+        if date_token is not None:
+            order = date_order_evidence(date_token)
+            if order:
+                orders[order] += 1
+        elif "/" not in token and "-" not in token:
+            decimal = decimal_evidence(token)
+            if decimal:
+                decimals[decimal] += 1
+                if orders and sum(decimals.values()) >= DETECTION_SAMPLE:
+                    break
+    return _majority(decimals), _majority(orders)
+
+
+def _to_float(translation: dict, value: str) -> float:
+    return float(value.translate(translation))
+
+
+def _to_date(order: str, value: str) -> Optional[str]:
+    match = _DATE.fullmatch(value.strip())
+    if match is None:
+        return None
+    first, second, third = match.groups()
+    if len(first) == 4:
+        candidates = [(first, second, third)]
+    elif len(third) == 4:
+        day_first = (third, second, first)
+        month_first = (third, first, second)
+        # A value only valid the other way round, e.g. 05/22/2024 in a day-first document
+        candidates = [day_first, month_first] if order == "DMY" else [month_first, day_first]
+    else:
+        return None
+    for year, month, day in candidates:
+        try:
+            return date(int(year), int(month), int(day)).isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+class DocumentFormat:
+    """Decimal separator and day/month order of a document, with a parser for each
+    
+    Instances are shared through get_format, so their memoized parsers serve
+    every document with the same conventions.
+    """
+    __slots__ = ("decimal", "date_order", "parse_number", "parse_date")
+
+    def __init__(self, decimal: str, date_order: str):
+        if decimal not in DECIMAL_SEPARATORS:
+            raise ValueError(f"Unknown decimal separator: {decimal!r}")
+        if date_order not in DATE_ORDERS:
+            raise ValueError(f"Unknown date order: {date_order!r}")
+        self.decimal = decimal
+        self.date_order = date_order
+        # "1.080,00" -> 1080.0 with ",", "1,080.00" -> 1080.0 with "."; ValueError if not a number
+        self.parse_number = lru_cache(maxsize=PARSER_CACHE_SIZE)(partial(_to_float, _TRANSLATIONS[decimal]))
+        # "22.05.2024", "05/22/2024" or "2024-05-22" -> "2024-05-22", None if not a date
+        self.parse_date = lru_cache(maxsize=PARSER_CACHE_SIZE)(partial(_to_date, date_order))
+
+    def __repr__(self) -> str:
+        return f"DocumentFormat({self.decimal!r}, {self.date_order!r})"
+
+
+_FORMATS: Dict[Tuple[str, str], DocumentFormat] = {}
+
+
+def get_format(decimal: str = DEFAULT_DECIMAL, date_order: str = DEFAULT_DATE_ORDER) -> DocumentFormat:
+    """The shared DocumentFormat for a pair of conventions"""
+    fmt = _FORMATS.get((decimal, date_order))
+    if fmt is None:
+        fmt = _FORMATS.setdefault((decimal, date_order), DocumentFormat(decimal, date_order))
+    return fmt
+
+
+def value_format(value: str) -> DocumentFormat:
+    """The format of a single value read without its document
+    
+    A separator that occurs once is the decimal separator, so "1.080" and
+    "1,080" are both 1.08; of two, the last one is. A repeated separator
+    groups thousands: "1.010.285" is 1010285.
+    """
+    separators = [c for c in value if c in DECIMAL_SEPARATORS]
+    if not separators:
+        return get_format()
+    last = separators[-1]
+    if separators.count(last) == 1:
+        return get_format(last)
+    return get_format("." if last == "," else ",")
+
+
+def detect_format(text: str, decimal: Optional[str] = None, date_order: Optional[str] = None) -> DocumentFormat:
+    """The format of a document: the conventions given win, the rest are read from its text"""
+    if decimal is None or date_order is None:
+        detected_decimal, detected_order = detect_conventions(text)
+        decimal = decimal or detected_decimal or DEFAULT_DECIMAL
+        date_order = date_order or detected_order or DEFAULT_DATE_ORDER
+    return get_format(decimal, date_order)
@@ -0,0 +1,223 @@
+"""Incremental full runs - only re-extract and re-validate PDFs whose inputs changed"""
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+from invoice_qc.cache import ExtractionCache, extractor_fingerprint
+from invoice_qc.duplicates import DuplicateIndex, duplicate_keys
+from invoice_qc.extractor import iter_extract_files, map_file
+from invoice_qc.records import InvoiceRecord, ResultRecord, invoice_from_json, invoice_to_json
+from invoice_qc.rules import registry
+from invoice_qc.schemas import ExtractionOptions
+from invoice_qc.store import ResultStore
+from invoice_qc.validator import validate_batch
+
+# Manifest rows written per transaction, so an interrupted run keeps most of its work
+COMMIT_EVERY = 1000
+# Results of unchanged files loaded per query, below SQLite's limit on bound parameters
+RESULT_BATCH = 500
+
+
+class ManifestEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    sha256: str
+    extractor: str
+    rule_version: str
+    invoice_number: str
+    exact_key: Optional[int]
+    near_key: Optional[int]
+
+
+class Manifest:
+    """What the last run saw for each PDF: stat, content hash, versions and outcome"""
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " sha256 TEXT NOT NULL,"
+            " extractor TEXT NOT NULL,"
+            " rule_version TEXT NOT NULL,"
+            " invoice_number TEXT NOT NULL,"
+            " exact_key INTEGER,"
+            " near_key INTEGER,"
+            " invoice TEXT NOT NULL,"
+            " result TEXT NOT NULL) WITHOUT ROWID"
+        )
+        self._pending = 0
+
+    def entries(self) -> Dict[str, ManifestEntry]:
+        """Metadata of every recorded file, without the stored invoices and results"""
+        rows = self._conn.execute(
+            "SELECT path, size, mtime_ns, sha256, extractor, rule_version, invoice_number, exact_key, near_key"
+            " FROM files"
+        )
+        return {row[0]: ManifestEntry(*row[1:]) for row in rows}
+
+    def invoice(self, path: str) -> InvoiceRecord:
+        row = self._conn.execute("SELECT invoice FROM files WHERE path = ?", (path,)).fetchone()
+        return invoice_from_json(row[0])
+
+    def results(self, paths: List[str]) -> Dict[str, ResultRecord]:
+        """Stored results of several files, read with one query"""
+        if not paths:
+            return {}
+        rows = self._conn.execute(
+            f"SELECT path, result FROM files WHERE path IN ({', '.join('?' * len(paths))})", paths
+        )
+        return {path: ResultRecord(**json.loads(result)) for path, result in rows}
+
+    def _begin(self):
+        if self._pending == 0:
+            self._conn.execute("BEGIN")
+        self._pending += 1
+
+    def _written(self):
+        # Every kind of write counts, so no run holds one transaction for its whole folder
+        if self._pending >= COMMIT_EVERY:
+            self.commit()
+
+    def record(self, path: str, entry: ManifestEntry, invoice: InvoiceRecord, result: ResultRecord):
+        self._begin()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, *entry, invoice_to_json(invoice), json.dumps(result.as_dict()))
+        )
+        self._written()
+
+    def touch(self, path: str, size: int, mtime_ns: int):
+        """Update the stat of a file whose content did not change"""
+        self._begin()
+        self._conn.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", (size, mtime_ns, path))
+        self._written()
+
+    def forget(self, paths: List[str]):
+        self._begin()
+        self._conn.executemany("DELETE FROM files WHERE path = ?", ((p,) for p in paths))
+        self._written()
+
+    def commit(self):
+        if self._pending:
+            self._conn.execute("COMMIT")
+            self._pending = 0
+
+    def close(self):
+        self.commit()
+        self._conn.close()
+
+
+def file_sha256(path: Path) -> str:
+    with map_file(path) as data:
+        return hashlib.sha256(data).hexdigest()
+
+
+def iter_incremental(
+    pdf_dir: str,
+    manifest: Manifest,
+    workers: int = 1,
+    timeout: Optional[float] = None,
+    cache: Optional[ExtractionCache] = None,
+    options: Optional[ExtractionOptions] = None,
+    duplicates: Optional[DuplicateIndex] = None,
+    counts: Optional[Dict[str, int]] = None,
+    store: Optional[ResultStore] = None
+) -> Iterator[ResultRecord]:
+    """Yield a result per PDF in file name order, reusing the manifest where possible
+    
+    Files are only hashed when their size or mtime changed, only re-extracted
+    when their content or the extractor changed, and only re-validated when
+    they were re-extracted or the rules changed. Files that disappeared are
+    dropped from the manifest. `counts` receives reused/revalidated/extracted/removed.
+    Re-extracted and re-validated invoices are added to `store`; unchanged
+    ones were stored by the run that validated them.
+    """
+    extractor = extractor_fingerprint(options)
+    rule_version = registry.digest
+    duplicates = duplicates if duplicates is not None else DuplicateIndex()
+    counts = counts if counts is not None else {}
+    counts.update(reused=0, revalidated=0, extracted=0, removed=0)
+    
+    known = manifest.entries()
+    # Hashes are taken before extraction, so they describe the content that was extracted
+    plan = []
+    to_extract = []
+    # Sorting names rather than Path objects keeps the scan of a large folder cheap
+    base = Path(pdf_dir)
+    names = sorted(entry.name for entry in os.scandir(base) if entry.name.endswith(".pdf"))
+    for name in names:
+        pdf_file = base / name
+        path = str(pdf_file)
+        stat = os.stat(path)
+        entry = known.pop(path, None)
+        sha256 = entry.sha256 if entry is not None else None
+        if entry is not None and (entry.size, entry.mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            sha256 = file_sha256(pdf_file)
+            if sha256 == entry.sha256:
+                manifest.touch(path, stat.st_size, stat.st_mtime_ns)
+            else:
+                entry = None
+        
+        if entry is None or entry.extractor != extractor:
+            if sha256 is None:
+                sha256 = file_sha256(pdf_file)
+            action = "extract"
+            to_extract.append(pdf_file)
+        elif entry.rule_version != rule_version:
+            action = "revalidate"
+        else:
+            action = "reuse"
+        plan.append((pdf_file, action, stat, entry, sha256))
+    
+    manifest.forget(list(known))
+    counts["removed"] = len(known)
+    
+    # Unchanged invoices still count when looking for duplicates among new ones
+    duplicates.remember([
+        (entry.invoice_number, (entry.exact_key, entry.near_key))
+        for _, action, _, entry, _ in plan if action == "reuse"
+    ])
+    
+    extracted = iter_extract_files(to_extract, workers=workers, timeout=timeout, cache=cache, options=options)
+    next_extracted = next(extracted, None)
+    try:
+        for start in range(0, len(plan), RESULT_BATCH):
+            batch = plan[start:start + RESULT_BATCH]
+            reused = manifest.results([str(pdf_file) for pdf_file, action, *_ in batch if action == "reuse"])
+            for pdf_file, action, stat, entry, sha256 in batch:
+                path = str(pdf_file)
+                if action == "reuse":
+                    counts["reused"] += 1
+                    yield reused[path]
+                    continue
+                
+                if action == "revalidate":
+                    invoice = manifest.invoice(path)
+                elif next_extracted is not None and next_extracted[0] == pdf_file:
+                    invoice = next_extracted[1]
+                    next_extracted = next(extracted, None)
+                else:
+                    # Extraction failed and was reported; retry on the next run
+                    manifest.forget([path])
+                    continue
+                
+                result = validate_batch([invoice], duplicates, store)[0]
+                counts["extracted" if action == "extract" else "revalidated"] += 1
+                manifest.record(path, ManifestEntry(
+                    stat.st_size, stat.st_mtime_ns, sha256, extractor, rule_version,
+                    invoice.invoice_number, *duplicate_keys(invoice)
+                ), invoice, result)
+                yield result
+    finally:
+        manifest.commit()
+        if store is not None:
+            store.commit()
@@ -0,0 +1,59 @@
+"""Memory readings for bounded extraction
+
+A MemoryWatch measures how far one document grows memory over the reading
+taken when it was opened: from tracemalloc while it is tracing (exact, and
+what the tests use), otherwise from the process's resident set size.
+"""
+import os
+import sys
+import tracemalloc
+from typing import Optional
+
+MB = 1024 * 1024
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_memory() -> Optional[int]:
+    """Bytes this process has in use, or None where it cannot be read"""
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Elsewhere only the process peak is available: kilobytes on Linux, bytes on macOS
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+class MemoryWatch:
+    """Peak memory growth of one document, sampled between pages"""
+
+    def __init__(self, limit_mb: Optional[float] = None):
+        self.limit = int(limit_mb * MB) if limit_mb else None
+        if tracemalloc.is_tracing():
+            # The traced peak then also covers the layout work inside each page
+            tracemalloc.reset_peak()
+        self.baseline = current_memory()
+        self.peak = 0
+
+    def sample(self) -> int:
+        """Update and return the peak growth in bytes"""
+        if self.baseline is None:
+            return 0
+        if tracemalloc.is_tracing():
+            used = tracemalloc.get_traced_memory()[1]
+        else:
+            used = current_memory()
+        self.peak = max(self.peak, used - self.baseline)
+        return self.peak
+
+    @property
+    def exceeded(self) -> bool:
+        return self.limit is not None and self.peak > self.limit
@@ -0,0 +1,304 @@
+"""Stage timings, counters and trace spans for the extractor and validator
+
+Instrumented code calls `metrics.stage(name)` around a stage,
+`metrics.count(name, n)` for counters, `metrics.observe_memory(n)` for the
+memory growth of a bounded extraction and `metrics.span(name, **args)` around
+finer steps that only matter in traces, always through the module attribute.
+While metrics and tracing are off (the default; the API turns metrics on)
+these names are bound to no-ops that return a shared null context, so
+instrumentation costs one call and no clock reads. enable() and
+enable_tracing() rebind them to recording versions.
+
+Stage timings go to the process-wide store rendered for Prometheus. Spans,
+stages included, become Chrome trace events in the list the current thread
+is recording into with trace_into().
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+STAGES = ("pdf_open", "text_extraction", "table_extraction", "field_parsing", "validation", "serialization")
+COUNTERS = ("files", "bytes", "pages")
+
+# Histogram upper bounds in seconds, from regex work on one page to slow PDFs
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# ("stage" | "counter" | "memory", name, value) observations shipped from worker processes
+Sample = Tuple[str, str, float]
+
+# (labels, value) pairs of one metric family
+Family = List[Tuple[dict, float]]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        # Buckets are inclusive upper bounds (le), the last one is +Inf
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class MetricsStore:
+    """Stage histograms, counters and the in-flight gauge of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {name: Histogram() for name in STAGES}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.peak_memory = 0
+        self.in_flight = 0
+
+    def merge(self, samples: Iterable[Sample]):
+        with self._lock:
+            for kind, name, value in samples:
+                if kind == "stage":
+                    self.stages[name].observe(value)
+                elif kind == "memory":
+                    self.peak_memory = max(self.peak_memory, value)
+                else:
+                    self.counters[name] += value
+
+    def track_in_flight(self, delta: int):
+        with self._lock:
+            self.in_flight += delta
+
+    def reset(self):
+        with self._lock:
+            self.stages = {name: Histogram() for name in STAGES}
+            self.counters = dict.fromkeys(COUNTERS, 0)
+            self.peak_memory = 0
+
+    def render(self) -> str:
+        """This process's metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                "# HELP invoice_qc_stage_seconds Time spent in each processing stage",
+                "# TYPE invoice_qc_stage_seconds histogram",
+            ]
+            for stage, histogram in self.stages.items():
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f'invoice_qc_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'invoice_qc_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'invoice_qc_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            for name, value in self.counters.items():
+                lines.extend(format_family(f"invoice_qc_{name}_total", "counter", f"Total {name} processed", [({}, value)]))
+            lines.extend(format_family(
+                "invoice_qc_document_peak_memory_bytes", "gauge",
+                "Largest memory growth of one bounded extraction", [({}, self.peak_memory)]
+            ))
+            lines.extend(format_family(
+                "invoice_qc_requests_in_flight", "gauge", "HTTP requests currently being served", [({}, self.in_flight)]
+            ))
+        return "\n".join(lines) + "\n"
+
+
+def format_family(name: str, kind: str, description: str, samples: Family) -> List[str]:
+    """HELP/TYPE header and sample lines of one metric family"""
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return lines
+
+
+store = MetricsStore()
+_local = threading.local()
+_NULL = nullcontext()
+
+
+def _record(sample: Sample):
+    captured = getattr(_local, "samples", None)
+    if captured is not None:
+        captured.append(sample)
+    else:
+        store.merge((sample,))
+
+
+def span_event(name: str, start: float, end: float, args: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """A complete ("X") Chrome trace event from perf_counter timestamps"""
+    return {
+        "name": name,
+        "cat": "invoice_qc",
+        "ph": "X",
+        "ts": start * 1e6,
+        "dur": (end - start) * 1e6,
+        "pid": os.getpid(),
+        "tid": threading.get_native_id(),
+        "args": args or {},
+    }
+
+
+def _trace(name: str, start: float, end: float, args: Optional[Dict[str, Any]]):
+    events = getattr(_local, "events", None)
+    if events is not None:
+        events.append(span_event(name, start, end, args))
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        if enabled:
+            _record(("stage", self.name, end - self.start))
+        if tracing:
+            _trace(self.name, self.start, end, None)
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, **args: Any):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        _trace(self.name, self.start, time.perf_counter(), self.args)
+
+
+def _null_stage(name: str):
+    return _NULL
+
+
+def _null_count(name: str, amount: int = 1):
+    pass
+
+
+def _null_span(name: str, **args: Any):
+    return _NULL
+
+
+def _null_observe_memory(amount: int):
+    pass
+
+
+def _timed_stage(name: str):
+    return _Timer(name)
+
+
+def _recorded_count(name: str, amount: int = 1):
+    _record(("counter", name, amount))
+
+
+def _recorded_observe_memory(amount: int):
+    _record(("memory", "peak", amount))
+
+
+stage = _null_stage
+count = _null_count
+span = _null_span
+observe_memory = _null_observe_memory
+enabled = False
+tracing = False
+# Tracing asked for by enable_tracing(), and trace_into() blocks running in any thread
+_tracing_enabled = False
+_active_traces = 0
+_traces_lock = threading.Lock()
+
+
+def _rebind():
+    global stage, count, span, observe_memory
+    stage = _timed_stage if enabled or tracing else _null_stage
+    count = _recorded_count if enabled else _null_count
+    observe_memory = _recorded_observe_memory if enabled else _null_observe_memory
+    span = _Span if tracing else _null_span
+
+
+def enable():
+    global enabled
+    enabled = True
+    _rebind()
+
+
+def disable():
+    global enabled
+    enabled = False
+    _rebind()
+
+
+def _update_tracing():
+    global tracing
+    tracing = _tracing_enabled or _active_traces > 0
+    _rebind()
+
+
+def enable_tracing():
+    """Time spans from now on; only threads inside trace_into() keep them"""
+    global _tracing_enabled
+    with _traces_lock:
+        _tracing_enabled = True
+        _update_tracing()
+
+
+def disable_tracing():
+    """Stop timing spans, except while a trace_into() block is running"""
+    global _tracing_enabled
+    with _traces_lock:
+        _tracing_enabled = False
+        _update_tracing()
+
+
+@contextmanager
+def trace_into(events: Optional[List[Dict[str, Any]]]) -> Iterator[None]:
+    """Append a Chrome trace event to `events` for each span this thread runs; None traces nothing
+    
+    Spans are timed while any thread is inside trace_into(), and go back to
+    no-ops when the last one leaves unless enable_tracing() was called.
+    """
+    global _active_traces
+    if events is None:
+        yield
+        return
+    with _traces_lock:
+        _active_traces += 1
+        _update_tracing()
+    previous = getattr(_local, "events", None)
+    _local.events = events
+    try:
+        yield
+    finally:
+        _local.events = previous
+        with _traces_lock:
+            _active_traces -= 1
+            _update_tracing()
+
+
+def collect(fn: Callable[..., Any], *args: Any, trace: bool = False) -> Tuple[Any, List[Sample], Optional[List[Dict]]]:
+    """Run fn with metrics on, returning (result, samples, trace events or None) for the calling process
+    
+    Used to run instrumented work on executor workers, whose own store is never scraped.
+    Only a worker process turns its metrics on; on a thread executor the
+    caller's process-wide setting is left alone, so tracing one request does
+    not switch metrics on for the whole server.
+    """
+    import multiprocessing
+    if multiprocessing.parent_process() is not None:
+        enable()
+    events = [] if trace else None
+    _local.samples = []
+    try:
+        with trace_into(events):
+            return fn(*args), _local.samples, events
+    finally:
+        del _local.samples
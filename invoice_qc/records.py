@@ -0,0 +1,184 @@
+"""Compact internal records for invoices and validation results
+
+The Pydantic schemas validate every field on construction, which the
+extractor and validator do not need: their values are already typed.
+Inside the pipeline invoices and results are slotted records with the same
+attribute names, and are converted to the public schemas only at the API
+and CLI boundaries.
+"""
+import json
+from datetime import date
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+
+if TYPE_CHECKING:
+    from invoice_qc.schemas import Invoice, ValidationResult
+
+# Field order of schemas.Invoice, spelled out so records load without Pydantic
+INVOICE_FIELDS = (
+    "invoice_number", "invoice_date", "due_date",
+    "seller_name", "seller_address", "seller_tax_id",
+    "buyer_name", "buyer_address", "buyer_tax_id",
+    "currency", "net_total", "tax_amount", "gross_total", "engine", "line_items",
+)
+
+
+class _Record:
+    """Slotted value object compared and dumped field by field"""
+    __slots__ = ()
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def replace(self, **changes):
+        """Copy with some fields changed"""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return type(self)(**values)
+
+
+class LineItemRecord(_Record):
+    __slots__ = ("description", "quantity", "unit_price", "line_total")
+
+    def __init__(self, description: str, quantity: float, unit_price: float, line_total: float):
+        self.description = description
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.line_total = line_total
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "description": self.description,
+            "quantity": self.quantity,
+            "unit_price": self.unit_price,
+            "line_total": self.line_total,
+        }
+
+
+class InvoiceRecord(_Record):
+    """Same fields, in the same order, as schemas.Invoice"""
+    __slots__ = INVOICE_FIELDS
+
+    def __init__(
+        self,
+        invoice_number: str,
+        invoice_date: Optional[date] = None,
+        due_date: Optional[date] = None,
+        seller_name: Optional[str] = None,
+        seller_address: Optional[str] = None,
+        seller_tax_id: Optional[str] = None,
+        buyer_name: Optional[str] = None,
+        buyer_address: Optional[str] = None,
+        buyer_tax_id: Optional[str] = None,
+        currency: Optional[str] = None,
+        net_total: Optional[float] = None,
+        tax_amount: Optional[float] = None,
+        gross_total: Optional[float] = None,
+        engine: Optional[str] = None,
+        line_items: Optional[List[LineItemRecord]] = None
+    ):
+        self.invoice_number = invoice_number
+        self.invoice_date = invoice_date
+        self.due_date = due_date
+        self.seller_name = seller_name
+        self.seller_address = seller_address
+        self.seller_tax_id = seller_tax_id
+        self.buyer_name = buyer_name
+        self.buyer_address = buyer_address
+        self.buyer_tax_id = buyer_tax_id
+        self.currency = currency
+        self.net_total = net_total
+        self.tax_amount = tax_amount
+        self.gross_total = gross_total
+        self.engine = engine
+        self.line_items = line_items if line_items is not None else []
+
+    def as_dict(self) -> Dict[str, Any]:
+        """JSON-ready dict, identical to Invoice.model_dump(mode='json')"""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        for name in ("invoice_date", "due_date"):
+            if data[name] is not None:
+                data[name] = data[name].isoformat()
+        data["line_items"] = [item.as_dict() for item in self.line_items]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InvoiceRecord":
+        """Inverse of as_dict, for data this package wrote itself"""
+        data = dict(data)
+        for name in ("invoice_date", "due_date"):
+            if data.get(name) is not None:
+                data[name] = date.fromisoformat(data[name])
+        data["line_items"] = [LineItemRecord(**item) for item in data.get("line_items", ())]
+        return cls(**data)
+
+
+class ResultRecord(_Record):
+    """Same fields as schemas.ValidationResult"""
+    __slots__ = ("invoice_number", "is_valid", "errors", "warnings", "engine")
+
+    def __init__(
+        self,
+        invoice_number: str,
+        is_valid: bool,
+        errors: Optional[List[str]] = None,
+        warnings: Optional[List[str]] = None,
+        engine: Optional[str] = None
+    ):
+        self.invoice_number = invoice_number
+        self.is_valid = is_valid
+        self.errors = errors if errors is not None else []
+        self.warnings = warnings if warnings is not None else []
+        self.engine = engine
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "invoice_number": self.invoice_number,
+            "is_valid": self.is_valid,
+            "errors": self.errors,
+            "warnings": self.warnings,
+            "engine": self.engine,
+        }
+
+
+# Anything the validator can check: records from the extractor or validated API/CLI input
+InvoiceLike = Union[InvoiceRecord, "Invoice"]
+
+
+def invoice_to_json(record: InvoiceRecord) -> str:
+    """Compact JSON for the cache and manifest, readable back with invoice_from_json"""
+    return json.dumps(record.as_dict(), separators=(",", ":"), ensure_ascii=False)
+
+
+def invoice_from_json(payload: str) -> InvoiceRecord:
+    return InvoiceRecord.from_dict(json.loads(payload))
+
+
+def to_invoice(record: InvoiceLike) -> "Invoice":
+    """Public schema for an invoice record"""
+    from invoice_qc.schemas import Invoice, LineItem
+    if isinstance(record, Invoice):
+        return record
+    return Invoice(
+        **{name: getattr(record, name) for name in InvoiceRecord.__slots__[:-1]},
+        line_items=[LineItem(**item.as_dict()) for item in record.line_items]
+    )
+
+
+def to_result(record: Union[ResultRecord, "ValidationResult"]) -> "ValidationResult":
+    """Public schema for a validation result record"""
+    from invoice_qc.schemas import ValidationResult
+    if isinstance(record, ValidationResult):
+        return record
+    return ValidationResult(
+        invoice_number=record.invoice_number,
+        is_valid=record.is_valid,
+        errors=record.errors,
+        warnings=record.warnings,
+        engine=record.engine
+    )
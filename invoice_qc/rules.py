@@ -1,9 +1,248 @@
 """Validation rules for invoice QC"""
-from typing import List, Tuple
-from invoice_qc.schemas import Invoice
+import hashlib
+import itertools
+import threading
+import time
+from operator import attrgetter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from invoice_qc import metrics
+from invoice_qc.records import INVOICE_FIELDS, InvoiceLike
 
+ALLOWED_CURRENCIES = ["INR", "USD", "EUR"]
 
-def check_completeness(invoice: Invoice) -> List[str]:
+# Largest difference tolerated between totals that should agree
+TOTAL_TOLERANCE = 0.1
+
+SEVERITIES = ("error", "warning")
+
+# Bump when rule behaviour changes in a way the code digest cannot see (e.g. constants above)
+RULES_VERSION = "1"
+
+# Rule timings are sampled on one invoice in this many; counts are always exact
+TIMING_SAMPLE_EVERY = 16
+
+
+class Rule:
+    """One validation check and what it needs to run
+    
+    - check: invoice -> list of messages, empty when the rule passes
+    - fields: invoice fields the check reads
+    - severity: "error" messages fail the invoice, "warning" messages do not
+    - requires: fields that must not be None for the rule to run
+    - depends_on: rules that must run and pass before this one is evaluated
+    """
+
+    def __init__(
+        self,
+        name: str,
+        check: Callable[[InvoiceLike], List[str]],
+        fields: Sequence[str],
+        severity: str = "error",
+        requires: Sequence[str] = (),
+        depends_on: Sequence[str] = ()
+    ):
+        if severity not in SEVERITIES:
+            raise ValueError(f"Rule {name}: unknown severity {severity}")
+        unknown = set(fields) - set(INVOICE_FIELDS)
+        if unknown:
+            raise ValueError(f"Rule {name}: unknown fields {sorted(unknown)}")
+        self.name = name
+        self.check = check
+        self.fields = tuple(fields)
+        self.severity = severity
+        self.requires = tuple(requires)
+        self.depends_on = tuple(depends_on)
+
+
+class RuleStats:
+    """Counters for one rule, accumulated across every invoice validated"""
+
+    def __init__(self):
+        self.invocations = 0
+        self.failures = 0
+        self.skipped = 0
+        self.timed = 0
+        self.seconds = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "invocations": self.invocations,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "mean_us": round(self.seconds * 1e6 / self.timed, 3) if self.timed else 0.0,
+            "total_ms": round(self.seconds * 1000 * self.invocations / self.timed, 3) if self.timed else 0.0,
+        }
+
+
+def _code_digest(code, digest) -> None:
+    """Feed a function's bytecode and constants, including nested code, into a hash"""
+    digest.update(code.co_code)
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            _code_digest(const, digest)
+        else:
+            digest.update(repr(const).encode())
+    digest.update(repr(code.co_names).encode())
+
+
+def _field_tuple(fields: Sequence[str]) -> Optional[Callable[[InvoiceLike], tuple]]:
+    """Getter returning the values of `fields` as a tuple, or None for no fields"""
+    if not fields:
+        return None
+    getter = attrgetter(*fields)
+    return getter if len(fields) > 1 else lambda invoice: (getter(invoice),)
+
+
+class RulePlan:
+    """Rules in dependency order, evaluated with skips instead of pointless checks"""
+
+    def __init__(self, registry: "RuleRegistry", rules: List[Rule]):
+        self.registry = registry
+        self.rules = rules
+        # next() on a count is atomic, so threads never share a call number
+        self._calls = itertools.count(1)
+        # Flattened once so evaluation does no per-rule lookups
+        self._steps = [
+            (rule.name, rule.check, _field_tuple(rule.requires), rule.depends_on,
+             rule.severity == "error", registry._stats[rule.name])
+            for rule in rules
+        ]
+
+    def evaluate(self, invoice: InvoiceLike) -> Tuple[bool, List[str], List[str]]:
+        """Run the plan on one invoice, returning (is_valid, errors, warnings)"""
+        errors = []
+        warnings = []
+        failed = set()
+        # (stats, failed or None if skipped, seconds or None if untimed) per rule
+        outcomes = []
+        clock = time.perf_counter
+        span = metrics.span if metrics.tracing else None
+        timed = next(self._calls) % TIMING_SAMPLE_EVERY == 1
+        
+        for name, check, required, depends_on, is_error, stats in self._steps:
+            if (required and None in required(invoice)) or (depends_on and not failed.isdisjoint(depends_on)):
+                outcomes.append((stats, None, None))
+                failed.add(name)
+                continue
+            
+            seconds = None
+            if span is not None:
+                with span("rule:" + name):
+                    messages = check(invoice)
+            elif timed:
+                start = clock()
+                messages = check(invoice)
+                seconds = clock() - start
+            else:
+                messages = check(invoice)
+            outcomes.append((stats, bool(messages), seconds))
+            if messages:
+                failed.add(name)
+                (errors if is_error else warnings).extend(messages)
+        
+        # Checks run unlocked, so API threads validate concurrently; only the counters are shared
+        with self.registry._lock:
+            for stats, failure, seconds in outcomes:
+                if failure is None:
+                    stats.skipped += 1
+                    continue
+                stats.invocations += 1
+                stats.failures += failure
+                if seconds is not None:
+                    stats.seconds += seconds
+                    stats.timed += 1
+        
+        return not errors, errors, warnings
+
+
+class RuleRegistry:
+    """Named rules compiled into an evaluation plan, with per-rule counters"""
+
+    def __init__(self):
+        self.rules: Dict[str, Rule] = {}
+        self._stats: Dict[str, RuleStats] = {}
+        self._plan: Optional[RulePlan] = None
+        self._lock = threading.Lock()
+
+    def register(self, rule: Rule) -> Rule:
+        if rule.name in self.rules:
+            raise ValueError(f"Duplicate rule name: {rule.name}")
+        self.rules[rule.name] = rule
+        self._stats[rule.name] = RuleStats()
+        self._plan = None
+        return rule
+
+    def rule(self, name: str, fields: Sequence[str], **kwargs):
+        """Decorator registering a check function as a rule"""
+        def decorator(check):
+            self.register(Rule(name, check, fields, **kwargs))
+            return check
+        return decorator
+
+    def compile(self) -> RulePlan:
+        """Order rules so dependencies come first, otherwise by registration order"""
+        if self._plan is not None:
+            return self._plan
+        
+        ordered: List[Rule] = []
+        state: Dict[str, str] = {}
+
+        def visit(rule: Rule):
+            if state.get(rule.name) == "done":
+                return
+            if state.get(rule.name) == "visiting":
+                raise ValueError(f"Rule dependency cycle through {rule.name}")
+            state[rule.name] = "visiting"
+            for dependency in rule.depends_on:
+                if dependency not in self.rules:
+                    raise ValueError(f"Rule {rule.name} depends on unknown rule {dependency}")
+                visit(self.rules[dependency])
+            state[rule.name] = "done"
+            ordered.append(rule)
+        
+        for rule in self.rules.values():
+            visit(rule)
+        self._plan = RulePlan(self, ordered)
+        return self._plan
+
+    @property
+    def digest(self) -> str:
+        """Changes whenever a rule is added or removed, or its settings or code change"""
+        digest = hashlib.sha256(RULES_VERSION.encode())
+        for rule in self.compile().rules:
+            digest.update(repr((rule.name, rule.severity, rule.requires, rule.depends_on)).encode())
+            _code_digest(rule.check.__code__, digest)
+        return digest.hexdigest()[:16]
+
+    def record_batch(self, name: str, invocations: int, failures: int, skipped: int, seconds: float):
+        """Add counters for a rule evaluated over a whole batch at once"""
+        with self._lock:
+            stats = self._stats[name]
+            stats.invocations += invocations
+            stats.failures += failures
+            stats.skipped += skipped
+            stats.timed += invocations
+            stats.seconds += seconds
+
+    def stats(self) -> List[Dict]:
+        """Per-rule counters in plan order"""
+        with self._lock:
+            return [
+                {"rule": rule.name, "severity": rule.severity, **self._stats[rule.name].as_dict()}
+                for rule in self.compile().rules
+            ]
+
+    def reset_stats(self):
+        with self._lock:
+            for stats in self._stats.values():
+                stats.__init__()
+
+
+registry = RuleRegistry()
+
+
+@registry.rule("completeness", fields=("invoice_number", "invoice_date", "seller_name", "buyer_name"))
+def check_completeness(invoice: InvoiceLike) -> List[str]:
     """Check if required fields are present"""
     errors = []
     
@@ -22,43 +261,65 @@ def check_completeness(invoice: Invoice) -> List[str]:
     return errors
 
 
-def check_format(invoice: Invoice) -> List[str]:
+@registry.rule("currency", fields=("currency",), requires=("currency",))
+def check_format(invoice: InvoiceLike) -> List[str]:
     """Check if fields have correct format"""
     errors = []
     
-    if invoice.currency and invoice.currency not in ["INR", "USD", "EUR"]:
+    if invoice.currency and invoice.currency not in ALLOWED_CURRENCIES:
         errors.append(f"Invalid currency: {invoice.currency}")
     
     return errors
 
 
-def check_business_rules(invoice: Invoice) -> Tuple[List[str], List[str]]:
-    """Check business logic rules"""
+@registry.rule("totals", fields=("net_total", "tax_amount", "gross_total"), requires=("net_total", "tax_amount", "gross_total"))
+def check_totals(invoice: InvoiceLike) -> List[str]:
+    """Check net_total + tax_amount == gross_total"""
     errors = []
-    warnings = []
     
-    # Check totals calculation
     if invoice.net_total is not None and invoice.tax_amount is not None and invoice.gross_total is not None:
         calculated = round(invoice.net_total + invoice.tax_amount, 2)
         actual = round(invoice.gross_total, 2)
-        if abs(calculated - actual) > 0.1:
+        if abs(calculated - actual) > TOTAL_TOLERANCE:
             errors.append(f"Total mismatch: net({invoice.net_total}) + tax({invoice.tax_amount}) != gross({invoice.gross_total})")
     
-    # Check due date >= invoice date
+    return errors
+
+
+@registry.rule("due_date", fields=("due_date", "invoice_date"), requires=("due_date", "invoice_date"))
+def check_due_date(invoice: InvoiceLike) -> List[str]:
+    """Check due date >= invoice date"""
+    errors = []
+    
     if invoice.due_date and invoice.invoice_date:
         if invoice.due_date < invoice.invoice_date:
             errors.append("due_date is before invoice_date")
     
-    # Check line items sum
+    return errors
+
+
+@registry.rule("line_item_sum", fields=("line_items", "net_total"), severity="warning", requires=("net_total",))
+def check_line_item_sum(invoice: InvoiceLike) -> List[str]:
+    """Check line items add up to net_total"""
+    warnings = []
+    
     if invoice.line_items and invoice.net_total is not None:
         line_sum = sum(item.line_total for item in invoice.line_items)
-        if abs(line_sum - invoice.net_total) > 0.1:
+        if abs(line_sum - invoice.net_total) > TOTAL_TOLERANCE:
             warnings.append(f"Line items sum({line_sum}) != net_total({invoice.net_total})")
     
+    return warnings
+
+
+def check_business_rules(invoice: InvoiceLike) -> Tuple[List[str], List[str]]:
+    """Check business logic rules"""
+    errors = check_totals(invoice) + check_due_date(invoice)
+    warnings = check_line_item_sum(invoice)
     return errors, warnings
 
 
-def check_anomalies(invoice: Invoice) -> List[str]:
+@registry.rule("negative_amounts", fields=("net_total", "tax_amount", "gross_total"))
+def check_anomalies(invoice: InvoiceLike) -> List[str]:
     """Check for anomalies"""
     errors = []
     
@@ -74,20 +335,6 @@ def check_anomalies(invoice: Invoice) -> List[str]:
     return errors
 
 
-def validate_invoice(invoice: Invoice) -> Tuple[bool, List[str], List[str]]:
+def validate_invoice(invoice: InvoiceLike) -> Tuple[bool, List[str], List[str]]:
     """Run all validation rules on an invoice"""
-    all_errors = []
-    all_warnings = []
-    
-    all_errors.extend(check_completeness(invoice))
-    all_errors.extend(check_format(invoice))
-    
-    business_errors, business_warnings = check_business_rules(invoice)
-    all_errors.extend(business_errors)
-    all_warnings.extend(business_warnings)
-    
-    all_errors.extend(check_anomalies(invoice))
-    
-    is_valid = len(all_errors) == 0
-    
-    return is_valid, all_errors, all_warnings
+    return registry.compile().evaluate(invoice)
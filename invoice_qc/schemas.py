@@ -1,7 +1,7 @@
 """Pydantic schemas for invoice data"""
 from datetime import date
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 
 class LineItem(BaseModel):
@@ -27,6 +27,8 @@ class Invoice(BaseModel):
     net_total: Optional[float] = None
     tax_amount: Optional[float] = None
     gross_total: Optional[float] = None
+    # Line-item engine that extracted the invoice ("full" or "text"); None if not read from a PDF
+    engine: Optional[str] = None
     line_items: List[LineItem] = Field(default_factory=list)
 
 
@@ -36,6 +38,7 @@ class ValidationResult(BaseModel):
     is_valid: bool
     errors: List[str] = Field(default_factory=list)
     warnings: List[str] = Field(default_factory=list)
+    engine: Optional[str] = None
 
 
 class QCReport(BaseModel):
@@ -44,3 +47,62 @@ class QCReport(BaseModel):
     valid_invoices: int
     invalid_invoices: int
     results: List[ValidationResult]
+
+
+class JobStatus(BaseModel):
+    """State of an asynchronous extraction and validation job"""
+    job_id: str
+    status: str
+    total_files: int
+    processed_files: int
+    valid_invoices: int
+    invalid_invoices: int
+    results: List[ValidationResult] = Field(default_factory=list)
+
+
+class StoredResult(BaseModel):
+    """An invoice and its latest validation result from the result store"""
+    id: int
+    stored_at: float
+    invoice: Invoice
+    result: ValidationResult
+
+
+class ResultPage(BaseModel):
+    """One page of stored results; pass next_cursor as ?cursor= for the next page"""
+    results: List[StoredResult]
+    next_cursor: Optional[int] = None
+
+
+class ExtractionOptions(BaseModel):
+    """How PDFs are extracted; options that change the output get their own cache entries"""
+    model_config = ConfigDict(frozen=True)
+    
+    lazy: bool = False
+    line_items: bool = True
+    # Walk pages one at a time, dropping each page's objects before the next;
+    # either ceiling implies bounded extraction
+    bounded: bool = False
+    max_pages: Optional[int] = None
+    max_memory_mb: Optional[float] = None
+    
+    @property
+    def is_bounded(self) -> bool:
+        return self.bounded or self.max_pages is not None or self.max_memory_mb is not None
+    
+    # One invoice per page range of a consolidated PDF (see iter_invoices_from_pdf)
+    split: bool = False
+    # Line items from pdfplumber tables ("full"), from text rows matched by the
+    # template's line_item_patterns ("text"), or text unless its items fail to
+    # add up to net_total ("auto")
+    engine: Literal["full", "text", "auto"] = "full"
+    
+    @model_validator(mode="after")
+    def _check_combinations(self) -> "ExtractionOptions":
+        # Lazy extraction reads pages out of order and keeps them open, so it
+        # neither honours the page and memory ceilings nor segments a PDF
+        if self.lazy and self.is_bounded:
+            raise ValueError("lazy cannot be combined with bounded, max_pages or max_memory_mb")
+        if self.lazy and self.split:
+            raise ValueError("lazy cannot be combined with split")
+        return self
@@ -0,0 +1,223 @@
+"""Persistent, indexed store of invoices and their validation results"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from invoice_qc.records import InvoiceLike, InvoiceRecord, ResultRecord
+
+# Results are only stored when a path is given; unset keeps runs report-only
+DEFAULT_RESULT_STORE = os.environ.get("INVOICE_QC_STORE")
+
+# Rows written per transaction, so an interrupted run keeps most of its work
+COMMIT_EVERY = 1000
+# Index rows sampled per ANALYZE; approximate statistics take milliseconds at any size
+ANALYSIS_LIMIT = 1000
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class StoredRecord(NamedTuple):
+    id: int
+    stored_at: float
+    invoice: InvoiceRecord
+    result: ResultRecord
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "stored_at": self.stored_at,
+            "invoice": self.invoice.as_dict(),
+            "result": self.result.as_dict(),
+        }
+
+
+def invoice_dict(invoice: InvoiceLike) -> Dict[str, Any]:
+    """JSON-ready dict of an invoice record or a validated Invoice"""
+    if isinstance(invoice, InvoiceRecord):
+        return invoice.as_dict()
+    return invoice.model_dump(mode="json")
+
+
+class ResultStore:
+    """SQLite file of every stored invoice, its result and its errors and warnings
+    
+    Each invoice is keyed by the hash of its content, so storing it again
+    (a re-run, or a re-validation under new rules) replaces its result instead
+    of adding a row. Rows keep the id they were first stored with, and pages
+    are read in id order from an indexed cursor, so a query costs the same
+    however far into the results it is.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._written = False
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " id INTEGER PRIMARY KEY,"
+            " key TEXT NOT NULL UNIQUE,"
+            " invoice_number TEXT NOT NULL,"
+            " seller_name TEXT,"
+            " invoice_date TEXT,"
+            " is_valid INTEGER NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " invoice TEXT NOT NULL,"
+            " result TEXT NOT NULL)"
+        )
+        # Equality filters end in id, so their matches are already in page order
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_invoice_number ON results(invoice_number, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_seller_name ON results(seller_name COLLATE NOCASE, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_invoice_date ON results(invoice_date)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_is_valid ON results(is_valid, id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS failures ("
+            " key TEXT NOT NULL,"
+            " severity TEXT NOT NULL,"
+            " message TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_failures_key ON failures(key)")
+        self._analyze()
+
+    def _analyze(self):
+        # Without statistics the planner may pick the two-valued is_valid index over a selective one
+        self._conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+        self._conn.execute("ANALYZE")
+
+    def add(self, invoices: Sequence[InvoiceLike], results: Sequence[ResultRecord]):
+        """Store a batch of invoices with their results, committing every COMMIT_EVERY rows"""
+        now = time.time()
+        # The same invoice twice in a batch is stored once, with its last result
+        rows = {}
+        failures = {}
+        for invoice, result in zip(invoices, results):
+            payload = json.dumps(invoice_dict(invoice), separators=(",", ":"), ensure_ascii=False)
+            key = hashlib.sha256(payload.encode()).hexdigest()
+            invoice_date = invoice.invoice_date.isoformat() if invoice.invoice_date else None
+            rows[key] = (
+                key, invoice.invoice_number, invoice.seller_name, invoice_date, result.is_valid, now,
+                payload, json.dumps(result.as_dict(), ensure_ascii=False)
+            )
+            failures[key] = [(key, "error", message) for message in result.errors]
+            failures[key] += [(key, "warning", message) for message in result.warnings]
+        if not rows:
+            return
+        
+        with self._lock:
+            if self._pending == 0:
+                self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT INTO results"
+                " (key, invoice_number, seller_name, invoice_date, is_valid, stored_at, invoice, result)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET"
+                " is_valid = excluded.is_valid, stored_at = excluded.stored_at, result = excluded.result",
+                rows.values()
+            )
+            self._conn.executemany("DELETE FROM failures WHERE key = ?", ((key,) for key in rows))
+            self._conn.executemany(
+                "INSERT INTO failures (key, severity, message) VALUES (?, ?, ?)",
+                (failure for entries in failures.values() for failure in entries)
+            )
+            self._pending += len(rows)
+            self._written = True
+            if self._pending >= COMMIT_EVERY:
+                self._commit()
+
+    def _commit(self):
+        if self._pending:
+            self._conn.execute("COMMIT")
+            self._pending = 0
+
+    def commit(self):
+        """Make everything added so far visible to other connections"""
+        with self._lock:
+            self._commit()
+
+    def query(
+        self,
+        invoice_number: Optional[str] = None,
+        seller_name: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        is_valid: Optional[bool] = None,
+        error: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[int] = None
+    ) -> Tuple[List[StoredRecord], Optional[int]]:
+        """One page of stored results matching every given filter, and the cursor of the next page
+        
+        `seller_name` matches case-insensitively, the dates are inclusive and
+        `error` is a substring of one of the result's errors. The cursor is
+        None on the last page.
+        """
+        clauses = []
+        params: List[Any] = []
+        if invoice_number is not None:
+            clauses.append("invoice_number = ?")
+            params.append(invoice_number)
+        if seller_name is not None:
+            clauses.append("seller_name = ? COLLATE NOCASE")
+            params.append(seller_name)
+        if date_from is not None:
+            clauses.append("invoice_date >= ?")
+            params.append(date_from.isoformat())
+        if date_to is not None:
+            clauses.append("invoice_date <= ?")
+            params.append(date_to.isoformat())
+        if is_valid is not None:
+            clauses.append("is_valid = ?")
+            params.append(is_valid)
+        if error is not None:
+            clauses.append("key IN (SELECT key FROM failures WHERE severity = 'error' AND instr(message, ?) > 0)")
+            params.append(error)
+        if cursor is not None:
+            clauses.append("id > ?")
+            params.append(cursor)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        
+        with self._lock:
+            # One row past the page tells whether there is a next one
+            rows = self._conn.execute(
+                f"SELECT id, stored_at, invoice, result FROM results{where} ORDER BY id LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+        page = [self._stored(row) for row in rows[:limit]]
+        next_cursor = page[-1].id if len(rows) > limit else None
+        return page, next_cursor
+
+    def get(self, result_id: int) -> Optional[StoredRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, stored_at, invoice, result FROM results WHERE id = ?", (result_id,)
+            ).fetchone()
+        return None if row is None else self._stored(row)
+
+    @staticmethod
+    def _stored(row: tuple) -> StoredRecord:
+        result_id, stored_at, invoice, result = row
+        return StoredRecord(
+            result_id, stored_at, InvoiceRecord.from_dict(json.loads(invoice)), ResultRecord(**json.loads(result))
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        self.commit()
+        if self._written:
+            self._analyze()
+        self._conn.close()
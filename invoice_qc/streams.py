@@ -0,0 +1,142 @@
+"""Streaming NDJSON readers and writers with optional gzip/zstd compression"""
+import gzip
+import io
+import json
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, IO, Iterator, Optional, Tuple
+
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+COMPRESSION_SUFFIXES = {".gz", ".zst"}
+
+# Records written between explicit flushes so output appears incrementally
+FLUSH_EVERY = 1000
+
+# Longest line accepted from a streamed NDJSON body; bounds the partial-line buffer
+MAX_LINE_BYTES = 1024 * 1024
+
+
+def _suffixes(path: str):
+    suffixes = [s.lower() for s in Path(path).suffixes]
+    compression = suffixes[-1] if suffixes and suffixes[-1] in COMPRESSION_SUFFIXES else None
+    if compression:
+        suffixes = suffixes[:-1]
+    return (suffixes[-1] if suffixes else ""), compression
+
+
+def is_ndjson(path: str) -> bool:
+    """True for .ndjson/.jsonl paths, optionally ending in .gz or .zst"""
+    return _suffixes(path)[0] in NDJSON_SUFFIXES
+
+
+def open_text(path: str, mode: str = "r") -> IO[str]:
+    """Open a text file, transparently (de)compressing by .gz/.zst suffix
+    
+    Mode "a" appends; compressed files then gain another gzip member or zstd frame.
+    """
+    _, compression = _suffixes(path)
+    if mode in ("w", "a"):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    
+    if compression == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    
+    if compression == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression requires the 'zstandard' package") from None
+        raw = open(path, mode + "b")
+        if mode in ("w", "a"):
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    
+    return open(path, mode, encoding="utf-8")
+
+
+def event_record(event: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Envelope used for result/summary lines in NDJSON reports and job streams"""
+    return {"event": event, "data": data}
+
+
+def read_ndjson(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield one JSON record per non-empty line"""
+    with open_text(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON: {e}") from None
+
+
+async def aiter_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int = MAX_LINE_BYTES
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Yield (line_number, line) for each non-empty line of a byte stream as it arrives
+    
+    Only the current partial line is buffered. A line longer than
+    `max_line_bytes` is dropped as it streams in and yielded as None.
+    """
+    buffer = bytearray()
+    overlong = False
+    line_number = 0
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            line_number += 1
+            if overlong:
+                overlong = False
+                yield line_number, None
+            else:
+                buffer += chunk[start:end]
+                line = bytes(buffer).strip()
+                buffer.clear()
+                if len(line) > max_line_bytes:
+                    yield line_number, None
+                elif line:
+                    yield line_number, line
+            start = end + 1
+        
+        if not overlong:
+            buffer += chunk[start:]
+            if len(buffer) > max_line_bytes:
+                buffer.clear()
+                overlong = True
+    
+    if overlong:
+        yield line_number + 1, None
+    elif buffer.strip():
+        yield line_number + 1, bytes(buffer).strip()
+
+
+class NdjsonWriter:
+    """Write JSON records one per line, flushing every FLUSH_EVERY records"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = open_text(path, "w")
+
+    def write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record))
+        self._file.write("\n")
+        self.count += 1
+        if self.count % FLUSH_EVERY == 0:
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "NdjsonWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
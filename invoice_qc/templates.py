@@ -0,0 +1,213 @@
+"""Vendor template registry - per-layout field patterns picked by page fingerprint"""
+import hashlib
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Pattern
+from invoice_qc import metrics
+from invoice_qc.formats import DATE_ORDERS, DECIMAL_SEPARATORS
+
+# Directory of additional *.json vendor templates loaded at start-up
+TEMPLATES_DIR = os.environ.get("INVOICE_QC_TEMPLATES")
+
+TEXT_FIELDS = ["invoice_number", "invoice_date", "seller_name", "buyer_name", "currency"]
+AMOUNT_FIELDS = ["net_total", "tax_amount", "gross_total"]
+
+DEFAULT_LINE_ITEM_COLUMNS = {"description": 1, "quantity": 2, "unit_price": 3, "line_total": -1}
+
+# Page regions as (x0, top, x1, bottom) fractions of the page, used by lazy extraction
+DEFAULT_REGIONS = {"header": (0, 0, 1, 0.45), "totals": (0, 0.5, 1, 1)}
+
+# Named groups every line-item pattern must capture, one per LineItem field
+LINE_ITEM_GROUPS = ("description", "quantity", "unit_price", "line_total")
+
+# "Page 1 of 3", "Seite 1 von 3", "Page 1/3": the page that opens an invoice in a consolidated PDF
+DEFAULT_FIRST_PAGE_MARKER = r"(?i)\b(?:Page|Seite)\s+1\s*(?:of|von|/)\s*\d+"
+
+_TOKEN = re.compile(r"\w+")
+
+# An amount with optional thousands groups: 64,00 / 7.582,50 / 1.010.285,23
+_AMOUNT = r"(\d+(?:[.,]\d{3})*(?:[.,]\d+)?)"
+
+# The German purchase-order layout the extractor was originally written for
+BUILTIN_TEMPLATES: List[Dict[str, Any]] = [
+    {
+        "name": "de-bestellung",
+        "keywords": ["Bestellung", "Gesamtwert", "Kundenanschrift"],
+        "fields": {
+            "invoice_number": [
+                r"(?i)Bestellung\s+([A-Z0-9]+)",
+                r"(?i)Invoice\s*#?\s*:?\s*([A-Z0-9-]+)",
+                r"(?i)Rechnung\s*#?\s*:?\s*([A-Z0-9-]+)"
+            ],
+            "invoice_date": [r"vom\s+(\d{2}\.\d{2}\.\d{4})"],
+            "seller_name": [r"(?m)^([A-Za-z\s]+(?:Corporation|GmbH|Ltd|Inc))"],
+            "buyer_name": [r"Kundenanschrift\s+([^\n]+)"],
+            "net_total": [r"Gesamtwert\s+EUR\s+" + _AMOUNT],
+            "tax_amount": [r"MwSt\.\s+[\d,]+%\s+EUR\s+" + _AMOUNT],
+            "gross_total": [r"Gesamtwert inkl\. MwSt\.\s+EUR\s+" + _AMOUNT]
+        },
+        "table_anchor": r"Pos\.\s+Artikelbeschreibung",
+        "line_item_patterns": [
+            # "1 Verbandsmull 25 303,30 7.582,50": Pos, description, quantity, price, total
+            r"(?m)^\d+\s+(?P<description>.+?)\s+(?P<quantity>\d+(?:,\d+)?)\s+"
+            r"(?P<unit_price>[\d.]+,\d{2})\s+(?P<line_total>[\d.]+,\d{2})$",
+            # "1 Sterilisationsmittel 4 VE 1 VE=20 Stück 64,00", with the unit price
+            # ("16,0000 pro 1 VE") on one of the detail lines before the next position
+            r"(?m)^\d+\s+(?P<description>.+?)\s+(?P<quantity>\d+(?:,\d+)?)\s+VE\s+1\s+VE=.*?"
+            r"(?P<line_total>[\d.]+,\d{2})$(?:\n(?!\d+\s).*?)*?\s(?P<unit_price>[\d.]+,\d{4})\s+pro\b"
+        ]
+    }
+]
+
+
+class VendorTemplate:
+    """Compiled field patterns and table settings for one supplier layout
+    
+    Definitions are plain dicts (or JSON files) with:
+    - name: unique template name
+    - keywords: words that must all appear on page 1 for the template to match;
+      each a single word (letters, digits, underscores), matched case-insensitively
+    - fields: field name -> list of regexes, first group of the first match wins
+    - table_settings: optional pdfplumber extract_tables settings
+    - line_item_columns: optional column index per line item field
+    - line_item_patterns: optional regexes for the text line-item engine, each
+      capturing description, quantity, unit_price and line_total as named
+      groups; the first pattern matching any row is used
+    - regions: optional "header"/"totals" page fractions for lazy extraction
+    - table_anchor: optional regex marking the page where the line-item table starts
+    - first_page_marker: optional regex marking the first page of each invoice
+      in a consolidated PDF (default: "Page 1 of N" in English or German)
+    - decimal_separator: optional "," or "." used by every amount of the layout
+    - date_order: optional "DMY" or "MDY" for its numeric dates
+    
+    Conventions a template leaves unset are detected per document.
+    """
+
+    def __init__(self, definition: Dict[str, Any]):
+        self.name = definition["name"]
+        self.keywords = {k.lower() for k in definition.get("keywords", [])}
+        # Pages are matched word by word, so "MwSt." or "Kunden Nr" could never be found
+        unmatchable = sorted(k for k in self.keywords if not _TOKEN.fullmatch(k))
+        if unmatchable:
+            raise ValueError(f"Template {self.name}: keywords must be single words, got {unmatchable}")
+        self.table_settings = definition.get("table_settings")
+        self.line_item_columns = {**DEFAULT_LINE_ITEM_COLUMNS, **definition.get("line_item_columns", {})}
+        self.regions = {**DEFAULT_REGIONS, **{k: tuple(v) for k, v in definition.get("regions", {}).items()}}
+        anchor = definition.get("table_anchor")
+        self.table_anchor = re.compile(anchor) if anchor else None
+        self.first_page_marker = re.compile(definition.get("first_page_marker", DEFAULT_FIRST_PAGE_MARKER))
+        self.decimal_separator = definition.get("decimal_separator")
+        if self.decimal_separator not in (None, *DECIMAL_SEPARATORS):
+            raise ValueError(f"Template {self.name}: decimal_separator must be one of {DECIMAL_SEPARATORS}")
+        self.date_order = definition.get("date_order")
+        if self.date_order not in (None, *DATE_ORDERS):
+            raise ValueError(f"Template {self.name}: date_order must be one of {DATE_ORDERS}")
+        self.min_columns = max(
+            (i + 1 if i >= 0 else -i) for i in self.line_item_columns.values()
+        )
+        
+        unknown = set(definition.get("fields", {})) - set(TEXT_FIELDS + AMOUNT_FIELDS)
+        if unknown:
+            raise ValueError(f"Template {self.name}: unknown fields {sorted(unknown)}")
+        
+        # Compiled once at load time, never per document
+        self.patterns: Dict[str, List[Pattern]] = {
+            field: [re.compile(p) for p in patterns]
+            for field, patterns in definition.get("fields", {}).items()
+        }
+        self.line_item_patterns: List[Pattern] = [
+            re.compile(p) for p in definition.get("line_item_patterns", ())
+        ]
+        for pattern in self.line_item_patterns:
+            missing = set(LINE_ITEM_GROUPS) - set(pattern.groupindex)
+            if missing:
+                raise ValueError(f"Template {self.name}: line item pattern lacks groups {sorted(missing)}")
+        self.digest = hashlib.sha256(json.dumps(definition, sort_keys=True).encode()).hexdigest()
+
+    def search(self, field: str, text: str) -> Optional[str]:
+        """Return the first captured value for a field, or None"""
+        with metrics.span("regex:" + field):
+            for pattern in self.patterns.get(field, ()):
+                match = pattern.search(text)
+                if match:
+                    return match.group(1)
+        return None
+
+
+class TemplateRegistry:
+    """Templates indexed by keyword so matching cost does not grow with their number
+    
+    Each template is indexed under its rarest keyword only. A page's words
+    then find just the templates whose rarest keyword it contains, and only
+    those have their other keywords checked, so keywords shared by many
+    templates ("invoice") cost nothing.
+    """
+
+    def __init__(self, definitions: List[Dict[str, Any]], default: Optional[str] = None):
+        self.templates: Dict[str, VendorTemplate] = {}
+        self._order: Dict[str, int] = {}
+        self._index: Optional[Dict[str, List[VendorTemplate]]] = None
+        for definition in definitions:
+            self.register(VendorTemplate(definition))
+        self.default = self.templates[default] if default else next(iter(self.templates.values()))
+
+    def register(self, template: VendorTemplate):
+        if template.name in self.templates:
+            raise ValueError(f"Duplicate template name: {template.name}")
+        self.templates[template.name] = template
+        self._order[template.name] = len(self._order)
+        # Rarity depends on every template, so the index is rebuilt on the next match
+        self._index = None
+
+    def _build_index(self) -> Dict[str, List[VendorTemplate]]:
+        frequency = Counter(keyword for template in self.templates.values() for keyword in template.keywords)
+        index: Dict[str, List[VendorTemplate]] = defaultdict(list)
+        for template in self.templates.values():
+            if template.keywords:
+                rarest = min(template.keywords, key=lambda keyword: (frequency[keyword], keyword))
+                index[rarest].append(template)
+        return index
+
+    @property
+    def digest(self) -> str:
+        """Changes whenever any template definition changes"""
+        combined = "".join(t.digest for t in self.templates.values())
+        return hashlib.sha256(combined.encode()).hexdigest()[:16]
+
+    def match(self, first_page_text: str) -> VendorTemplate:
+        """Pick the most specific template whose keywords all occur on the first page"""
+        if self._index is None:
+            self._index = self._build_index()
+        tokens = set(_TOKEN.findall(first_page_text.lower()))
+        
+        # More keywords means more specific; ties go to the earliest registered
+        matched = [
+            (len(template.keywords), -self._order[template.name], template.name)
+            for token in tokens for template in self._index.get(token, ())
+            if template.keywords <= tokens
+        ]
+        if not matched:
+            return self.default
+        return self.templates[max(matched)[2]]
+
+
+def load_template_dir(path: str) -> List[Dict[str, Any]]:
+    """Read every *.json template definition in a directory, sorted by file name"""
+    definitions = []
+    for template_file in sorted(Path(path).glob("*.json")):
+        with open(template_file) as f:
+            definitions.append(json.load(f))
+    return definitions
+
+
+@lru_cache(maxsize=None)
+def get_registry() -> TemplateRegistry:
+    """Built-in templates plus any from INVOICE_QC_TEMPLATES, loaded once per process"""
+    definitions = list(BUILTIN_TEMPLATES)
+    if TEMPLATES_DIR:
+        definitions.extend(load_template_dir(TEMPLATES_DIR))
+    return TemplateRegistry(definitions, default="de-bestellung")
@@ -0,0 +1,86 @@
+"""Per-document traces in the Chrome trace-event format, and cProfile dumps of the slowest documents
+
+Spans come from the metrics hooks (see invoice_qc/metrics.py): a "document"
+span per PDF, "page" and "layout" spans, every extraction stage, "regex:<field>"
+per template search and "rule:<name>" per validation rule. Open the JSON in
+chrome://tracing or https://ui.perfetto.dev.
+"""
+import cProfile
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Request traces the API keeps for GET /traces/{id}; the oldest are dropped first
+MAX_TRACES = 100
+
+TraceEvents = List[Dict[str, Any]]
+
+
+def chrome_trace(events: TraceEvents) -> Dict[str, Any]:
+    """Wrap trace events in the JSON object format Chrome and Perfetto load"""
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(path: str, events: TraceEvents):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(chrome_trace(events), f)
+
+
+def document_durations(events: TraceEvents) -> Dict[str, float]:
+    """Seconds spent on each traced document, keyed by file"""
+    return {
+        event["args"]["file"]: event["dur"] / 1e6
+        for event in events
+        if event["name"] == "document"
+    }
+
+
+def profile_slowest(
+    durations: Dict[str, float],
+    extract: Callable[[str], Any],
+    top: int,
+    directory: str
+) -> List[Path]:
+    """Re-run `extract` on the `top` slowest documents under cProfile and dump one .prof each
+    
+    Profiling runs after tracing so its overhead does not skew which documents are slowest.
+    """
+    out_dir = Path(directory)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    slowest = sorted(durations, key=durations.get, reverse=True)[:top]
+    for rank, document in enumerate(slowest, 1):
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(extract, document)
+        except Exception as e:
+            print(f"Error profiling {document}: {e}")
+        path = out_dir / f"{rank:02d}_{Path(document).stem}.prof"
+        profiler.dump_stats(str(path))
+        written.append(path)
+    return written
+
+
+class TraceStore:
+    """The most recent request traces, kept in memory by id"""
+
+    def __init__(self, max_traces: int = MAX_TRACES):
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, TraceEvents]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, events: TraceEvents) -> str:
+        trace_id = uuid.uuid4().hex
+        with self._lock:
+            self._traces[trace_id] = events
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        return trace_id
+
+    def get(self, trace_id: str) -> Optional[TraceEvents]:
+        with self._lock:
+            return self._traces.get(trace_id)
@@ -1,29 +1,115 @@
 """Validation engine - applies rules to invoices"""
-from typing import List
-from invoice_qc.schemas import Invoice, ValidationResult, QCReport
-from invoice_qc.rules import validate_invoice
+from itertools import islice
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Sequence
+from invoice_qc import metrics
+from invoice_qc.duplicates import DuplicateIndex
+from invoice_qc.records import InvoiceLike, ResultRecord, to_result
+from invoice_qc.rules import registry, validate_invoice
+from invoice_qc.store import ResultStore
 
+if TYPE_CHECKING:
+    from invoice_qc.schemas import QCReport
 
-def validate_invoices(invoices: List[Invoice]) -> QCReport:
-    """Validate a list of invoices and generate QC report"""
-    results = []
-    
-    for invoice in invoices:
-        is_valid, errors, warnings = validate_invoice(invoice)
-        
-        result = ValidationResult(
-            invoice_number=invoice.invoice_number,
-            is_valid=is_valid,
-            errors=errors,
-            warnings=warnings
-        )
-        results.append(result)
+# Batches at least this large go through the columnar NumPy engine
+COLUMNAR_THRESHOLD = 1000
+
+
+def validate_single_invoice(invoice: InvoiceLike) -> ResultRecord:
+    """Validate one invoice and wrap the outcome in a ResultRecord"""
+    is_valid, errors, warnings = validate_invoice(invoice)
     
+    return ResultRecord(invoice.invoice_number, is_valid, errors, warnings, invoice.engine)
+
+
+def build_report(results: List[ResultRecord]) -> "QCReport":
+    """Summarize validation results into a QC report, converting them to the public schema"""
+    from invoice_qc.schemas import QCReport
     valid_count = sum(1 for r in results if r.is_valid)
     
     return QCReport(
-        total_invoices=len(invoices),
+        total_invoices=len(results),
         valid_invoices=valid_count,
-        invalid_invoices=len(invoices) - valid_count,
-        results=results
+        invalid_invoices=len(results) - valid_count,
+        results=[to_result(result) for result in results]
     )
+
+
+def apply_duplicates(
+    invoices: Sequence[InvoiceLike],
+    results: List[ResultRecord],
+    duplicates: DuplicateIndex,
+    sources: Optional[Sequence[Optional[str]]] = None
+) -> List[ResultRecord]:
+    """Add duplicate findings to the results of a batch, in place"""
+    for result, (errors, warnings) in zip(results, duplicates.check(invoices, sources)):
+        if errors:
+            result.errors.extend(errors)
+            result.is_valid = False
+        result.warnings.extend(warnings)
+    return results
+
+
+def validate_batch(
+    invoices: Sequence[InvoiceLike],
+    duplicates: Optional[DuplicateIndex] = None,
+    store: Optional[ResultStore] = None,
+    sources: Optional[Sequence[Optional[str]]] = None
+) -> List[ResultRecord]:
+    """Validate many invoices, vectorizing the rules when the batch is large
+    
+    Duplicates are detected within the batch, and against everything already
+    in `duplicates` when an index is passed; `sources` names the file each
+    invoice was read from, so a persistent index does not report a file read
+    again as its own duplicate. With a `store`, the invoices and their
+    results are added to it; the caller commits.
+    """
+    if duplicates is None:
+        # Keys of one batch already in memory, so none need forgetting
+        duplicates = DuplicateIndex(max_keys=None)
+    
+    with metrics.stage("validation"):
+        results = None
+        if len(invoices) >= COLUMNAR_THRESHOLD:
+            # NumPy is only imported once a batch is big enough to pay for it
+            from invoice_qc import columnar
+            if columnar.supports(registry):
+                results = columnar.validate_columns(invoices, registry)
+        if results is None:
+            results = [validate_single_invoice(invoice) for invoice in invoices]
+        
+        apply_duplicates(invoices, results, duplicates, sources)
+    if store is not None:
+        store.add(invoices, results)
+    return results
+
+
+def iter_validate(
+    invoices: Iterable[InvoiceLike],
+    chunk_size: int = COLUMNAR_THRESHOLD,
+    duplicates: Optional[DuplicateIndex] = None,
+    store: Optional[ResultStore] = None
+) -> Iterator[ResultRecord]:
+    """Validate a stream of invoices in chunks, yielding results in input order
+    
+    One duplicate index spans the whole stream, so duplicates are found across
+    chunks; the default in-memory one forgets its oldest keys past
+    DEFAULT_MEMORY_KEYS, so memory stays bounded however long the stream.
+    """
+    if duplicates is None:
+        duplicates = DuplicateIndex()
+    
+    iterator = iter(invoices)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield from validate_batch(chunk, duplicates, store)
+
+
+def validate_invoices(
+    invoices: List[InvoiceLike],
+    duplicates: Optional[DuplicateIndex] = None,
+    store: Optional[ResultStore] = None
+) -> "QCReport":
+    """Validate a list of invoices and generate QC report"""
+    return build_report(validate_batch(invoices, duplicates, store))
@@ -0,0 +1,455 @@
+"""Watch-folder daemon - extract, validate and report PDFs as they arrive
+
+New PDFs in the watched directory are noticed through inotify on Linux and
+by listing the directory elsewhere. A file is only picked up once its size
+and modification time have held still for `settle` seconds, so uploads still
+being copied are never read. Ready files go to a process pool, at most
+`max_in_flight` at a time; their invoices are validated and written to the
+report in micro-batches, after which each file is moved aside.
+
+Only the standard library and light invoice_qc modules are imported here;
+the extractor and validator are imported when the daemon starts.
+"""
+import json
+import os
+import select
+import shutil
+import signal
+import struct
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Set, Tuple
+from invoice_qc.cache import ExtractionCache, cache_invoices, cache_key, cached_invoices
+from invoice_qc.duplicates import DuplicateIndex
+from invoice_qc.records import InvoiceRecord, ResultRecord
+from invoice_qc.store import ResultStore
+from invoice_qc.streams import event_record, is_ndjson, open_text
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from invoice_qc.schemas import ExtractionOptions
+
+# Seconds a file's size and mtime must hold still before it is read
+DEFAULT_SETTLE = 2.0
+# Seconds between directory listings when inotify is unavailable
+DEFAULT_POLL_INTERVAL = 2.0
+# A micro-batch is written once it holds this many files or is this many seconds old
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_BATCH_SECONDS = 5.0
+
+# Longest the daemon blocks at once, so stop() and signals take effect promptly
+TICK = 0.5
+
+# A file that breaks the worker pool on its own is reported as failed
+CRASHED = "worker process crashed"
+
+
+def ignore_interrupts():
+    """Pool worker initializer: Ctrl-C reaches the whole process group, but only the daemon handles it
+    
+    An interrupted worker would otherwise fail its file with KeyboardInterrupt,
+    which escapes run() before the pending batch is written.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def is_pdf_name(name: str) -> bool:
+    return name.lower().endswith(".pdf") and not name.startswith(".")
+
+
+def list_pdfs(directory: Path) -> Set[str]:
+    """Names of the PDFs directly inside a directory"""
+    with os.scandir(directory) as entries:
+        return {entry.name for entry in entries if is_pdf_name(entry.name) and entry.is_file()}
+
+
+class PollingWatcher:
+    """Lists the directory every `interval` seconds; works everywhere"""
+
+    def __init__(self, directory: Path, interval: float = DEFAULT_POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self._next = time.monotonic() + interval
+
+    def changes(self, timeout: float) -> Set[str]:
+        """PDF names worth a look: every PDF once per interval, nothing in between"""
+        wait = self._next - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if time.monotonic() < self._next:
+                return set()
+        self._next = time.monotonic() + self.interval
+        return list_pdfs(self.directory)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Names of PDFs written, closed or moved into the directory, from Linux inotify"""
+    
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_Q_OVERFLOW = 0x4000
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, directory: Path):
+        # ctypes is only needed, and only imported, where inotify is used
+        import ctypes
+        import ctypes.util
+        self.directory = directory
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"cannot watch {directory}")
+
+    def changes(self, timeout: float) -> Set[str]:
+        """PDF names with events since the last call, waiting up to `timeout` seconds for one"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        
+        names = set()
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = self._EVENT.unpack_from(data, offset)
+            offset += self._EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="surrogateescape")
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                # Events were dropped, so look at everything
+                return list_pdfs(self.directory)
+            if is_pdf_name(name):
+                names.add(name)
+        return names
+
+    def close(self):
+        os.close(self._fd)
+
+
+def open_watcher(directory: Path, inotify: bool = True, poll_interval: float = DEFAULT_POLL_INTERVAL):
+    """inotify where the platform has it, else a polling watcher"""
+    if inotify:
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError, TypeError) as e:
+            print(f"inotify unavailable ({e}), polling every {poll_interval:g}s")
+    return PollingWatcher(directory, poll_interval)
+
+
+def move_aside(path: Path, directory: Path) -> Path:
+    """Move a file into `directory`, numbering it rather than overwriting a namesake"""
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / path.name
+    number = 1
+    while target.exists():
+        target = directory / f"{path.stem}-{number}{path.suffix}"
+        number += 1
+    return Path(shutil.move(str(path), str(target)))
+
+
+class ReportSink:
+    """Rolling report that micro-batches of results are appended to
+    
+    The path may carry strftime fields (e.g. reports/qc-%Y%m%d.ndjson) and
+    rolls over to a new file whenever they change. NDJSON reports are appended
+    to batch by batch. JSON reports hold one QCReport per file, rewritten and
+    atomically replaced after each batch, so their results stay in memory
+    until the file rolls over.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._current: Optional[str] = None
+        self._results: List[ResultRecord] = []
+
+    def write(self, results: List[ResultRecord]) -> str:
+        """Add results to the current report file and return its path"""
+        path = time.strftime(self.path)
+        if is_ndjson(path):
+            with open_text(path, "a") as f:
+                for result in results:
+                    f.write(json.dumps(event_record("result", result.as_dict())))
+                    f.write("\n")
+            return path
+        
+        if path != self._current:
+            self._current = path
+            self._results = self._load(path)
+        self._results.extend(results)
+        self._replace(path)
+        return path
+
+    @staticmethod
+    def _load(path: str) -> List[ResultRecord]:
+        # A restarted daemon carries on with the report it was writing
+        if not os.path.exists(path):
+            return []
+        try:
+            with open_text(path) as f:
+                return [ResultRecord(**result) for result in json.load(f)["results"]]
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Error reading existing report {path}: {e}")
+            return []
+
+    def _replace(self, path: str):
+        from invoice_qc.validator import build_report
+        # Same suffixes, so the temporary file is compressed like the report
+        target = Path(path)
+        temporary = target.with_name(f".{target.name}")
+        with open_text(str(temporary), "w") as f:
+            json.dump(build_report(self._results).model_dump(mode="json"), f, indent=2)
+        os.replace(temporary, target)
+
+
+class WatchDaemon:
+    """Picks up settled PDFs from a directory until stopped
+    
+    Files are extracted on a process pool with at most `max_in_flight` of
+    them submitted at once; the rest wait in arrival order. A micro-batch is
+    validated, written to the report and its files moved to `processed_dir`
+    (or `failed_dir` when extraction failed) once it holds `batch_size` files
+    or is `batch_seconds` old. stop() finishes the files in flight, writes
+    the last batch and returns from run().
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        report: str,
+        processed_dir: Optional[str] = None,
+        failed_dir: Optional[str] = None,
+        workers: int = 1,
+        max_in_flight: int = 0,
+        settle: float = DEFAULT_SETTLE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_seconds: float = DEFAULT_BATCH_SECONDS,
+        timeout: Optional[float] = None,
+        cache: Optional[ExtractionCache] = None,
+        options: Optional["ExtractionOptions"] = None,
+        duplicates: Optional[DuplicateIndex] = None,
+        store: Optional[ResultStore] = None,
+        inotify: bool = True,
+        poll_interval: float = DEFAULT_POLL_INTERVAL
+    ):
+        self.directory = Path(directory)
+        self.sink = ReportSink(report)
+        self.processed_dir = Path(processed_dir) if processed_dir else self.directory / "processed"
+        self.failed_dir = Path(failed_dir) if failed_dir else self.directory / "failed"
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self.settle = settle
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.timeout = timeout
+        self.cache = cache
+        self.options = options
+        self.duplicates = duplicates if duplicates is not None else DuplicateIndex()
+        self.store = store
+        self.inotify = inotify
+        self.poll_interval = poll_interval
+        self.counts = {"files": 0, "failed": 0, "invoices": 0, "valid": 0}
+        
+        self._stop = threading.Event()
+        # name -> (size, mtime_ns, monotonic time it last changed)
+        self._settling: Dict[str, Tuple[int, int, float]] = {}
+        self._ready: Deque[str] = deque()
+        # Files that were in flight when the pool broke, re-run one at a time
+        self._suspects: Deque[str] = deque()
+        # name -> (future, cache key, whether it runs alone as a suspect)
+        self._in_flight: Dict[str, Tuple["Future", Optional[str], bool]] = {}
+        # (name, invoices or None, error) awaiting the next write
+        self._batch: List[Tuple[str, Optional[List[InvoiceRecord]], Optional[str]]] = []
+        self._batch_started = 0.0
+        # Reported files that could not be moved out of the directory
+        self._unmovable: Set[str] = set()
+        self._executor = None
+
+    def stop(self):
+        """Stop taking new files; run() returns once those in flight are reported"""
+        self._stop.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def run(self):
+        """Watch until stop() is called"""
+        self._executor = self._new_pool()
+        watcher = open_watcher(self.directory, self.inotify, self.poll_interval)
+        try:
+            # The watcher is opened first so files arriving during the scan are not missed
+            self._observe(list_pdfs(self.directory))
+            while not self.stopping:
+                self._observe(watcher.changes(TICK))
+                self._check_settling()
+                self._submit_ready()
+                self._collect(0)
+                self._flush_if_due()
+            while self._in_flight or self._suspects:
+                self._submit_suspects()
+                self._collect(TICK)
+            self._flush()
+        finally:
+            watcher.close()
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _known(self, name: str) -> bool:
+        return (
+            name in self._settling or name in self._in_flight
+            or name in self._ready or name in self._suspects
+            or name in self._unmovable or any(name == batched for batched, _, _ in self._batch)
+        )
+
+    def _observe(self, names: Set[str]):
+        now = time.monotonic()
+        for name in sorted(names):
+            if self._known(name):
+                continue
+            try:
+                stat = os.stat(self.directory / name)
+            except FileNotFoundError:
+                continue
+            self._settling[name] = (stat.st_size, stat.st_mtime_ns, now)
+
+    def _check_settling(self):
+        """Move files whose size and mtime held still for `settle` seconds to the ready queue"""
+        now = time.monotonic()
+        for name, (size, mtime_ns, since) in list(self._settling.items()):
+            try:
+                stat = os.stat(self.directory / name)
+            except FileNotFoundError:
+                del self._settling[name]
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                self._settling[name] = (stat.st_size, stat.st_mtime_ns, now)
+            elif now - since >= self.settle:
+                del self._settling[name]
+                self._ready.append(name)
+
+    def _submit_suspects(self):
+        while self._suspects and not self._in_flight:
+            self._submit(self._suspects.popleft(), alone=True)
+
+    def _submit_ready(self):
+        """Submit waiting files without exceeding max_in_flight; suspects go alone"""
+        self._submit_suspects()
+        while self._ready and not self._suspects and len(self._in_flight) < self.max_in_flight:
+            self._submit(self._ready.popleft())
+
+    def _submit(self, name: str, alone: bool = False):
+        from invoice_qc.extractor import extract_invoices_from_pdf, map_file
+        path = self.directory / name
+        key = None
+        try:
+            if self.cache is not None:
+                # Cache lookups stay in this process so workers never touch the cache file
+                with map_file(path) as data:
+                    key = cache_key(data, self.options)
+                invoices = cached_invoices(self.cache, key, self.options)
+                if invoices is not None:
+                    self._add_to_batch(name, invoices, None)
+                    return
+            future = self._executor.submit(extract_invoices_from_pdf, str(path), self.options, self.timeout)
+        except OSError as e:
+            self._add_to_batch(name, None, str(e))
+            return
+        self._in_flight[name] = (future, key, alone)
+
+    def _collect(self, timeout: float):
+        """Add finished extractions to the batch, waiting up to `timeout` seconds for one"""
+        from concurrent.futures import FIRST_COMPLETED, wait
+        from concurrent.futures.process import BrokenProcessPool
+        if not self._in_flight:
+            return
+        done, _ = wait([future for future, _, _ in self._in_flight.values()], timeout, FIRST_COMPLETED)
+        broken = False
+        for name, (future, key, alone) in list(self._in_flight.items()):
+            if future not in done:
+                continue
+            del self._in_flight[name]
+            try:
+                invoices = future.result()
+            except BrokenProcessPool:
+                broken = True
+                if alone:
+                    self._add_to_batch(name, None, CRASHED)
+                else:
+                    self._suspects.append(name)
+                continue
+            except Exception as e:
+                self._add_to_batch(name, None, str(e))
+                continue
+            if key is not None:
+                cache_invoices(self.cache, key, invoices, self.options)
+            self._add_to_batch(name, invoices, None)
+        if broken:
+            self._restart_pool()
+
+    def _restart_pool(self):
+        # A dead worker takes every in-flight future with it; those files are re-run one by one
+        self._suspects.extend(self._in_flight)
+        self._in_flight.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._new_pool()
+
+    def _new_pool(self):
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=ignore_interrupts)
+
+    def _add_to_batch(self, name: str, invoices: Optional[List[InvoiceRecord]], error: Optional[str]):
+        if not self._batch:
+            self._batch_started = time.monotonic()
+        self._batch.append((name, invoices, error))
+
+    def _flush_if_due(self):
+        if self._batch and (
+            len(self._batch) >= self.batch_size
+            or time.monotonic() - self._batch_started >= self.batch_seconds
+        ):
+            self._flush()
+
+    def _flush(self):
+        """Validate the batch, write its results, then move its files aside"""
+        from invoice_qc.validator import validate_batch
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        invoices = [invoice for _, found, _ in batch for invoice in found or ()]
+        checked = iter(validate_batch(invoices, self.duplicates, self.store))
+        results = []
+        for name, found, error in batch:
+            if found is None:
+                results.append(ResultRecord("UNKNOWN", False, [f"Extraction failed for {name}: {error}"]))
+            else:
+                results.extend(next(checked) for _ in found)
+        # Files are only moved once their results are written, so a crash re-reads rather than loses them
+        self.sink.write(results)
+        if self.store is not None:
+            self.store.commit()
+        
+        for name, found, error in batch:
+            try:
+                move_aside(self.directory / name, self.failed_dir if found is None else self.processed_dir)
+            except OSError as e:
+                print(f"Error moving {name}: {e}")
+                self._unmovable.add(name)
+        self.counts["files"] += len(batch)
+        self.counts["failed"] += sum(1 for _, found, _ in batch if found is None)
+        self.counts["invoices"] += len(invoices)
+        self.counts["valid"] += sum(1 for result in results if result.is_valid)
@@ -0,0 +1,348 @@
+"""Tests for the HTTP API"""
+import asyncio
+import json
+import time
+from pathlib import Path
+import httpx
+import pytest
+from invoice_qc.api import ndjson, routes
+from invoice_qc.api.executor import shutdown_executor
+from invoice_qc.api.main import app
+from invoice_qc.cache import ExtractionCache
+
+SAMPLE_PDF = Path(__file__).resolve().parent.parent / "pdfs" / "sample_pdf_1.pdf"
+
+
+@pytest.fixture
+def open_client():
+    """Opens an httpx client on the app inside a test's event loop; stops the executor afterwards"""
+    
+    def open_client():
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    
+    yield open_client
+    shutdown_executor()
+
+
+def test_health_stays_fast_during_large_upload(tmp_path, monkeypatch, open_client):
+    """Test /health answers promptly while a large upload is being extracted"""
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(routes, "get_extraction_cache", lambda: cache)
+    
+    # Distinct bytes per file so nothing is served from the cache
+    pdf_bytes = SAMPLE_PDF.read_bytes()
+    files = [
+        ("files", (f"invoice_{i}.pdf", pdf_bytes + f"\n%{i}\n".encode(), "application/pdf"))
+        for i in range(24)
+    ]
+    
+    async def scenario():
+        async with open_client() as client:
+            upload = asyncio.create_task(client.post("/extract-and-validate", files=files))
+            latencies = []
+            while not upload.done():
+                start = time.perf_counter()
+                response = await client.get("/health")
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200
+                await asyncio.sleep(0.02)
+            return (await upload), latencies
+    
+    response, latencies = asyncio.run(scenario())
+    
+    assert response.status_code == 200
+    assert response.json()["total_invoices"] == 24
+    assert len(latencies) >= 5
+    assert max(latencies) < 0.25
+
+
+def test_job_streams_results_then_summary(tmp_path, monkeypatch, open_client):
+    """Test a submitted job returns at once and streams every result then a summary"""
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(routes, "get_extraction_cache", lambda: cache)
+    files = [
+        ("files", ("good.pdf", SAMPLE_PDF.read_bytes(), "application/pdf")),
+        ("files", ("broken.pdf", b"not a pdf", "application/pdf")),
+    ]
+    
+    async def scenario():
+        async with open_client() as client:
+            submitted = await client.post("/jobs", files=files)
+            job_id = submitted.json()["job_id"]
+            stream = await client.get(f"/jobs/{job_id}/stream")
+            status = await client.get(f"/jobs/{job_id}")
+            return submitted, stream, status
+    
+    submitted, stream, status = asyncio.run(scenario())
+    
+    assert submitted.status_code == 202
+    assert submitted.json()["total_files"] == 2
+    
+    events = [json.loads(line) for line in stream.text.splitlines()]
+    assert [e["event"] for e in events] == ["result", "result", "summary"]
+    assert events[-1]["data"]["total_invoices"] == 2
+    assert events[-1]["data"]["invalid_invoices"] == 1
+    
+    assert status.json()["status"] == "completed"
+    assert status.json()["processed_files"] == 2
+
+
+def test_extract_and_validate_splits_consolidated_pdf(tmp_path, monkeypatch, open_client):
+    """Test ?split=true reports every invoice of a consolidated PDF, also when served from the cache"""
+    import random
+    from benchmarks.synthetic import statement_pdf, synthetic_invoice
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(routes, "get_extraction_cache", lambda: cache)
+    rng = random.Random(0)
+    invoices = [synthetic_invoice(rng, number, 2) for number in range(3)]
+    files = [("files", ("statement.pdf", statement_pdf(invoices), "application/pdf"))]
+    
+    async def scenario():
+        async with open_client() as client:
+            whole = await client.post("/extract-and-validate", files=files)
+            split = [await client.post("/extract-and-validate?split=true", files=files) for _ in range(2)]
+            return whole, split
+    
+    whole, split = asyncio.run(scenario())
+    
+    assert whole.json()["total_invoices"] == 1
+    for response in split:
+        assert response.status_code == 200
+        assert [r["invoice_number"] for r in response.json()["results"]] == [i.invoice_number for i in invoices]
+    assert cache.stats()["hits"] == 1
+
+
+def test_rule_stats_endpoint(open_client):
+    """Test validation updates the per-rule counters served by the API"""
+    from invoice_qc.rules import registry
+    registry.reset_stats()
+    invoice = {"invoice_number": "INV-1", "net_total": 100.0, "tax_amount": 19.0, "gross_total": 200.0}
+    
+    async def run():
+        async with open_client() as client:
+            await client.post("/validate-json", json=[invoice])
+            return (await client.get("/rules/stats")).json()
+    
+    stats = {s["rule"]: s for s in asyncio.run(run())}
+    
+    assert stats["totals"]["invocations"] == 1
+    assert stats["totals"]["failures"] == 1
+    assert stats["due_date"]["skipped"] == 1
+
+
+def test_validate_ndjson_streams_results_in_order(monkeypatch, open_client):
+    """Test NDJSON invoices are validated in batches as the body arrives, bad lines included"""
+    monkeypatch.setattr(routes, "get_duplicate_index", lambda: None)
+    monkeypatch.setattr(ndjson, "STREAM_BATCH", 2)
+    invoice = {
+        "invoice_number": "INV-001", "invoice_date": "2024-05-22", "seller_name": "ABC Corp",
+        "buyer_name": "XYZ Ltd", "currency": "EUR", "net_total": 100.0, "tax_amount": 19.0, "gross_total": 119.0,
+    }
+    lines = [
+        json.dumps(invoice),
+        "",
+        json.dumps({**invoice, "invoice_number": "INV-002", "currency": "GBP"}),
+        "{not json",
+        json.dumps({"seller_name": "ABC Corp"}),
+        json.dumps(invoice),
+    ]
+    payload = "\n".join(lines).encode()
+    
+    async def chunks():
+        # Uneven chunks so lines arrive split across reads
+        for i in range(0, len(payload), 7):
+            yield payload[i:i + 7]
+    
+    async def scenario():
+        async with open_client() as client:
+            return await client.post(
+                "/validate-ndjson", content=chunks(), headers={"Content-Type": "application/x-ndjson"}
+            )
+    
+    response = asyncio.run(scenario())
+    events = [json.loads(line) for line in response.text.splitlines()]
+    results = [e["data"] for e in events[:-1]]
+    
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [r["invoice_number"] for r in results] == ["INV-001", "INV-002", "UNKNOWN", "UNKNOWN", "INV-001"]
+    assert results[1]["errors"] == ["Invalid currency: GBP"]
+    assert results[2]["errors"][0].startswith("Line 4: Invalid JSON")
+    assert results[3]["errors"] == ["Line 5: invoice_number: Field required"]
+    assert results[4]["errors"] == ["Duplicate invoice: INV-001 from ABC Corp already seen"]
+    assert events[-1] == {"event": "summary", "data": {"total_invoices": 5, "valid_invoices": 1, "invalid_invoices": 4}}
+
+
+def test_metrics_endpoint_reports_stages(tmp_path, monkeypatch, open_client):
+    """Test an extraction request shows up in the Prometheus stage histograms and counters"""
+    from invoice_qc import metrics
+    from invoice_qc.api import executor
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(routes, "get_extraction_cache", lambda: cache)
+    monkeypatch.setattr(executor, "EXECUTOR_KIND", "thread")
+    shutdown_executor()
+    metrics.store.reset()
+    pdf_bytes = SAMPLE_PDF.read_bytes()
+    
+    async def scenario():
+        async with open_client() as client:
+            for _ in range(2):
+                await client.post("/extract-and-validate", files=[("files", ("a.pdf", pdf_bytes, "application/pdf"))])
+            return await client.get("/metrics")
+    
+    response = asyncio.run(scenario())
+    samples = dict(line.rsplit(" ", 1) for line in response.text.splitlines() if not line.startswith("#"))
+    
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    # The second upload is a cache hit, so the PDF is only opened once
+    assert samples['invoice_qc_stage_seconds_count{stage="pdf_open"}'] == "1"
+    assert samples['invoice_qc_stage_seconds_bucket{stage="pdf_open",le="+Inf"}'] == "1"
+    assert int(samples['invoice_qc_stage_seconds_count{stage="text_extraction"}']) >= 1
+    assert samples['invoice_qc_stage_seconds_count{stage="validation"}'] == "2"
+    assert samples['invoice_qc_stage_seconds_count{stage="serialization"}'] == "2"
+    assert samples["invoice_qc_files_total"] == "2"
+    assert samples["invoice_qc_bytes_total"] == str(2 * len(pdf_bytes))
+    assert samples["invoice_qc_cache_hits_total"] == "1"
+    assert 'invoice_qc_rule_failures_total{rule="totals"}' in samples
+    assert samples["invoice_qc_requests_in_flight"] == "1"
+
+
+def test_trace_header_records_worker_and_rule_spans(tmp_path, monkeypatch, open_client):
+    """Test a traced upload returns a trace id whose trace covers extraction and validation"""
+    from invoice_qc import metrics
+    from invoice_qc.api import executor
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(routes, "get_extraction_cache", lambda: cache)
+    monkeypatch.setattr(executor, "EXECUTOR_KIND", "thread")
+    shutdown_executor()
+    
+    async def scenario():
+        async with open_client() as client:
+            files = [("files", ("a.pdf", SAMPLE_PDF.read_bytes(), "application/pdf"))]
+            untraced = await client.post("/extract-and-validate", files=files)
+            traced = await client.post("/extract-and-validate", files=files, headers={routes.TRACE_HEADER: "1"})
+            trace = await client.get(f"/traces/{traced.headers[routes.TRACE_ID_HEADER]}")
+            return untraced, traced, trace
+    
+    untraced, traced, trace = asyncio.run(scenario())
+    names = [event["name"] for event in trace.json()["traceEvents"]]
+    
+    assert routes.TRACE_ID_HEADER not in untraced.headers
+    assert traced.json()["total_invoices"] == 1
+    # The second upload is a cache hit: no extraction spans, but the document and its rules
+    assert "document" in names and "rule:totals" in names and "serialization" in names
+    assert "pdf_open" not in names
+    # Spans go back to no-ops once the traced request is done
+    assert not metrics.tracing and metrics.span is metrics._null_span
+
+
+def test_extract_and_validate_reports_line_item_engine(tmp_path, monkeypatch, open_client):
+    """Test each result names the line-item engine chosen with ?engine="""
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(routes, "get_extraction_cache", lambda: cache)
+    files = [("files", ("invoice.pdf", SAMPLE_PDF.read_bytes(), "application/pdf"))]
+    
+    async def scenario():
+        async with open_client() as client:
+            return [
+                await client.post(f"/extract-and-validate{query}", files=files)
+                for query in ("", "?engine=auto", "?engine=tables")
+            ]
+    
+    default, auto, unknown = asyncio.run(scenario())
+    
+    assert default.json()["results"][0]["engine"] == "full"
+    assert auto.json()["results"][0]["engine"] == "text"
+    assert auto.json()["results"][0]["warnings"] == []
+    assert unknown.status_code == 422
+
+
+def test_results_endpoints_page_through_stored_invoices(tmp_path, monkeypatch, open_client):
+    """Test validated invoices are stored and served back page by page with filters"""
+    from invoice_qc.store import ResultStore
+    store = ResultStore(str(tmp_path / "results.db"))
+    monkeypatch.setattr(routes, "get_duplicate_index", lambda: None)
+    invoice = {
+        "invoice_number": "INV-001", "invoice_date": "2024-05-22", "seller_name": "ABC Corp",
+        "buyer_name": "XYZ Ltd", "currency": "EUR", "net_total": 100.0, "tax_amount": 19.0, "gross_total": 119.0,
+    }
+    invoices = [
+        {**invoice, "invoice_number": f"INV-00{i}", "gross_total": 119.0 + i, "tax_amount": 19.0 + i}
+        for i in range(3)
+    ] + [{**invoice, "invoice_number": "INV-100", "currency": "GBP", "invoice_date": "2024-06-01"}]
+    
+    async def scenario():
+        async with open_client() as client:
+            disabled = await client.get("/results")
+            monkeypatch.setattr(routes, "get_result_store", lambda: store)
+            await client.post("/validate-json", json=invoices)
+            may = {"seller_name": "abc corp", "date_to": "2024-05-31"}
+            first = await client.get("/results", params={**may, "limit": 2})
+            second = await client.get("/results", params={**may, "cursor": first.json()["next_cursor"]})
+            invalid = await client.get("/results", params={"is_valid": "false"})
+            single = await client.get(f"/results/{invalid.json()['results'][0]['id']}")
+            missing = await client.get("/results/999")
+            return disabled, first, second, invalid, single, missing
+    
+    disabled, first, second, invalid, single, missing = asyncio.run(scenario())
+    store.close()
+    
+    assert disabled.status_code == 404
+    assert [r["invoice"]["invoice_number"] for r in first.json()["results"]] == ["INV-000", "INV-001"]
+    assert [r["invoice"]["invoice_number"] for r in second.json()["results"]] == ["INV-002"]
+    assert second.json()["next_cursor"] is None
+    assert [r["result"]["errors"] for r in invalid.json()["results"]] == [["Invalid currency: GBP"]]
+    assert single.json() == invalid.json()["results"][0]
+    assert missing.status_code == 404
+
+
+def test_uploads_are_extracted_from_their_spooled_files(tmp_path, monkeypatch, open_client):
+    """Test a thread executor parses each upload's spooled file in place, cached under its content hash"""
+    from invoice_qc.api import executor
+    from invoice_qc.cache import cache_key
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(routes, "get_extraction_cache", lambda: cache)
+    monkeypatch.setattr(executor, "EXECUTOR_KIND", "thread")
+    shutdown_executor()
+    sources = []
+    extract_invoices_from_pdf = routes.extract_invoices_from_pdf
+    
+    def recorded(source, *args):
+        sources.append(type(source))
+        return extract_invoices_from_pdf(source, *args)
+    
+    monkeypatch.setattr(routes, "extract_invoices_from_pdf", recorded)
+    pdf_bytes = SAMPLE_PDF.read_bytes()
+    
+    async def scenario():
+        async with open_client() as client:
+            files = [("files", ("a.pdf", pdf_bytes, "application/pdf"))]
+            return await client.post("/extract-and-validate", files=files)
+    
+    response = asyncio.run(scenario())
+    
+    assert response.json()["total_invoices"] == 1
+    assert len(sources) == 1 and sources[0] is not bytes
+    assert cache.get(cache_key(pdf_bytes, routes.EXTRACTION_OPTIONS)) is not None
+
+
+def test_traced_request_leaves_metrics_off(tmp_path, monkeypatch, open_client):
+    """Test tracing a request on a thread executor does not turn metrics on for the process"""
+    from invoice_qc import metrics
+    from invoice_qc.api import executor
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(routes, "get_extraction_cache", lambda: cache)
+    monkeypatch.setattr(executor, "EXECUTOR_KIND", "thread")
+    shutdown_executor()
+    
+    async def scenario():
+        async with open_client() as client:
+            files = [("files", ("a.pdf", SAMPLE_PDF.read_bytes(), "application/pdf"))]
+            return await client.post("/extract-and-validate", files=files, headers={routes.TRACE_HEADER: "1"})
+    
+    metrics.disable()
+    try:
+        response = asyncio.run(scenario())
+        assert not metrics.enabled and metrics.stage is metrics._null_stage
+    finally:
+        metrics.enable()
+    assert routes.TRACE_ID_HEADER in response.headers
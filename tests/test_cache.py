@@ -0,0 +1,53 @@
+"""Tests for the extraction cache"""
+from pathlib import Path
+import pdfplumber
+from invoice_qc import extractor
+from invoice_qc.cache import ExtractionCache, cache_key
+from invoice_qc.records import InvoiceRecord
+from invoice_qc.schemas import ExtractionOptions
+
+SAMPLE_PDF = Path(__file__).resolve().parent.parent / "pdfs" / "sample_pdf_1.pdf"
+
+
+def test_cache_hit_skips_pdfplumber(tmp_path, monkeypatch):
+    """Test a second extraction of the same content never opens the PDF"""
+    cache = ExtractionCache(str(tmp_path / "cache.db"))
+    first = extractor.extract_invoice_cached(str(SAMPLE_PDF), cache)
+    
+    def fail_open(*args, **kwargs):
+        raise AssertionError("pdfplumber.open called on cache hit")
+    
+    monkeypatch.setattr(pdfplumber, "open", fail_open)
+    copy = tmp_path / "copy.pdf"
+    copy.write_bytes(SAMPLE_PDF.read_bytes())
+    second = extractor.extract_invoice_cached(str(copy), cache)
+    
+    assert second == first
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test entries over the limit are evicted oldest access first"""
+    cache = ExtractionCache(str(tmp_path / "cache.db"), max_entries=2)
+    for number in ["A", "B"]:
+        cache.put(cache_key(number.encode()), InvoiceRecord(invoice_number=number))
+    
+    # Touch A so B becomes the least recently used entry
+    assert cache.get(cache_key(b"A")) is not None
+    cache.put(cache_key(b"C"), InvoiceRecord(invoice_number="C"))
+    
+    assert cache.get(cache_key(b"B")) is None
+    assert cache.get(cache_key(b"A")).invoice_number == "A"
+    assert cache.stats()["entries"] == 2
+
+
+def test_cache_key_ignores_resource_limits():
+    """Test only options that change the extracted output change the cache key"""
+    default = cache_key(b"pdf")
+    
+    assert cache_key(b"pdf", ExtractionOptions()) == default
+    assert cache_key(b"pdf", ExtractionOptions(max_pages=50, max_memory_mb=64)) == default
+    assert cache_key(b"pdf", ExtractionOptions(bounded=True)) == default
+    assert cache_key(b"pdf", ExtractionOptions(engine="text")) != default
+    assert cache_key(b"pdf", ExtractionOptions(split=True)) != default
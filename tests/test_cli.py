@@ -0,0 +1,143 @@
+"""Tests for the CLI commands"""
+import gzip
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typer.testing import CliRunner
+from invoice_qc.cli import app
+
+runner = CliRunner()
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Seconds `import invoice_qc.cli` may take in a fresh interpreter (best of 5);
+# typer accounts for most of it
+IMPORT_BUDGET = 0.2
+HEAVY_MODULES = ("pdfplumber", "pdfminer", "pydantic", "numpy", "cProfile")
+
+
+def _run_python(code: str) -> str:
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+
+
+def _invoice(number, gross_total):
+    return {
+        "invoice_number": number,
+        "invoice_date": "2024-05-22",
+        "seller_name": "Test Seller",
+        "buyer_name": "Test Buyer",
+        "currency": "EUR",
+        "net_total": 100.0,
+        "tax_amount": 19.0,
+        "gross_total": gross_total,
+    }
+
+
+def test_validate_streams_compressed_ndjson(tmp_path):
+    """Test NDJSON input and report stream one record per line with a summary"""
+    input_path = tmp_path / "invoices.ndjson.gz"
+    with gzip.open(input_path, "wt") as f:
+        for i in range(3):
+            f.write(json.dumps(_invoice(f"INV-{i}", 119.0 if i else 500.0)) + "\n")
+    report_path = tmp_path / "report.ndjson"
+    
+    result = runner.invoke(app, ["validate", "--input", str(input_path), "--report", str(report_path)])
+    
+    assert result.exit_code == 0
+    lines = [json.loads(line) for line in report_path.read_text().splitlines()]
+    assert [line["event"] for line in lines] == ["result", "result", "result", "summary"]
+    assert lines[0]["data"]["invoice_number"] == "INV-0"
+    assert lines[-1]["data"] == {"total_invoices": 3, "valid_invoices": 2, "invalid_invoices": 1}
+
+
+def test_full_run_profile_writes_chrome_trace(tmp_path):
+    """Test --profile traces each document down to rules and profiles the slowest one"""
+    from invoice_qc import metrics
+    pdf_dir = ROOT / "pdfs"
+    trace_path = tmp_path / "trace.json"
+    
+    result = runner.invoke(app, [
+        "full-run", "--pdf-dir", str(pdf_dir), "--report", str(tmp_path / "report.json"),
+        "--profile", str(trace_path), "--profile-top", "1",
+    ])
+    
+    assert result.exit_code == 0, result.output
+    assert not metrics.tracing
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    names = {event["name"] for event in events}
+    documents = [event for event in events if event["name"] == "document"]
+    assert len(documents) == len(list(pdf_dir.glob("*.pdf")))
+    assert all(event["ph"] == "X" and event["dur"] > 0 for event in documents)
+    assert {"page", "layout", "text_extraction", "table_extraction", "regex:invoice_number", "rule:totals"} <= names
+    assert len(list((tmp_path / "trace.json.profiles").glob("01_*.prof"))) == 1
+
+
+def test_cli_import_time_budget():
+    """Test importing the CLI loads none of the heavy modules and stays within its time budget"""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import invoice_qc.cli\n"
+        "print(time.perf_counter() - start)\n"
+        "print(' '.join(sys.modules))"
+    )
+    runs = [_run_python(code).splitlines() for _ in range(5)]
+    modules = {name.split(".")[0] for name in runs[0][1].split()}
+    
+    assert not modules & set(HEAVY_MODULES)
+    assert min(float(run[0]) for run in runs) < IMPORT_BUDGET
+
+
+def test_validate_does_not_load_pdf_stack(tmp_path):
+    """Test the validate command runs without importing pdfplumber"""
+    input_path = tmp_path / "invoices.json"
+    input_path.write_text(json.dumps([_invoice("INV-1", 119.0)]))
+    code = (
+        "import sys\n"
+        "from invoice_qc.cli import app\n"
+        f"app(['validate', '--input', {str(input_path)!r}, '--report', {str(tmp_path / 'report.json')!r}],"
+        " standalone_mode=False)\n"
+        "print(' '.join(sys.modules))"
+    )
+    modules = {name.split(".")[0] for name in _run_python(code).splitlines()[-1].split()}
+    
+    assert (tmp_path / "report.json").exists()
+    assert "pdfplumber" not in modules and "pdfminer" not in modules
+
+
+def test_validate_store_and_query(tmp_path):
+    """Test --store records each validated invoice and query pages through them as NDJSON"""
+    input_path = tmp_path / "invoices.json"
+    input_path.write_text(json.dumps([_invoice(f"INV-{i}", 119.0 if i % 2 else 500.0) for i in range(5)]))
+    store_path = str(tmp_path / "results.db")
+    
+    result = runner.invoke(app, [
+        "validate", "--input", str(input_path), "--report", str(tmp_path / "report.json"), "--store", store_path
+    ])
+    assert result.exit_code == 0
+    assert "Result store: 5 invoices" in result.output
+    
+    query = ["query", "--store", store_path, "--invalid", "--error", "Total mismatch", "--limit", "2"]
+    first = runner.invoke(app, query)
+    records = [json.loads(line) for line in first.stdout.splitlines()]
+    assert [r["invoice"]["invoice_number"] for r in records] == ["INV-0", "INV-2"]
+    assert f"next page: --cursor {records[-1]['id']}" in first.stderr
+    
+    second = runner.invoke(app, query + ["--cursor", str(records[-1]["id"])])
+    assert [json.loads(line)["invoice"]["invoice_number"] for line in second.stdout.splitlines()] == ["INV-4"]
+    assert "no more pages" in second.stderr
+    assert runner.invoke(app, ["query", "--store", str(tmp_path / "missing.db")]).exit_code != 0
+
+
+def test_conflicting_extraction_flags_are_usage_errors(tmp_path):
+    """Test --lazy with a ceiling or --split fails before any PDF is read"""
+    for flags in (["--lazy", "--max-pages", "3"], ["--lazy", "--split"]):
+        result = runner.invoke(app, [
+            "full-run", "--pdf-dir", str(ROOT / "pdfs"), "--report", str(tmp_path / "report.json"), *flags
+        ])
+        assert result.exit_code == 2
+        assert "lazy cannot be combined" in result.output
+    assert not (tmp_path / "report.json").exists()
@@ -0,0 +1,120 @@
+"""Parity tests for the columnar batch validator"""
+import random
+from datetime import date, timedelta
+from invoice_qc.columnar import validate_columns
+from invoice_qc.records import to_result
+from invoice_qc.schemas import Invoice, LineItem
+from invoice_qc.validator import validate_invoices, validate_single_invoice
+
+
+def _random_invoice(rng):
+    net = rng.choice([None, -5.0, 0.0, round(rng.uniform(0, 5000), 2)])
+    tax = None if net is None and rng.random() < 0.5 else round(rng.uniform(-1, 900), 2)
+    gross = None
+    if net is not None and tax is not None:
+        # Land on, near and just past the 0.1 tolerance
+        gross = round(net + tax + rng.choice([0, 0.05, 0.1, 0.11, -0.1, 0.3, 12.0]), 2)
+    
+    items = []
+    for _ in range(rng.choice([0, 0, 1, 3])):
+        quantity = rng.randint(1, 5)
+        price = round(rng.uniform(0.1, 400), 2)
+        items.append(LineItem(description="x", quantity=quantity, unit_price=price, line_total=round(quantity * price, 2)))
+    if items and rng.random() < 0.5:
+        net = round(sum(item.line_total for item in items) + rng.choice([0, 0.1, -0.1, 0.2]), 2)
+    
+    invoice_date = rng.choice([None, date(2024, 1, 1) + timedelta(days=rng.randint(0, 365))])
+    due_date = rng.choice([None, date(2024, 6, 1) + timedelta(days=rng.randint(-200, 200))])
+    return Invoice(
+        invoice_number=rng.choice(["", "UNKNOWN", f"INV-{rng.randint(0, 9999)}"]),
+        invoice_date=invoice_date,
+        due_date=due_date,
+        seller_name=rng.choice([None, "", "Seller GmbH"]),
+        buyer_name=rng.choice([None, "Buyer Ltd"]),
+        currency=rng.choice([None, "", "EUR", "USD", "INR", "GBP"]),
+        net_total=net,
+        tax_amount=tax,
+        gross_total=gross,
+        line_items=items,
+    )
+
+
+def test_columnar_matches_scalar_rules():
+    """Test the columnar engine gives identical results to the per-invoice path"""
+    rng = random.Random(1234)
+    invoices = [_random_invoice(rng) for _ in range(5000)]
+    
+    expected = [validate_single_invoice(invoice) for invoice in invoices]
+    actual = validate_columns(invoices)
+    
+    assert [r.as_dict() for r in actual] == [r.as_dict() for r in expected]
+    assert any(not r.is_valid for r in expected) and any(r.is_valid for r in expected)
+    assert any(r.warnings for r in expected)
+
+
+def test_columnar_float_edge_cases():
+    """Test sums that only differ from the tolerance by float rounding"""
+    base = dict(invoice_number="INV-1", invoice_date="2024-05-22", seller_name="S", buyer_name="B", currency="EUR")
+    invoices = [
+        Invoice(**base, net_total=0.1, tax_amount=0.2, gross_total=0.2),
+        Invoice(**base, net_total=100.0, tax_amount=19.0, gross_total=119.1),
+        Invoice(**base, net_total=100.0, tax_amount=19.0, gross_total=119.11),
+        Invoice(**base, net_total=1.0, line_items=[
+            LineItem(description="x", quantity=1, unit_price=0.1, line_total=0.1) for _ in range(10)
+        ]),
+        Invoice(**base, net_total=0.9, line_items=[
+            LineItem(description="x", quantity=1, unit_price=0.1, line_total=0.1) for _ in range(10)
+        ]),
+    ]
+    
+    expected = [validate_single_invoice(invoice) for invoice in invoices]
+    
+    assert validate_columns(invoices) == expected
+    assert validate_columns([]) == []
+
+
+def test_validate_invoices_uses_columnar_for_large_batches(monkeypatch):
+    """Test large batches are dispatched to the columnar engine"""
+    import invoice_qc.validator as validator
+    rng = random.Random(7)
+    invoices = [_random_invoice(rng) for _ in range(20)]
+    monkeypatch.setattr(validator, "COLUMNAR_THRESHOLD", 10)
+    
+    report = validate_invoices(invoices)
+    
+    assert report.total_invoices == 20
+    assert report.results == [to_result(validate_single_invoice(invoice)) for invoice in invoices]
+
+
+def test_columnar_rule_counters_match_scalar():
+    """Test the columnar engine adds the same per-rule counts as the rule plan"""
+    from invoice_qc.rules import registry
+    rng = random.Random(99)
+    invoices = [_random_invoice(rng) for _ in range(500)]
+    
+    def counts():
+        return [(s["rule"], s["invocations"], s["failures"], s["skipped"]) for s in registry.stats()]
+    
+    registry.reset_stats()
+    for invoice in invoices:
+        validate_single_invoice(invoice)
+    expected = counts()
+    registry.reset_stats()
+    validate_columns(invoices, registry)
+    
+    assert counts() == expected
+
+
+def test_columnar_leaves_garbage_collection_alone():
+    """Test validating a batch never changes whether the process's cyclic GC is enabled"""
+    import gc
+    rng = random.Random(1)
+    invoices = [_random_invoice(rng) for _ in range(50)]
+    gc.disable()
+    try:
+        validate_columns(invoices)
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
+    validate_columns(invoices)
+    assert gc.isenabled()
@@ -0,0 +1,89 @@
+"""Tests for duplicate invoice detection"""
+from invoice_qc.duplicates import DuplicateIndex, duplicate_keys
+from invoice_qc.schemas import Invoice
+from invoice_qc.validator import validate_batch, validate_invoices
+
+
+def _invoice(number, seller="ABC Corporation", gross_total=119.0):
+    return Invoice(
+        invoice_number=number,
+        invoice_date="2024-05-22",
+        seller_name=seller,
+        buyer_name="Test Buyer",
+        currency="EUR",
+        net_total=gross_total - 19.0,
+        tax_amount=19.0,
+        gross_total=gross_total,
+    )
+
+
+def test_duplicates_within_one_batch():
+    """Test exact duplicates fail and near-duplicates warn within one call"""
+    report = validate_invoices([
+        _invoice("INV-001"),
+        _invoice("inv 001", seller="abc  corporation."),
+        _invoice("INV-002"),
+        _invoice("INV-003", gross_total=500.0),
+        _invoice("INV-001", seller="Other GmbH"),
+    ])
+    results = report.results
+    
+    assert results[0].is_valid and not results[0].warnings
+    assert not results[1].is_valid
+    assert results[1].errors == ["Duplicate invoice: inv 001 from abc  corporation. already seen"]
+    assert results[2].is_valid
+    assert results[2].warnings == ["Possible duplicate of INV-001: same seller, invoice_date and gross_total"]
+    assert results[3].is_valid and not results[3].warnings
+    assert results[4].is_valid
+    assert report.invalid_invoices == 1
+
+
+def test_duplicates_across_runs(tmp_path):
+    """Test a persistent index flags invoices seen by an earlier run"""
+    path = str(tmp_path / "duplicates.db")
+    first = DuplicateIndex(path)
+    validate_invoices([_invoice("INV-001"), _invoice("INV-002", gross_total=200.0)], first)
+    first.close()
+    
+    second = DuplicateIndex(path)
+    report = validate_invoices([_invoice("INV-002", gross_total=200.0), _invoice("INV-004", gross_total=300.0)], second)
+    
+    assert [r.is_valid for r in report.results] == [False, True]
+    assert len(second) == 6
+    second.close()
+
+
+def test_same_file_read_again_is_not_its_own_duplicate(tmp_path):
+    """Test a file processed again is skipped, while the same invoice from another file is reported"""
+    path = str(tmp_path / "duplicates.db")
+    first = DuplicateIndex(path)
+    validate_batch([_invoice("INV-001"), _invoice("INV-002", gross_total=200.0)], first, sources=["a.pdf", "b.pdf"])
+    first.close()
+    
+    second = DuplicateIndex(path)
+    results = validate_batch(
+        # a.pdf processed again, b.pdf's invoice resent as c.pdf, and a.pdf's again from an upload
+        [_invoice("INV-001"), _invoice("INV-002", gross_total=200.0), _invoice("INV-001")],
+        second, sources=["a.pdf", "c.pdf", None]
+    )
+    
+    assert [r.is_valid for r in results] == [True, False, False]
+    assert results[0].warnings == []
+    second.close()
+
+
+def test_memory_index_stays_bounded():
+    """Test an in-memory index forgets its oldest keys instead of growing without limit"""
+    index = DuplicateIndex(max_keys=100)
+    for start in range(0, 1000, 10):
+        validate_invoices([_invoice(f"INV-{n}", gross_total=1000.0 + n) for n in range(start, start + 10)], index)
+    
+    assert len(index) <= 100
+    assert not validate_invoices([_invoice("INV-0", gross_total=1000.0)], index).results[0].errors
+    assert validate_invoices([_invoice("INV-999", gross_total=1999.0)], index).results[0].errors
+
+
+def test_incomplete_invoices_have_no_keys():
+    """Test invoices without a seller or number are never reported as duplicates"""
+    assert duplicate_keys(_invoice("INV-1", seller=None)) == (None, None)
+    assert duplicate_keys(_invoice("UNKNOWN"))[0] is None
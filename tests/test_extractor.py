@@ -0,0 +1,278 @@
+"""Tests for PDF extraction"""
+import io
+import os
+import time
+from pathlib import Path
+import pdfplumber
+import pytest
+from invoice_qc import extractor
+from invoice_qc.extractor import (
+    ExtractionLimitExceeded, extract_from_directory, extract_invoice_from_pdf, iter_page_content
+)
+from invoice_qc.schemas import ExtractionOptions
+
+SAMPLE_PDF = Path(__file__).resolve().parent.parent / "pdfs" / "sample_pdf_1.pdf"
+
+
+def test_extract_sample_invoice():
+    """Test header fields and totals are extracted from a sample PDF"""
+    invoice = extract_invoice_from_pdf(str(SAMPLE_PDF))
+    
+    assert invoice.invoice_number == "AUFNR34343"
+    assert invoice.invoice_date.isoformat() == "2024-05-22"
+    assert invoice.seller_name == "ABC Corporation"
+    assert invoice.currency == "EUR"
+    assert invoice.net_total == 64.0
+    assert invoice.tax_amount == 12.16
+    assert invoice.gross_total == 76.16
+
+
+def test_page_cache_released_after_each_page():
+    """Test the page pipeline frees each page's layout before moving on"""
+    with pdfplumber.open(str(SAMPLE_PDF)) as pdf:
+        for template, text, tables in iter_page_content(pdf):
+            assert text
+        
+        assert all(not hasattr(page, "_layout") for page in pdf.pages)
+
+
+def _copy_samples(tmp_path, names):
+    for name in names:
+        (tmp_path / name).write_bytes(SAMPLE_PDF.read_bytes())
+
+
+def test_parallel_extraction_keeps_file_order(tmp_path):
+    """Test process-pool extraction yields invoices in sorted file order"""
+    _copy_samples(tmp_path, ["c.pdf", "a.pdf", "b.pdf"])
+    (tmp_path / "b.pdf").write_bytes(b"not a pdf")
+    
+    invoices = extract_from_directory(str(tmp_path), workers=2)
+    
+    assert len(invoices) == 2
+    assert invoices == extract_from_directory(str(tmp_path), workers=1)
+
+
+def test_parallel_extraction_isolates_crash_and_timeout(tmp_path, monkeypatch):
+    """Test a crashing worker and a hung file do not abort the batch"""
+    _copy_samples(tmp_path, ["a.pdf", "crash.pdf", "hang.pdf", "z.pdf"])
+    real_extract = extractor.extract_invoice_from_pdf
+    
+    def flaky_extract(pdf_path, options=None):
+        if pdf_path.endswith("crash.pdf"):
+            os._exit(1)
+        if pdf_path.endswith("hang.pdf"):
+            time.sleep(30)
+        return real_extract(pdf_path, options)
+    
+    # Pool workers are forked after the patch, so they inherit it
+    monkeypatch.setattr(extractor, "extract_invoice_from_pdf", flaky_extract)
+    
+    invoices = extract_from_directory(str(tmp_path), workers=2, timeout=1)
+    
+    assert [inv.invoice_number for inv in invoices] == ["AUFNR34343", "AUFNR34343"]
+
+
+def test_extract_from_in_memory_sources():
+    """Test bytes, memoryview, mmap and file objects match extraction by path"""
+    expected = extract_invoice_from_pdf(str(SAMPLE_PDF))
+    pdf_bytes = SAMPLE_PDF.read_bytes()
+    
+    assert extract_invoice_from_pdf(pdf_bytes) == expected
+    assert extract_invoice_from_pdf(memoryview(pdf_bytes)) == expected
+    assert extract_invoice_from_pdf(io.BytesIO(pdf_bytes)) == expected
+    with extractor.map_file(SAMPLE_PDF) as mapped:
+        assert extract_invoice_from_pdf(mapped) == expected
+
+
+def test_lazy_extraction_matches_full_extraction():
+    """Test region-limited lazy extraction finds the same fields and line items"""
+    full = extract_invoice_from_pdf(str(SAMPLE_PDF))
+    lazy = extract_invoice_from_pdf(str(SAMPLE_PDF), ExtractionOptions(lazy=True))
+    header_only = extract_invoice_from_pdf(
+        str(SAMPLE_PDF), ExtractionOptions(lazy=True, line_items=False)
+    )
+    
+    assert lazy == full
+    assert header_only == full.replace(line_items=[])
+
+
+def test_lazy_rejects_ceilings_and_split():
+    """Test options lazy extraction would silently ignore are rejected up front"""
+    from pydantic import ValidationError
+    for conflicting in ({"bounded": True}, {"max_pages": 3}, {"max_memory_mb": 64}, {"split": True}):
+        with pytest.raises(ValidationError, match="lazy cannot be combined"):
+            ExtractionOptions(lazy=True, **conflicting)
+
+
+@pytest.mark.parametrize("engine", ["full", "text", "auto"])
+def test_lazy_extraction_skips_pages_past_the_table(monkeypatch, engine):
+    """Test lazy extraction lays out only the table's pages, the page after it and the totals page"""
+    import random
+    from benchmarks.synthetic import invoice_pdf, synthetic_invoice
+    from pdfplumber.page import Page
+    
+    invoice = synthetic_invoice(random.Random(0), 0, 12)
+    # Table rows on pages 1-3, running text on pages 4-30, totals on page 30
+    pdf = invoice_pdf(invoice, pages=30, rows_per_page=5)
+    laid_out = []
+    page_texts = []
+    table_pages = []
+    real_text, real_tables = Page.extract_text, Page.extract_tables
+    
+    def extract_text(page, *args, **kwargs):
+        laid_out.append(page.page_number)
+        if type(page) is Page:
+            # Whole pages only; header and totals regions are cropped pages
+            page_texts.append(page.page_number)
+        return real_text(page, *args, **kwargs)
+    
+    def extract_tables(page, *args, **kwargs):
+        laid_out.append(page.page_number)
+        table_pages.append(page.page_number)
+        return real_tables(page, *args, **kwargs)
+    
+    monkeypatch.setattr(Page, "extract_text", extract_text)
+    monkeypatch.setattr(Page, "extract_tables", extract_tables)
+    extracted = extract_invoice_from_pdf(pdf, ExtractionOptions(lazy=True, engine=engine))
+    
+    assert extracted == invoice.replace(engine="full" if engine == "full" else "text")
+    assert set(laid_out) == {1, 2, 3, 4, 30}
+    # Whole-page text only where the anchor or text rows are looked for, and once per page
+    assert page_texts == ([1] if engine == "full" else [1, 2, 3, 4])
+    assert table_pages == {"full": [1, 2, 3, 4], "text": [], "auto": [4]}[engine]
+
+
+def test_synthetic_benchmark_pdfs_round_trip():
+    """Test the benchmark generator's layouts extract back to the invoices they encode"""
+    import random
+    from benchmarks.synthetic import invoice_pdf, synthetic_invoice
+    
+    rng = random.Random(0)
+    for pages, line_items, rows_per_page in [(1, 3, 0), (1, 40, 0), (1, 12, 5), (3, 2, 0)]:
+        invoice = synthetic_invoice(rng, line_items, line_items)
+        pdf = invoice_pdf(invoice, pages, rows_per_page)
+        invoice = invoice.replace(engine="full")
+        
+        assert extract_invoice_from_pdf(pdf) == invoice
+        assert extract_invoice_from_pdf(pdf, ExtractionOptions(lazy=True)) == invoice
+
+
+def test_bounded_extraction_memory_stays_flat(monkeypatch):
+    """Test bounded extraction matches the invoice and retains nothing per page it has passed"""
+    import gc
+    import random
+    import tracemalloc
+    from benchmarks.synthetic import invoice_pdf, synthetic_invoice
+    
+    invoice = synthetic_invoice(random.Random(0), 1, 5)
+    pdf = invoice_pdf(invoice, pages=10)
+    invoice = invoice.replace(engine="full")
+    retained = []
+    real_iter_pages_bounded = extractor.iter_pages_bounded
+    
+    def sampled(*args, **kwargs):
+        # Measured as each page is created, once the previous one has been released
+        for page in real_iter_pages_bounded(*args, **kwargs):
+            gc.collect()
+            retained.append(tracemalloc.get_traced_memory()[0])
+            yield page
+    
+    monkeypatch.setattr(extractor, "iter_pages_bounded", sampled)
+    tracemalloc.start()
+    try:
+        bounded = extract_invoice_from_pdf(pdf, ExtractionOptions(bounded=True))
+    finally:
+        tracemalloc.stop()
+    
+    assert bounded == invoice
+    assert len(retained) == 10
+    # Full extraction keeps ~5 KB per page it has passed, so the second half alone would add ~25 KB
+    assert retained[-1] - retained[len(retained) // 2] < 16 * 1024
+
+
+def test_pdfminer_object_caches_exist_and_are_cleared():
+    """Test the private pdfminer caches bounded extraction clears still exist, and are emptied per page"""
+    with pdfplumber.open(SAMPLE_PDF) as pdf:
+        for name in extractor.PDFMINER_OBJECT_CACHES:
+            assert isinstance(getattr(pdf.doc, name, None), dict), f"pdfminer no longer has PDFDocument.{name}"
+        pages = extractor.iter_pages_bounded(pdf)
+        next(pages).extract_text()
+        assert any(getattr(pdf.doc, name) for name in extractor.PDFMINER_OBJECT_CACHES)
+        next(pages, None)
+        assert not any(getattr(pdf.doc, name) for name in extractor.PDFMINER_OBJECT_CACHES)
+
+
+def test_bounded_extraction_enforces_ceilings():
+    """Test PDFs over the page or memory ceiling are rejected"""
+    import random
+    import tracemalloc
+    from benchmarks.synthetic import invoice_pdf, synthetic_invoice
+    
+    invoice = synthetic_invoice(random.Random(0), 1, 5)
+    pdf = invoice_pdf(invoice, pages=3)
+    
+    assert extract_invoice_from_pdf(pdf, ExtractionOptions(max_pages=3)) == invoice.replace(engine="full")
+    with pytest.raises(ExtractionLimitExceeded, match="more than 2 pages"):
+        extract_invoice_from_pdf(pdf, ExtractionOptions(max_pages=2))
+    tracemalloc.start()
+    try:
+        with pytest.raises(ExtractionLimitExceeded, match="by page 1"):
+            extract_invoice_from_pdf(pdf, ExtractionOptions(max_memory_mb=0.5))
+    finally:
+        tracemalloc.stop()
+
+
+def test_split_yields_each_invoice_of_a_statement(monkeypatch):
+    """Test a consolidated PDF yields one invoice per page range, each once its last page is read"""
+    import random
+    from benchmarks.synthetic import statement_pdf, synthetic_invoice
+    from invoice_qc.templates import get_registry
+    
+    rng = random.Random(0)
+    invoices = [synthetic_invoice(rng, number, 3) for number in range(3)]
+    pdf = statement_pdf(invoices, pages=2)
+    invoices = [invoice.replace(engine="full") for invoice in invoices]
+    pages_read = []
+    real_iter_pages_bounded = extractor.iter_pages_bounded
+    
+    def counted(*args, **kwargs):
+        for page in real_iter_pages_bounded(*args, **kwargs):
+            pages_read.append(page.page_number)
+            yield page
+    
+    monkeypatch.setattr(extractor, "iter_pages_bounded", counted)
+    segments = extractor.iter_invoices_from_pdf(pdf)
+    
+    assert next(segments) == invoices[0]
+    # The first invoice is complete as soon as page 3 opens the second
+    assert pages_read == [1, 2, 3]
+    assert list(segments) == invoices[1:]
+    
+    # Without a page marker, a different invoice number also starts a new invoice
+    builder = extractor.InvoiceBuilder(get_registry().default)
+    builder.add_page("Bestellung AB100 vom 02.01.2024", [])
+    assert not builder.starts_new_invoice("Bestellung AB100 Seite 2 von 2")
+    assert builder.starts_new_invoice("Bestellung AB200 vom 03.01.2024")
+
+
+def test_text_engine_matches_tables_and_auto_falls_back():
+    """Test text-row line items equal the table engine's, and auto re-reads tables when they do not add up"""
+    import random
+    from benchmarks.synthetic import invoice_pdf, synthetic_invoice
+    
+    invoice = synthetic_invoice(random.Random(0), 1, 30)
+    pdf = invoice_pdf(invoice, pages=2, rows_per_page=12)
+    # A net total the rows cannot add up to makes auto distrust the text engine
+    mismatched = invoice.replace(net_total=invoice.net_total + 5)
+    mismatched_pdf = invoice_pdf(mismatched, pages=2, rows_per_page=12)
+    
+    for mode in ({}, {"lazy": True}, {"bounded": True}):
+        text = ExtractionOptions(engine="text", **mode)
+        auto = ExtractionOptions(engine="auto", **mode)
+        assert extract_invoice_from_pdf(pdf, text) == invoice.replace(engine="text")
+        assert extract_invoice_from_pdf(pdf, auto) == invoice.replace(engine="text")
+        assert extract_invoice_from_pdf(mismatched_pdf, auto) == mismatched.replace(engine="full")
+    
+    sample = extract_invoice_from_pdf(str(SAMPLE_PDF), ExtractionOptions(engine="auto"))
+    assert sample.engine == "text"
+    assert [(item.quantity, item.unit_price, item.line_total) for item in sample.line_items] == [(4.0, 16.0, 64.0)]
@@ -0,0 +1,71 @@
+"""Tests for per-document number and date format detection"""
+import pytest
+from invoice_qc.extractor import parse_invoice_fields, parse_number, parse_text_line_items
+from invoice_qc.formats import detect_format, get_format, value_format
+from invoice_qc.templates import BUILTIN_TEMPLATES, VendorTemplate
+
+US_TEMPLATE = {
+    "name": "us-invoice",
+    "keywords": ["Invoice"],
+    "fields": {
+        "invoice_date": [r"Date:\s*(\S+)"],
+        "gross_total": [r"Total\s+USD\s+([\d,.]+)"]
+    },
+    "line_item_patterns": [
+        r"(?m)^(?P<description>[A-Za-z ]+?)\s+(?P<quantity>[\d,.]+)\s+"
+        r"(?P<unit_price>[\d,.]+)\s+(?P<line_total>[\d,.]+)$"
+    ]
+}
+
+
+def test_ambiguous_values_follow_the_document_convention():
+    """Test "1,080" and 04/05 dates are read by the convention the rest of the document shows"""
+    template = VendorTemplate(US_TEMPLATE)
+    us_text = "Invoice\nDate: 04/05/2024\nShipped 05/22/2024\nBolts 1,080 0.50 540.00\nTotal USD 1,080\n"
+    de_text = "Invoice\nDate: 04.05.2024\nBolts 1,080 500 540,00\nTotal USD 1,080\n"
+    
+    us = parse_invoice_fields(us_text, template)
+    de = parse_invoice_fields(de_text, template)
+    
+    assert (us["invoice_date"], us["gross_total"]) == ("2024-04-05", 1080.0)
+    assert (de["invoice_date"], de["gross_total"]) == ("2024-05-04", 1.08)
+    assert parse_text_line_items(us_text, template)[0].quantity == 1080.0
+    assert parse_text_line_items(de_text, template)[0].quantity == 1.08
+    # Values no convention can read as given are read the other way round
+    assert detect_format(de_text).parse_date("05/22/2024") == "2024-05-22"
+
+
+def test_thousands_separators_and_millions():
+    """Test grouped amounts parse in both conventions, including totals over a million"""
+    template = VendorTemplate(BUILTIN_TEMPLATES[0])
+    text = "Gesamtwert EUR 848.979,18\nGesamtwert inkl. MwSt. EUR 1.010.285,23\n"
+    fields = parse_invoice_fields(text, template, ["net_total", "gross_total"])
+    
+    assert (fields["net_total"], fields["gross_total"]) == (848979.18, 1010285.23)
+    assert parse_number("1,234.50") == 1234.5
+    assert parse_number("1.234,50") == 1234.5
+    assert parse_number("1 080,00") == 1080.0
+    assert get_format(".", "MDY").parse_number("1'010'285.23") == 1010285.23
+
+
+def test_parse_number_without_format_keeps_the_lone_separator_as_decimal():
+    """Test a value parsed on its own reads a single separator as the decimal one, as it always has"""
+    assert parse_number("1.080") == 1.08
+    assert parse_number("1,080") == 1.08
+    assert parse_number("64,00") == 64.0
+    assert parse_number("1080") == 1080.0
+    # Of two separators the last is the decimal one; a repeated one groups thousands
+    assert parse_number("1,234.50") == 1234.5
+    assert parse_number("1.010.285") == 1010285.0
+    assert value_format("1.010.285,23") is get_format(",")
+
+
+def test_template_conventions_override_detection():
+    """Test a template's decimal separator and date order win over the document's text"""
+    template = VendorTemplate({**US_TEMPLATE, "decimal_separator": ".", "date_order": "MDY"})
+    # Dotted dates and "2,0" would otherwise make this a day-first, decimal-comma document
+    fields = parse_invoice_fields("Invoice 2,0 30.12.2024\nDate: 04/05/2024\nTotal USD 1,080\n", template)
+    
+    assert (fields["invoice_date"], fields["gross_total"]) == ("2024-04-05", 1080.0)
+    with pytest.raises(ValueError, match="decimal_separator"):
+        VendorTemplate({**US_TEMPLATE, "decimal_separator": ";"})
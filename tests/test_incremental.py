@@ -0,0 +1,88 @@
+"""Tests for incremental full runs"""
+import shutil
+from pathlib import Path
+from invoice_qc import incremental
+from invoice_qc.incremental import Manifest, ManifestEntry, iter_incremental
+from invoice_qc.records import InvoiceRecord, ResultRecord
+
+PDF_DIR = Path(__file__).resolve().parent.parent / "pdfs"
+
+
+class _Rules:
+    digest = "changed-rules"
+
+
+def _run(pdf_dir, manifest_path):
+    manifest = Manifest(str(manifest_path))
+    counts = {}
+    results = list(iter_incremental(str(pdf_dir), manifest, counts=counts))
+    manifest.close()
+    return [r.invoice_number for r in results], counts
+
+
+def test_incremental_run_only_processes_changes(tmp_path, monkeypatch):
+    """Test unchanged files are reused, rule changes re-validate and edits re-extract"""
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    for name in ["sample_pdf_1.pdf", "sample_pdf_2.pdf", "sample_pdf_3.pdf"]:
+        shutil.copy(PDF_DIR / name, pdf_dir / name)
+    manifest_path = tmp_path / "manifest.db"
+    
+    first, counts = _run(pdf_dir, manifest_path)
+    assert counts == {"reused": 0, "revalidated": 0, "extracted": 3, "removed": 0}
+    
+    second, counts = _run(pdf_dir, manifest_path)
+    assert second == first
+    assert counts == {"reused": 3, "revalidated": 0, "extracted": 0, "removed": 0}
+    
+    monkeypatch.setattr(incremental, "registry", _Rules())
+    third, counts = _run(pdf_dir, manifest_path)
+    assert third == first
+    assert counts == {"reused": 0, "revalidated": 3, "extracted": 0, "removed": 0}
+    
+    (pdf_dir / "sample_pdf_1.pdf").unlink()
+    shutil.copy(PDF_DIR / "sample_pdf_4.pdf", pdf_dir / "sample_pdf_2.pdf")
+    fourth, counts = _run(pdf_dir, manifest_path)
+    assert fourth == ["AUFNR123456", first[2]]
+    assert counts == {"reused": 1, "revalidated": 0, "extracted": 1, "removed": 1}
+
+
+def test_files_are_hashed_once_and_reused_results_batched(tmp_path, monkeypatch):
+    """Test new files are hashed once and reused results are read in one query per batch"""
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    for index in range(5):
+        shutil.copy(PDF_DIR / "sample_pdf_1.pdf", pdf_dir / f"invoice_{index}.pdf")
+    manifest_path = tmp_path / "manifest.db"
+    hashed = []
+    file_sha256 = incremental.file_sha256
+    monkeypatch.setattr(incremental, "file_sha256", lambda path: hashed.append(path) or file_sha256(path))
+    
+    _run(pdf_dir, manifest_path)
+    assert len(hashed) == 5
+    
+    monkeypatch.setattr(incremental, "RESULT_BATCH", 2)
+    manifest = Manifest(str(manifest_path))
+    queries = []
+    manifest._conn.set_trace_callback(queries.append)
+    results = list(iter_incremental(str(pdf_dir), manifest))
+    manifest.close()
+    assert len(results) == 5
+    assert len(hashed) == 5
+    assert sum("SELECT result" in query or "SELECT path, result" in query for query in queries) == 3
+
+
+def test_touched_files_are_committed_in_batches(tmp_path, monkeypatch):
+    """Test a run that only updates file stats still commits every COMMIT_EVERY files"""
+    monkeypatch.setattr(incremental, "COMMIT_EVERY", 2)
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    entry = ManifestEntry(1, 1, "sha", "extractor", "rules", "INV-1", None, None)
+    for name in "abc":
+        manifest.record(name, entry, InvoiceRecord("INV-1"), ResultRecord("INV-1", True))
+    manifest.commit()
+    
+    manifest.touch("a", 2, 2)
+    assert manifest._conn.in_transaction
+    manifest.touch("b", 2, 2)
+    assert not manifest._conn.in_transaction
+    manifest.close()
@@ -0,0 +1,43 @@
+"""Tests for the internal invoice and result records"""
+import pickle
+from datetime import date
+from invoice_qc.records import (
+    InvoiceRecord,
+    LineItemRecord,
+    ResultRecord,
+    invoice_from_json,
+    invoice_to_json,
+    to_invoice,
+    to_result,
+)
+
+
+def _record():
+    return InvoiceRecord(
+        invoice_number="INV-1",
+        invoice_date=date(2024, 5, 22),
+        seller_name="ABC Corporation",
+        currency="EUR",
+        net_total=100.0,
+        line_items=[LineItemRecord("Widget", 2.0, 50.0, 100.0)],
+    )
+
+
+def test_records_match_public_schemas():
+    """Test records dump exactly like the Pydantic models they convert to"""
+    record = _record()
+    result = ResultRecord("INV-1", False, ["Missing buyer_name"])
+    
+    assert record.as_dict() == to_invoice(record).model_dump(mode="json")
+    assert list(record.as_dict()) == list(to_invoice(record).model_dump())
+    assert result.as_dict() == to_result(result).model_dump(mode="json")
+
+
+def test_records_round_trip():
+    """Test records survive JSON (cache, manifest) and pickling (worker processes)"""
+    record = _record()
+    
+    assert invoice_from_json(invoice_to_json(record)) == record
+    assert pickle.loads(pickle.dumps(record)) == record
+    assert record.replace(line_items=[]) != record
+    assert not hasattr(record, "__dict__")
@@ -0,0 +1,75 @@
+"""Tests for the persistent result store"""
+from datetime import date
+from invoice_qc.schemas import Invoice
+from invoice_qc.store import ResultStore
+from invoice_qc.validator import validate_batch
+
+
+def _invoice(number, seller="ABC Corporation", invoice_date="2024-05-22", buyer="Test Buyer"):
+    return Invoice(
+        invoice_number=number,
+        invoice_date=invoice_date,
+        seller_name=seller,
+        buyer_name=buyer,
+        currency="EUR",
+        net_total=100.0 + int(number[-2:]),
+        tax_amount=19.0,
+        gross_total=119.0 + int(number[-2:]),
+    )
+
+
+def test_store_filters_and_paginates(tmp_path):
+    """Test filters combine and cursor pages cover every match exactly once"""
+    store = ResultStore(str(tmp_path / "results.db"))
+    invoices = [
+        _invoice(f"INV-{i:02d}", seller="ABC Corporation" if i % 2 else "Other GmbH",
+                 invoice_date=f"2024-{4 + i % 3:02d}-15", buyer=None if i % 4 == 1 else "Test Buyer")
+        for i in range(20)
+    ]
+    validate_batch(invoices, store=store)
+    store.commit()
+    
+    matches = []
+    cursor = None
+    pages = 0
+    while True:
+        page, cursor = store.query(
+            seller_name="abc corporation", is_valid=False,
+            date_from=date(2024, 5, 1), date_to=date(2024, 5, 31), limit=1, cursor=cursor
+        )
+        matches.extend(stored.invoice.invoice_number for stored in page)
+        pages += 1
+        if cursor is None:
+            break
+    
+    assert matches == ["INV-01", "INV-13"]
+    assert pages == 2
+    assert [s.invoice.invoice_number for s in store.query(error="buyer_name", limit=100)[0]] == [
+        "INV-01", "INV-05", "INV-09", "INV-13", "INV-17"
+    ]
+    stored = store.query(invoice_number="INV-01")[0][0]
+    assert stored.invoice.buyer_name is None
+    assert store.get(stored.id) == stored
+    store.close()
+
+
+def test_store_replaces_result_of_a_stored_invoice(tmp_path):
+    """Test storing the same invoice again keeps one row, its id and only the latest failures"""
+    path = str(tmp_path / "results.db")
+    store = ResultStore(path)
+    validate_batch([_invoice("INV-01"), _invoice("INV-02")], store=store)
+    store.close()
+    
+    store = ResultStore(path)
+    # Twice in one batch: the copy is a duplicate, and the last result is the one kept
+    validate_batch([_invoice("INV-01"), _invoice("INV-01")], store=store)
+    store.commit()
+    
+    assert len(store) == 2
+    page, cursor = store.query()
+    assert [s.invoice.invoice_number for s in page] == ["INV-01", "INV-02"]
+    assert page[0].result.errors == ["Duplicate invoice: INV-01 from ABC Corporation already seen"]
+    assert store.query(error="Duplicate")[0] == page[:1]
+    assert store.query(is_valid=True)[0] == page[1:]
+    assert cursor is None
+    store.close()
@@ -0,0 +1,71 @@
+"""Tests for the vendor template registry"""
+import time
+import pytest
+from invoice_qc.extractor import parse_invoice_fields
+from invoice_qc.templates import BUILTIN_TEMPLATES, TemplateRegistry, VendorTemplate
+
+ACME_TEMPLATE = {
+    "name": "acme",
+    "keywords": ["ACME", "Invoice", "Total"],
+    "fields": {
+        "invoice_number": [r"Invoice No\.\s*(\S+)"],
+        "invoice_date": [r"Date:\s*(\d{4}-\d{2}-\d{2})"],
+        "seller_name": [r"^(ACME Ltd)"],
+        "gross_total": [r"Total\s+USD\s+([\d,\.]+)"],
+        "currency": [r"Total\s+(USD)"]
+    }
+}
+
+ACME_TEXT = "ACME Ltd\nInvoice No. A-17\nDate: 2024-05-22\nTotal USD 1234.50\n"
+
+
+def _vendor(i):
+    return {"name": f"vendor-{i}", "keywords": [f"vendorkey{i}", "Invoice"], "fields": {}}
+
+
+def test_fingerprint_selects_vendor_template():
+    """Test page keywords select the matching template and its patterns"""
+    registry = TemplateRegistry(BUILTIN_TEMPLATES + [ACME_TEMPLATE], default="de-bestellung")
+    template = registry.match(ACME_TEXT)
+    fields = parse_invoice_fields(ACME_TEXT, template)
+    
+    assert template.name == "acme"
+    assert fields["invoice_number"] == "A-17"
+    assert fields["invoice_date"] == "2024-05-22"
+    assert fields["seller_name"] == "ACME Ltd"
+    assert fields["currency"] == "USD"
+    assert fields["gross_total"] == 1234.5
+
+
+def test_unknown_layout_falls_back_to_default():
+    """Test a page matching no template's keywords uses the default template"""
+    registry = TemplateRegistry(BUILTIN_TEMPLATES + [ACME_TEMPLATE], default="de-bestellung")
+    
+    assert registry.match("Invoice from somebody else").name == "de-bestellung"
+
+
+def test_match_time_flat_as_templates_grow():
+    """Test matching cost does not scale with the number of templates sharing a keyword"""
+    small = TemplateRegistry(BUILTIN_TEMPLATES + [_vendor(0)])
+    # Every vendor template also has the keyword "invoice", which the page contains
+    large = TemplateRegistry(BUILTIN_TEMPLATES + [_vendor(i) for i in range(2000)])
+    page = "Invoice vendorkey250 total due"
+    
+    def best_time(registry):
+        best = float("inf")
+        for _ in range(20):
+            start = time.perf_counter()
+            registry.match(page)
+            best = min(best, time.perf_counter() - start)
+        return best
+    
+    assert large.match(page).name == "vendor-250"
+    assert large.match("Invoice without a vendor key").name == "de-bestellung"
+    assert best_time(large) < 3 * best_time(small)
+
+
+def test_keywords_must_be_single_words():
+    """Test keywords the word-by-word matcher could never find are rejected at load time"""
+    for keyword in ["MwSt.", "Kunden Nr"]:
+        with pytest.raises(ValueError, match="single words"):
+            VendorTemplate({"name": "bad", "keywords": ["Invoice", keyword]})
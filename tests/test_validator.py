@@ -102,3 +102,63 @@ def test_negative_amounts():
     
     assert is_valid is False
     assert any("negative" in error.lower() for error in errors)
+
+
+def test_rule_plan_skips_and_counts():
+    """Test rules are ordered by dependency, skipped when inputs are missing, and counted"""
+    from invoice_qc.rules import Rule, RuleRegistry
+    calls = []
+    
+    def totals(invoice):
+        calls.append("totals")
+        return ["bad totals"]
+    
+    def refund(invoice):
+        calls.append("refund")
+        return []
+    
+    rules = RuleRegistry()
+    rules.register(Rule("refund", refund, ["gross_total"], depends_on=["totals"]))
+    rules.register(Rule("totals", totals, ["net_total", "gross_total"], requires=["net_total", "gross_total"]))
+    plan = rules.compile()
+    
+    assert [rule.name for rule in plan.rules] == ["totals", "refund"]
+    assert plan.evaluate(Invoice(invoice_number="A")) == (True, [], [])
+    assert plan.evaluate(Invoice(invoice_number="B", net_total=1.0, gross_total=2.0)) == (False, ["bad totals"], [])
+    assert calls == ["totals"]
+    
+    stats = {s["rule"]: s for s in rules.stats()}
+    assert (stats["totals"]["invocations"], stats["totals"]["failures"], stats["totals"]["skipped"]) == (1, 1, 1)
+    assert (stats["refund"]["invocations"], stats["refund"]["skipped"]) == (0, 2)
+    
+    rules.register(Rule("loop", refund, [], depends_on=["loop"]))
+    with pytest.raises(ValueError):
+        rules.compile()
+
+
+def test_rule_plan_evaluates_threads_concurrently():
+    """Test checks run outside the registry lock, while counters stay exact across threads"""
+    import threading
+    from invoice_qc.rules import Rule, RuleRegistry
+    both_inside = threading.Barrier(2, timeout=5)
+    
+    def waits_for_the_other_thread(invoice):
+        # Breaks with BrokenBarrierError if evaluation were serialized
+        both_inside.wait()
+        return []
+    
+    rules = RuleRegistry()
+    rules.register(Rule("concurrent", waits_for_the_other_thread, []))
+    plan = rules.compile()
+    outcomes = []
+    threads = [
+        threading.Thread(target=lambda: outcomes.append(plan.evaluate(Invoice(invoice_number="A"))))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert outcomes == [(True, [], [])] * 2
+    assert rules.stats()[0]["invocations"] == 2
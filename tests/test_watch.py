@@ -0,0 +1,121 @@
+"""Tests for the watch-folder daemon"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+import pytest
+from invoice_qc import extractor
+from invoice_qc.records import ResultRecord
+from invoice_qc.watch import ReportSink, WatchDaemon
+
+SAMPLE_PDF = Path(__file__).resolve().parent.parent / "pdfs" / "sample_pdf_1.pdf"
+
+
+def _wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+@pytest.mark.parametrize("inotify", [True, False])
+def test_watch_processes_settled_files_and_isolates_crashes(tmp_path, monkeypatch, inotify):
+    """Test files are read once settled, reported in batches, moved aside, and a crashing PDF fails alone"""
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    sample = SAMPLE_PDF.read_bytes()
+    (inbox / "a.pdf").write_bytes(sample)
+    (inbox / "crash.pdf").write_bytes(sample)
+    real_extract = extractor.extract_invoice_from_pdf
+    submitted = []
+    
+    def flaky_extract(pdf_path, options=None):
+        if pdf_path.endswith("crash.pdf"):
+            os._exit(1)
+        return real_extract(pdf_path, options)
+    
+    # Pool workers are forked after the patch, so they inherit it
+    monkeypatch.setattr(extractor, "extract_invoice_from_pdf", flaky_extract)
+    daemon = WatchDaemon(
+        str(inbox), str(tmp_path / "qc.json"), workers=2, max_in_flight=1, settle=0.3,
+        batch_seconds=0.2, inotify=inotify, poll_interval=0.1
+    )
+    real_submit = daemon._submit
+    
+    def tracked_submit(name, alone=False):
+        submitted.append(len(daemon._in_flight))
+        real_submit(name, alone)
+    
+    monkeypatch.setattr(daemon, "_submit", tracked_submit)
+    thread = threading.Thread(target=daemon.run)
+    thread.start()
+    try:
+        # Written in two halves; a file read before it settles would fail to parse
+        with open(inbox / "b.pdf", "wb") as f:
+            f.write(sample[:len(sample) // 2])
+            f.flush()
+            time.sleep(0.15)
+            f.write(sample[len(sample) // 2:])
+        _wait_for(lambda: daemon.counts["files"] == 3)
+    finally:
+        daemon.stop()
+        thread.join()
+    
+    report = json.loads((tmp_path / "qc.json").read_text())
+    assert report["total_invoices"] == 3
+    assert [r["errors"] for r in report["results"] if r["invoice_number"] == "UNKNOWN"] == [
+        ["Extraction failed for crash.pdf: worker process crashed"]
+    ]
+    assert sorted(p.name for p in (inbox / "processed").iterdir()) == ["a.pdf", "b.pdf"]
+    assert [p.name for p in (inbox / "failed").iterdir()] == ["crash.pdf"]
+    assert not list(inbox.glob("*.pdf"))
+    # max_in_flight=1: nothing was submitted while another file was in flight
+    assert set(submitted) == {0}
+
+
+def test_report_sink_rolls_and_resumes(tmp_path):
+    """Test JSON reports resume after a restart and strftime paths roll over to new files"""
+    path = str(tmp_path / "qc.json")
+    ReportSink(path).write([ResultRecord("INV-1", True)])
+    ReportSink(path).write([ResultRecord("INV-2", False, ["Missing seller_name"])])
+    
+    report = json.loads(Path(path).read_text())
+    assert [r["invoice_number"] for r in report["results"]] == ["INV-1", "INV-2"]
+    assert report["invalid_invoices"] == 1
+    
+    rolling = ReportSink(str(tmp_path / "qc-%Y%m%d.ndjson"))
+    written = rolling.write([ResultRecord("INV-3", True)])
+    rolling.write([ResultRecord("INV-4", True)])
+    assert written == str(tmp_path / time.strftime("qc-%Y%m%d.ndjson"))
+    assert len(Path(written).read_text().splitlines()) == 2
+
+
+def test_interrupted_workers_finish_their_files(tmp_path, monkeypatch):
+    """Test a Ctrl-C reaching pool workers neither fails their files nor aborts the daemon"""
+    import signal
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.pdf").write_bytes(SAMPLE_PDF.read_bytes())
+    real_extract = extractor.extract_invoice_from_pdf
+    
+    def interrupted_extract(pdf_path, options=None):
+        # What the terminal does to every process in the group
+        os.kill(os.getpid(), signal.SIGINT)
+        return real_extract(pdf_path, options)
+    
+    monkeypatch.setattr(extractor, "extract_invoice_from_pdf", interrupted_extract)
+    daemon = WatchDaemon(
+        str(inbox), str(tmp_path / "qc.json"), workers=1, settle=0.1, batch_seconds=0.1, inotify=False, poll_interval=0.1
+    )
+    thread = threading.Thread(target=daemon.run)
+    thread.start()
+    try:
+        _wait_for(lambda: daemon.counts["files"] == 1)
+    finally:
+        daemon.stop()
+        thread.join()
+    
+    report = json.loads((tmp_path / "qc.json").read_text())
+    assert report["total_invoices"] == 1
+    assert report["results"][0]["invoice_number"] != "UNKNOWN"